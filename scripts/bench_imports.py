@@ -0,0 +1,116 @@
+"""Benchmark import time of the library and cold start of subcommands.
+
+Each measurement runs in a fresh interpreter and the best of several runs is
+kept.  The script exits with a non-zero status if a measurement exceeds its
+budget, or if importing `stagpy.stagyydata` pulls in heavy dependencies that
+are only needed for plotting or pretty printing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+SUBCMDS = (
+    "version",
+    "var",
+    "info",
+    "config",
+    "field",
+    "rprof",
+    "time",
+    "refstate",
+    "plates",
+)
+
+FORBIDDEN = ("scipy", "matplotlib", "rich")
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$")
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+
+def importtime(module: str) -> tuple[float, dict[str, float]]:
+    """Cumulative import time of a module and of each dependency, in ms."""
+    subp = run_python(f"import {module}", "-X", "importtime")
+    cumulative = {}
+    for line in subp.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match is not None:
+            cumulative[match.group(3)] = int(match.group(2)) / 1000
+    return cumulative[module], cumulative
+
+
+def cold_start(code: str, repeat: int) -> float:
+    """Best wall time to run code in a fresh interpreter, in ms."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_python(code)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--lib-budget",
+        type=float,
+        default=1000.0,
+        help="budget of the import of stagpy.stagyydata, in ms",
+    )
+    parser.add_argument(
+        "--cmd-budget",
+        type=float,
+        default=2000.0,
+        help="budget of the cold start of a subcommand, in ms",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    parser.add_argument(
+        "--top", type=int, default=10, help="number of slowest imports to report"
+    )
+    args = parser.parse_args()
+
+    failures = []
+
+    runs = [importtime("stagpy.stagyydata") for _ in range(args.repeat)]
+    lib_time, cumulative = min(runs, key=lambda run: run[0])
+    print(f"import stagpy.stagyydata: {lib_time:.0f} ms")
+    slowest = sorted(cumulative.items(), key=lambda item: -item[1])[: args.top]
+    for module, cumul in slowest:
+        print(f"  {cumul:8.1f} ms  {module}")
+    if lib_time > args.lib_budget:
+        failures.append(f"stagpy.stagyydata over budget ({args.lib_budget:.0f} ms)")
+    for module in FORBIDDEN:
+        if module in cumulative:
+            failures.append(f"stagpy.stagyydata imports {module}")
+
+    print()
+    for cmd in SUBCMDS:
+        code = (
+            "from stagpy import cli, config\n"
+            f"cli.parse_args(config.Config.default_(), {[cmd]!r})"
+        )
+        cmd_time = cold_start(code, args.repeat)
+        print(f"stagpy {cmd}: {cmd_time:.0f} ms")
+        if cmd_time > args.cmd_budget:
+            failures.append(f"stagpy {cmd} over budget ({args.cmd_budget:.0f} ms)")
+
+    if failures:
+        print(file=sys.stderr)
+        print(*failures, sep="\n", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
+import os
 import re
+import tempfile
+import threading
 import typing
 from abc import ABC, abstractmethod
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import cached_property
 
-from . import parsers, phyvars
+import numpy as np
+
+from . import __version__, parsers, phyvars
+from .datatypes import Rprof, Tseries, Varr, Vart
 from .error import InvalidSnapshotError
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Mapping
+    from collections.abc import Callable, Iterable, Sequence
     from pathlib import Path
 
+    from numpy.typing import NDArray
+
     from .datatypes import Field
     from .stagyydata import StagyyData
 
@@ -68,6 +78,289 @@ class FieldCache:
         assert len(self._stack) == len(self._data)
 
 
+@dataclass(frozen=True)
+class _TableRow:
+    """Row of a table of a `MemoStore`."""
+
+    fingerprint: str
+    columns: list[NDArray[np.float64]]
+    meta: list[str]
+
+
+def _save_npz(path: Path, **arrays: NDArray[typing.Any]) -> None:
+    """Atomically write arrays in a `.npz` file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f"{path.stem}.", suffix=".tmp.npz", delete=False
+    ) as tmp:
+        np.savez(tmp, allow_pickle=False, **arrays)
+    os.replace(tmp.name, path)
+
+
+@dataclass(frozen=True)
+class MemoStore:
+    """Persistent store of computed time series and radial profiles.
+
+    Entries are keyed on the kind and name of the variable, the StagPy
+    version, and the fingerprints (path, size, modification time) of the
+    files they are computed from.  Time series are stored as `.npz` files
+    in `root`.  Radial profiles and ranges of fields, computed for each step
+    of the run identified by `run`, are gathered in one table per variable.
+    New rows of a table are written every `flush_every` rows, and when the
+    interpreter exits.
+    """
+
+    root: Path
+    run: Path
+    flush_every: int = 100
+    _lock: threading.RLock = field(
+        default_factory=threading.RLock, init=False, repr=False, compare=False
+    )
+
+    def _fingerprint(self, tag: str, inputs: Iterable[Path]) -> str:
+        hasher = hashlib.sha256()
+        hasher.update(f"{tag}\0{__version__}\0".encode())
+        for path in sorted(set(inputs)):
+            stat = path.stat()
+            hasher.update(
+                f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}\0".encode()
+            )
+        return hasher.hexdigest()
+
+    def _entry(self, tag: str, inputs: Iterable[Path]) -> Path:
+        return self.root / f"{self._fingerprint(tag, inputs)}.npz"
+
+    @cached_property
+    def _tables(self) -> dict[str, dict[int, _TableRow]]:
+        return {}
+
+    @cached_property
+    def _pending(self) -> dict[str, int]:
+        """Number of rows of each table not written to disk yet."""
+        atexit.register(self.flush)
+        return {}
+
+    def _table_path(self, tag: str) -> Path:
+        digest = hashlib.sha256(f"{tag}\0{self.run.resolve()}".encode())
+        return self.root / f"table-{digest.hexdigest()}.npz"
+
+    def _table(self, tag: str) -> dict[int, _TableRow]:
+        """Rows of a table, read from disk once."""
+        with self._lock:
+            if tag not in self._tables:
+                self._tables[tag] = self._read_table(self._table_path(tag))
+            return self._tables[tag]
+
+    def _read_table(self, path: Path) -> dict[int, _TableRow]:
+        if not path.is_file():
+            return {}
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                ncols = int(npz["ncols"])
+                columns = [
+                    np.split(npz[f"data{icol}"], np.cumsum(npz[f"sizes{icol}"])[:-1])
+                    for icol in range(ncols)
+                ]
+                return {
+                    key: _TableRow(fingerprint, list(cols), meta)
+                    for key, fingerprint, meta, *cols in zip(
+                        npz["keys"].tolist(),
+                        npz["fingerprints"].tolist(),
+                        npz["meta"].tolist(),
+                        *columns,
+                        strict=True,
+                    )
+                }
+        except (OSError, ValueError, KeyError):
+            # corrupted or incompatible table, rows are simply recomputed
+            return {}
+
+    def _write_table(self, tag: str) -> None:
+        table = self._tables[tag]
+        keys = sorted(table)
+        rows = [table[key] for key in keys]
+        ncols = len(rows[0].columns)
+        columns = {}
+        for icol in range(ncols):
+            cols = [row.columns[icol] for row in rows]
+            columns[f"data{icol}"] = np.concatenate(cols)
+            columns[f"sizes{icol}"] = np.array([col.size for col in cols])
+        # concurrent writers may drop rows of each other, which are recomputed
+        _save_npz(
+            self._table_path(tag),
+            keys=np.array(keys, dtype=np.int64),
+            fingerprints=np.array([row.fingerprint for row in rows]),
+            meta=np.array([row.meta for row in rows], dtype=str),
+            ncols=np.array(ncols),
+            **columns,
+        )
+
+    def _table_get(
+        self, tag: str, key: int, inputs: Iterable[Path]
+    ) -> _TableRow | None:
+        row = self._table(tag).get(key)
+        if row is None or row.fingerprint != self._fingerprint(tag, inputs):
+            return None
+        return row
+
+    def _table_put(
+        self,
+        tag: str,
+        key: int,
+        inputs: Iterable[Path],
+        columns: Sequence[NDArray[np.float64]],
+        meta: Sequence[str] = (),
+    ) -> None:
+        row = _TableRow(self._fingerprint(tag, inputs), list(columns), list(meta))
+        with self._lock:
+            self._table(tag)[key] = row
+            self._pending[tag] = self._pending.get(tag, 0) + 1
+            if self._pending[tag] >= self.flush_every:
+                self._write_table(tag)
+                del self._pending[tag]
+
+    def flush(self) -> None:
+        """Write rows of tables that are not on disk yet."""
+        with self._lock:
+            for tag in self._pending:
+                self._write_table(tag)
+            self._pending.clear()
+
+    def _load(
+        self, entry: Path
+    ) -> tuple[NDArray[np.float64], NDArray[np.float64], list[str]] | None:
+        if not entry.is_file():
+            return None
+        try:
+            with np.load(entry, allow_pickle=False) as npz:
+                return npz["values"], npz["coord"], npz["meta"].tolist()
+        except (OSError, ValueError, KeyError):
+            # corrupted or incompatible entry, it is simply recomputed
+            return None
+
+    def _dump(
+        self,
+        entry: Path,
+        values: NDArray[np.float64],
+        coord: NDArray[np.float64],
+        meta: Vart | Varr,
+    ) -> None:
+        _save_npz(
+            entry,
+            values=values,
+            coord=coord,
+            meta=np.array([meta.description, meta.kind, meta.dim]),
+        )
+
+    def tseries(
+        self, name: str, inputs: Iterable[Path], compute: Callable[[], Tseries]
+    ) -> Tseries:
+        """Return a stored time series, compute and store it if needed."""
+        entry = self._entry(f"tseries\0{name}", inputs)
+        stored = self._load(entry)
+        if stored is not None:
+            values, time, meta = stored
+            return Tseries(values, time, Vart(*meta))
+        tseries = compute()
+        self._dump(entry, tseries.values, tseries.time, tseries.meta)
+        return tseries
+
+    def rprof(
+        self,
+        name: str,
+        istep: int,
+        inputs: Iterable[Path],
+        compute: Callable[[], Rprof],
+    ) -> Rprof:
+        """Return a stored radial profile, compute and store it if needed."""
+        inputs = list(inputs)
+        rprof = self.stored_rprof(name, istep, inputs)
+        if rprof is None:
+            rprof = compute()
+            self.store_rprof(name, istep, inputs, rprof)
+        return rprof
+
+    def stored_rprof(
+        self, name: str, istep: int, inputs: Iterable[Path]
+    ) -> Rprof | None:
+        """Return a stored radial profile if available."""
+        stored = self._table_get(f"rprof\0{name}", istep, inputs)
+        if stored is None:
+            return None
+        values, rad = stored.columns
+        return Rprof(values, rad, Varr(*stored.meta))
+
+    def store_rprof(
+        self, name: str, istep: int, inputs: Iterable[Path], rprof: Rprof
+    ) -> None:
+        """Store a radial profile."""
+        meta = rprof.meta
+        self._table_put(
+            f"rprof\0{name}",
+            istep,
+            inputs,
+            [rprof.values, rprof.rad],
+            [meta.description, meta.kind, meta.dim],
+        )
+
+    def field_range(
+        self, name: str, isnap: int, inputs: Iterable[Path]
+    ) -> tuple[float, float] | None:
+        """Return stored min and max values of a field if available."""
+        row = self._table_get(f"range\0{name}", isnap, inputs)
+        if row is None:
+            return None
+        vmin, vmax = row.columns[0].tolist()
+        return vmin, vmax
+
+    def store_field_range(
+        self, name: str, isnap: int, inputs: Iterable[Path], vrange: tuple[float, float]
+    ) -> None:
+        """Store min and max values of a field."""
+        self._table_put(f"range\0{name}", isnap, inputs, [np.array(vrange)])
+
+
+@dataclass(frozen=True)
+class FieldRanges:
+    """Min and max values of fields in each snapshot.
+
+    Ranges are recorded whenever fields are read from disk, and persisted in
+    `memo` if it is not None.
+    """
+
+    memo: MemoStore | None
+
+    @cached_property
+    def _data(self) -> dict[tuple[int, str], tuple[float, float]]:
+        return {}
+
+    def record(
+        self,
+        isnap: int,
+        name: str,
+        inputs: Iterable[Path],
+        values: NDArray[np.floating],
+    ) -> tuple[float, float]:
+        vrange = np.nanmin(values).item(), np.nanmax(values).item()
+        self._data[isnap, name] = vrange
+        if self.memo is not None:
+            self.memo.store_field_range(name, isnap, inputs, vrange)
+        return vrange
+
+    def get(self, isnap: int, name: str) -> tuple[float, float] | None:
+        return self._data.get((isnap, name))
+
+    def load(
+        self, isnap: int, name: str, inputs: Iterable[Path]
+    ) -> tuple[float, float] | None:
+        if self.memo is None:
+            return None
+        vrange = self.memo.field_range(name, isnap, inputs)
+        if vrange is not None:
+            self._data[isnap, name] = vrange
+        return vrange
+
+
 class StepSnap(ABC):
     """Keep track of the step/snap correspondence."""
 
@@ -83,9 +376,20 @@ class StepSnap(ABC):
 
 @dataclass(frozen=True)
 class StepSnapInfo:
-    step_to_snap: Mapping[int, int]
-    snap_to_step: Mapping[int, int]
-    isnap_max: int
+    """Step/snap correspondence as sorted arrays.
+
+    `isnaps` is sorted and `isteps[i]` is the step of snapshot `isnaps[i]`.
+    `order_steps` sorts `isteps` (stable, so that the last snapshot written
+    at a given step wins in lookups).
+    """
+
+    isnaps: NDArray[np.int64]
+    isteps: NDArray[np.int64]
+    order_steps: NDArray[np.intp]
+
+    @cached_property
+    def isteps_sorted(self) -> NDArray[np.int64]:
+        return self.isteps[self.order_steps]
 
 
 @dataclass(frozen=True)
@@ -94,26 +398,30 @@ class StepSnapH5(StepSnap):
 
     @cached_property
     def _info(self) -> StepSnapInfo:
-        isnap = -1
-        step_to_snap = {}
-        snap_to_step = {}
-        for isnap, istep in parsers.h5.extras.isnap_istep(self.timeh5):
-            step_to_snap[istep] = isnap
-            snap_to_step[isnap] = istep
+        isnaps, isteps = parsers.h5.extras.isnap_istep(self.timeh5)
         return StepSnapInfo(
-            step_to_snap=step_to_snap,
-            snap_to_step=snap_to_step,
-            isnap_max=isnap,
+            isnaps=isnaps,
+            isteps=isteps,
+            order_steps=np.argsort(isteps, kind="stable"),
         )
 
     def istep(self, *, isnap: int) -> int | None:
-        return self._info.snap_to_step.get(isnap)
+        isnaps = self._info.isnaps
+        idx = isnaps.searchsorted(isnap)
+        if idx < isnaps.size and isnaps[idx] == isnap:
+            return int(self._info.isteps[idx])
+        return None
 
     def isnap(self, *, istep: int) -> int | None:
-        return self._info.step_to_snap.get(istep)
+        isteps = self._info.isteps_sorted
+        idx = isteps.searchsorted(istep, side="right") - 1
+        if idx >= 0 and isteps[idx] == istep:
+            return int(self._info.isnaps[self._info.order_steps[idx]])
+        return None
 
     def len_snap(self) -> int:
-        return self._info.isnap_max + 1
+        isnaps = self._info.isnaps
+        return int(isnaps[-1]) + 1 if isnaps.size else 0
 
 
 @dataclass(frozen=True)
@@ -3,18 +3,26 @@
 from __future__ import annotations
 
 import typing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from inspect import getdoc
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 if typing.TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from concurrent.futures import Future
+    from typing import TypeVar
+
     from matplotlib.figure import Figure
     from numpy.typing import NDArray
 
     from .config import Config
     from .stagyydata import StagyyData, StepsView
 
+    T = TypeVar("T")
+    R = TypeVar("R")
+
 
 def resize(names: list[str], nnames: int) -> None:
     """Truncate or extend names so that its len is nnames.
@@ -29,6 +37,41 @@ def resize(names: list[str], nnames: int) -> None:
     del names[nnames:]
 
 
+def bounded_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int | None,
+    in_flight: int | None = None,
+) -> Iterator[R]:
+    """Apply a function to items in worker threads, yielding results in order.
+
+    Items are drawn from the iterable in the calling thread, which is where
+    lazy lookups (and thus cache updates) happen.  Only a bounded number of
+    items are processed ahead of the consumer to keep memory usage in check.
+
+    Args:
+        func: function to apply.
+        items: items to process.
+        workers: number of worker threads.  Items are processed in the
+            calling thread if None.
+        in_flight: maximum number of items submitted and not yet consumed.
+            Defaults to the number of workers.
+    """
+    if workers is None:
+        yield from map(func, items)
+        return
+    if in_flight is None:
+        in_flight = workers
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque[Future[R]] = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def walk(sdat: StagyyData, conf: Config) -> StepsView:
     """Return view on configured steps slice."""
     if conf.core.timesteps:
@@ -93,6 +136,8 @@ def saveplot(
         f"{oname}.{conf.plot.format}", format=conf.plot.format, bbox_inches="tight"
     )
     if close:
+        import matplotlib.pyplot as plt
+
         plt.close(fig)
 
 
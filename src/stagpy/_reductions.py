@@ -0,0 +1,145 @@
+"""Streaming reductions of fields over snapshots."""
+
+from __future__ import annotations
+
+import typing
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import error
+from ._helpers import bounded_map
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+    from numpy.typing import NDArray
+
+    from .datatypes import Field
+    from .step import Step
+
+REDUCTIONS = ("mean", "var", "std", "min", "max")
+
+
+@dataclass
+class Moments:
+    """Running statistics, updated with the algorithm of Chan et al.
+
+    Statistics are accumulated in double precision, only one set of arrays
+    the size of the reduced field is kept in memory.  `count` is the total
+    weight of the values accumulated so far.
+    """
+
+    count: float
+    mean: NDArray[np.float64]
+    m2: NDArray[np.float64]
+    vmin: NDArray[np.float64]
+    vmax: NDArray[np.float64]
+
+    @staticmethod
+    def of(values: NDArray[np.floating]) -> Moments:
+        """Statistics of a single set of values."""
+        vals = np.asarray(values, dtype=np.float64)
+        return Moments(
+            count=1.0,
+            mean=vals,
+            m2=np.zeros(vals.shape),
+            vmin=vals,
+            vmax=vals,
+        )
+
+    @staticmethod
+    def weighted(values: NDArray[np.floating], weights: NDArray[np.float64]) -> Moments:
+        """Statistics along the first axis of values, with weights of rows.
+
+        Rows with a null weight are ignored.
+        """
+        vals = np.asarray(values, dtype=np.float64)
+        total = weights.sum()
+        mean = weights @ vals / total
+        dev = vals - mean
+        kept = vals[weights > 0]
+        return Moments(
+            count=float(total),
+            mean=mean,
+            m2=weights @ (dev * dev),
+            vmin=np.fmin.reduce(kept, axis=0),
+            vmax=np.fmax.reduce(kept, axis=0),
+        )
+
+    def merge(self, other: Moments) -> None:
+        """Update statistics with those of another batch."""
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + delta**2 * (self.count * other.count / count)
+        self.count = count
+        self.vmin = np.fmin(self.vmin, other.vmin)
+        self.vmax = np.fmax(self.vmax, other.vmax)
+
+    def result(self, op: str) -> NDArray[np.float64]:
+        """Value of a reduction."""
+        if op == "mean":
+            return self.mean
+        if op == "var":
+            return self.m2 / self.count
+        if op == "std":
+            return np.sqrt(self.m2 / self.count)
+        if op == "min":
+            return self.vmin
+        if op == "max":
+            return self.vmax
+        raise error.UnknownReductionError(op)
+
+
+def _moments(fld: Field, weights: NDArray[np.float64] | None) -> Moments:
+    """Statistics of the field of one snapshot.
+
+    If weights of horizontal cells are given, statistics are computed along
+    the horizontal directions and blocks.
+    """
+    # read bypasses the lazy field memory, the values are dropped afterwards
+    values = fld.read(())
+    if weights is None:
+        return Moments.of(values)
+    nxtot, nytot, nbtot = weights.shape
+    # discard extra points of vector components
+    vals = np.moveaxis(values[:nxtot, :nytot], 2, -1)
+    return Moments.weighted(vals.reshape(weights.size, -1), weights.ravel())
+
+
+def _iter_moments(
+    steps: Iterable[Step], name: str, horizontal: bool, workers: int | None
+) -> Iterator[Moments]:
+    # geometry and field lookups happen in the calling thread
+    items = (
+        (step.fields[name], step.geom.horizontal_areas if horizontal else None)
+        for step in steps
+        if name in step.fields
+    )
+    return bounded_map(lambda item: _moments(*item), items, workers)
+
+
+def fields_reduce(
+    steps: Iterable[Step],
+    name: str,
+    ops: Sequence[str],
+    horizontal: bool,
+    workers: int | None,
+) -> dict[str, NDArray[np.float64]]:
+    """Reduce a field over snapshots in one pass.
+
+    See [`StepsView.fields_reduce`][stagpy.stagyydata.StepsView.fields_reduce].
+    """
+    for op in ops:
+        if op not in REDUCTIONS:
+            raise error.UnknownReductionError(op)
+    acc: Moments | None = None
+    for moments in _iter_moments(steps, name, horizontal, workers):
+        if acc is None:
+            acc = moments
+        else:
+            acc.merge(moments)
+    if acc is None:
+        raise error.MissingDataError(f"No snapshot with field {name}")
+    return {op: acc.result(op) for op in ops}
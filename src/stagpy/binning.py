@@ -0,0 +1,278 @@
+"""Binning of tracers on the grid.
+
+Tracers are located in the cells of the grid described by
+[`Geometry`][stagpy.step.Geometry] with a binary search on the position of
+cell walls, quantities carried by tracers are then accumulated per cell.
+"""
+
+from __future__ import annotations
+
+import typing
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+
+from .datatypes import Field
+from .error import MissingDataError, NotAvailableError
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from numpy.typing import ArrayLike, NDArray
+    from scipy.spatial import cKDTree
+
+    from .step import Geometry, Step
+
+
+def _grid_coords(
+    geom: Geometry,
+    x: NDArray[np.floating],
+    y: NDArray[np.floating],
+    z: NDArray[np.floating],
+) -> tuple[NDArray[np.float64], NDArray[np.float64], NDArray[np.float64]]:
+    """Position of tracers along the directions of the grid."""
+    if geom.cartesian:
+        return x, y, z  # type: ignore
+    if geom.cylindrical:
+        raise NotAvailableError("Binning of tracers not implemented in cylindrical")
+    # tracers positions are cartesian, in the frame of their block
+    rad = np.sqrt(x**2 + y**2 + z**2)
+    cos_colat = np.divide(z, rad, out=np.ones_like(rad), where=rad > 0)
+    if geom.yinyang:
+        theta = np.arcsin(np.clip(cos_colat, -1, 1))  # latitude
+        phi = np.arctan2(y, x)
+    else:
+        theta = np.arccos(np.clip(cos_colat, -1, 1))
+        phi = np.mod(np.arctan2(y, x), 2 * np.pi)
+    return theta, phi, rad
+
+
+def _wall_indices(
+    walls: NDArray[np.float64], coord: NDArray[np.float64]
+) -> NDArray[np.intp]:
+    """Index of the cell containing each coordinate along a direction."""
+    icell = np.searchsorted(walls, coord, side="right") - 1
+    # tracers lying on the domain boundaries belong to the outer cells
+    return np.clip(icell, 0, walls.size - 2)
+
+
+def cell_indices(
+    geom: Geometry,
+    x: NDArray[np.floating],
+    y: NDArray[np.floating],
+    z: NDArray[np.floating],
+    iblock: int = 0,
+) -> NDArray[np.intp]:
+    """Flat index of the cells containing tracers.
+
+    Args:
+        geom: geometry of the grid.
+        x: x position of tracers.
+        y: y position of tracers.
+        z: z position of tracers.
+        iblock: block in which the tracers are.  In curvilinear geometry, the
+            position of tracers is in the cartesian frame of their block.
+
+    Returns:
+        index of cells in fields flattened in (x, y, z, block) order.
+    """
+    coords = _grid_coords(geom, x, y, z)
+    walls = (geom.t_walls, geom.p_walls, geom.r_walls)
+    ix, iy, iz = (_wall_indices(wls, crd) for wls, crd in zip(walls, coords))
+    return ((ix * geom.nptot + iy) * geom.nrtot + iz) * geom.nbtot + iblock
+
+
+def _positions(step: Step) -> list[tuple[NDArray[np.floating], ...]]:
+    """Position of tracers, organized by block."""
+    positions = [step.tracers[coord] for coord in "xyz"]
+    if any(pos is None for pos in positions):
+        raise MissingDataError(f"No tracers position in {step!r}")
+    return list(zip(*typing.cast("list[list[NDArray[np.floating]]]", positions)))
+
+
+def accumulate(
+    step: Step, weights: Sequence[NDArray[np.floating]] | None = None
+) -> NDArray[np.float64]:
+    """Sum of quantities carried by tracers in each cell.
+
+    Args:
+        step: a `Step` of a `StagyyData` instance.
+        weights: quantity carried by each tracer, organized by block as
+            tracers data.  Tracers are counted if None.
+
+    Returns:
+        the sums indexed by x, y, z, and block.
+    """
+    return _accumulate(step, [weights])[0]
+
+
+def _accumulate(
+    step: Step, weights: Sequence[Sequence[NDArray[np.floating]] | None]
+) -> list[NDArray[np.float64]]:
+    """Sums of several quantities, locating tracers in the grid only once."""
+    geom = step.geom
+    shape = (geom.nttot, geom.nptot, geom.nrtot, geom.nbtot)
+    size = int(np.prod(shape))
+    sums = [np.zeros(size) for _ in weights]
+    for iblock, (x, y, z) in enumerate(_positions(step)):
+        icells = cell_indices(geom, x, y, z, iblock)
+        for total, wgts in zip(sums, weights):
+            wgt = None if wgts is None else wgts[iblock]
+            total += np.bincount(icells, weights=wgt, minlength=size)
+    return [total.reshape(shape) for total in sums]
+
+
+def tracers_mean(step: Step, name: str) -> Field:
+    """Mean of a tracers variable in each cell.
+
+    Args:
+        step: a `Step` of a `StagyyData` instance.
+        name: name of the tracers variable, e.g. "Type".
+
+    Returns:
+        the mean in each cell, NaN in cells without tracers.
+    """
+    values = step.tracers[name]
+    if values is None:
+        raise MissingDataError(f"No tracers variable {name} in {step!r}")
+    count, sums = _accumulate(step, [None, values])
+    mean = np.divide(sums, count, out=np.full_like(sums, np.nan), where=count > 0)
+    return Field(mean, f"Mean of tracers {name}", "1")
+
+
+def tracers_count(step: Step) -> Field:
+    """Number of tracers per cell.
+
+    Args:
+        step: a `Step` of a `StagyyData` instance.
+
+    Returns:
+        the number of tracers in each cell.
+    """
+    return Field(accumulate(step), "Number of tracers", "1")
+
+
+def tracers_density(step: Step) -> Field:
+    """Number of tracers per unit volume.
+
+    Args:
+        step: a `Step` of a `StagyyData` instance.
+
+    Returns:
+        the density of tracers in each cell.  It is NaN in cells with a null
+            volume, i.e. yang cells overlapping the yin block.
+    """
+    count = accumulate(step)
+    volumes = step.geom.cell_volumes
+    density = np.divide(
+        count, volumes, out=np.full_like(count, np.nan), where=volumes > 0
+    )
+    return Field(density, "Tracers density", "1")
+
+
+def _concat_ranges(
+    starts: NDArray[np.intp], stops: NDArray[np.intp]
+) -> NDArray[np.intp]:
+    """Concatenation of the ranges between starts and stops."""
+    lengths = stops - starts
+    offsets = np.repeat(stops - np.cumsum(lengths), lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+@dataclass(frozen=True)
+class TracersIndex:
+    """Spatial index of the tracers of a snapshot.
+
+    Tracers are sorted by cell of the grid once, region queries then only
+    inspect the tracers of cells overlapping the region.  The
+    `Tracers.index` attribute of snapshots is an instance of this class.
+
+    Args:
+        step: a `Step` of a `StagyyData` instance.
+    """
+
+    step: Step
+
+    @cached_property
+    def _sorted_cells(self) -> list[tuple[NDArray[np.intp], NDArray[np.intp]]]:
+        """Tracers order by cell, and sorted cells of each block."""
+        geom = self.step.geom
+        sorted_cells = []
+        for x, y, z in _positions(self.step):
+            cells = cell_indices(geom, x, y, z) // geom.nbtot
+            order = np.argsort(cells, kind="stable")
+            sorted_cells.append((order, cells[order]))
+        return sorted_cells
+
+    def in_region(
+        self,
+        x: tuple[float, float] | None = None,
+        y: tuple[float, float] | None = None,
+        z: tuple[float, float] | None = None,
+    ) -> list[NDArray[np.intp]]:
+        """Tracers within a box.
+
+        Bounds are along the directions of the grid, i.e. theta, phi, and r
+        in curvilinear geometry (see [`Geometry`][stagpy.step.Geometry]).
+
+        Args:
+            x: min and max position along x/theta, no bounds if None.
+            y: min and max position along y/phi, no bounds if None.
+            z: min and max position along z/r, no bounds if None.
+
+        Returns:
+            sorted indices of tracers in the box, organized by block.
+        """
+        geom = self.step.geom
+        bounds = (x, y, z)
+        walls = (geom.t_walls, geom.p_walls, geom.r_walls)
+        cell_ranges = []
+        for bnd, wls in zip(bounds, walls):
+            if bnd is None:
+                cell_ranges.append(np.arange(wls.size - 1))
+            else:
+                imin, imax = _wall_indices(wls, np.asarray(bnd, dtype=np.float64))
+                cell_ranges.append(np.arange(imin, imax + 1))
+        it, ip, ir = np.meshgrid(*cell_ranges, indexing="ij")
+        cand_cells = ((it * geom.nptot + ip) * geom.nrtot + ir).ravel()
+        selected = []
+        for (order, cells), pos in zip(self._sorted_cells, _positions(self.step)):
+            starts = np.searchsorted(cells, cand_cells)
+            stops = np.searchsorted(cells, cand_cells, side="right")
+            cand = order[_concat_ranges(starts, stops)]
+            coords = _grid_coords(geom, *(crd[cand] for crd in pos))
+            inside = np.ones(cand.size, dtype=np.bool_)
+            for bnd, crd in zip(bounds, coords):
+                if bnd is not None:
+                    inside &= (crd >= bnd[0]) & (crd <= bnd[1])
+            selected.append(np.sort(cand[inside]))
+        return selected
+
+    @cached_property
+    def _kdtrees(self) -> list[cKDTree]:
+        from scipy.spatial import cKDTree
+
+        return [cKDTree(np.stack(pos, axis=-1)) for pos in _positions(self.step)]
+
+    def nearest(
+        self, point: ArrayLike, k: int = 1, iblock: int = 0
+    ) -> tuple[NDArray[np.float64], NDArray[np.intp]]:
+        """Tracers closest to a point.
+
+        A k-d tree of the position of tracers is built on first call.
+
+        Args:
+            point: x, y, and z position of the point, in the same frame as
+                the position of tracers.
+            k: number of tracers to find.
+            iblock: block of the tracers.
+
+        Returns:
+            the distance to the point and indices of the closest tracers,
+                ordered by distance.
+        """
+        dists, idx = self._kdtrees[iblock].query(
+            np.asarray(point), k=[*range(1, k + 1)]
+        )
+        return dists, idx
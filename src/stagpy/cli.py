@@ -2,35 +2,51 @@
 
 from __future__ import annotations
 
+import importlib
 import importlib.resources as imlr
 import typing
+from dataclasses import dataclass
 from pathlib import Path
 from types import MappingProxyType
 
-import matplotlib.pyplot as plt
-import matplotlib.style as mpls
 from loam.cli import CLIManager, Subcmd
 
 from . import __doc__ as doc_module
-from . import (
-    _styles,
-    commands,
-    field,
-    plates,
-    refstate,
-    rprof,
-    time_series,
-)
-from ._helpers import baredoc
+from . import _styles
 from .config import Config
 
 if typing.TYPE_CHECKING:
     from typing import Callable
 
 
-def _sub(cmd: Callable[[Config], None], *sections: str) -> Subcmd:
-    """Build Subcmd instance."""
-    return Subcmd(baredoc(cmd), *sections, func=cmd)
+@dataclass(frozen=True)
+class _LazyCmd:
+    """Implementation of a subcommand, only imported when it is selected.
+
+    This keeps heavy dependencies such as matplotlib out of the startup of
+    the CLI.
+    """
+
+    module: str
+    func: str
+
+    def load(self) -> Callable[[Config], None]:
+        """Import the function implementing the subcommand."""
+        module = importlib.import_module(f".{self.module}", __package__)
+        return getattr(module, self.func)
+
+
+def _sub(cmd: str, help_msg: str, *sections: str) -> Subcmd:
+    """Build Subcmd instance.
+
+    Args:
+        cmd: implementation of the subcommand, as "module:function".
+        help_msg: short description, the first line of the docstring of the
+            implementation.
+        sections: configuration sections used by the subcommand.
+    """
+    module, func = cmd.split(":")
+    return Subcmd(help_msg, *sections, func=_LazyCmd(module, func))
 
 
 def _bare_cmd(conf: Config) -> None:
@@ -41,6 +57,9 @@ def _bare_cmd(conf: Config) -> None:
 
 def _load_mplstyle(conf: Config) -> None:
     """Try to load conf.plot.mplstyle matplotlib style."""
+    import matplotlib.pyplot as plt
+    import matplotlib.style as mpls
+
     for style in conf.plot.mplstyle:
         # try packaged version
         style_file = imlr.files(_styles).joinpath(f"{style}.mplstyle")
@@ -57,15 +76,24 @@ assert doc_module is not None
 SUB_CMDS = MappingProxyType(
     {
         "common_": Subcmd(doc_module, "common", func=_bare_cmd),
-        "field": _sub(field.cmd, "core", "plot", "scaling"),
-        "rprof": _sub(rprof.cmd, "core", "plot", "scaling"),
-        "time": _sub(time_series.cmd, "core", "plot", "scaling"),
-        "refstate": _sub(refstate.cmd, "core", "plot"),
-        "plates": _sub(plates.cmd, "core", "plot", "scaling"),
-        "info": _sub(commands.info_cmd, "core", "scaling"),
-        "var": _sub(commands.var_cmd),
-        "version": _sub(commands.version_cmd),
-        "config": _sub(commands.config_cmd),
+        "field": _sub(
+            "field:cmd", "Plot scalar and vector fields", "core", "plot", "scaling"
+        ),
+        "rprof": _sub("rprof:cmd", "Plot radial profiles", "core", "plot", "scaling"),
+        "time": _sub("time_series:cmd", "Plot time series", "core", "plot", "scaling"),
+        "refstate": _sub(
+            "refstate:cmd", "Plot reference state profiles", "core", "plot"
+        ),
+        "plates": _sub("plates:cmd", "Plate analysis", "core", "plot", "scaling"),
+        "info": _sub(
+            "commands:info_cmd",
+            "Print basic information about StagYY run",
+            "core",
+            "scaling",
+        ),
+        "var": _sub("commands:var_cmd", "Print a list of available variables"),
+        "version": _sub("commands:version_cmd", "Print StagPy version"),
+        "config": _sub("commands:config_cmd", "Configuration handling"),
     }
 )
 
@@ -104,13 +132,20 @@ def parse_args(
 
     cmd_args = climan.parse_args(arglist)
     sub_cmd = cmd_args.loam_sub_name
+    func = cmd_args.func
+    if isinstance(func, _LazyCmd):
+        func = func.load()
 
     if sub_cmd is None:
-        return cmd_args.func
+        return func
 
+    sections = climan.sections_list(sub_cmd)
     if conf.common.config:
-        commands.config_pp(climan.sections_list(sub_cmd), conf)
+        from . import commands
+
+        commands.config_pp(sections, conf)
 
-    _load_mplstyle(conf)
+    if "plot" in sections:
+        _load_mplstyle(conf)
 
-    return cmd_args.func
+    return func
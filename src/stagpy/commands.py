@@ -6,11 +6,6 @@ import typing
 from dataclasses import fields
 from textwrap import indent
 
-from rich import box
-from rich.columns import Columns
-from rich.console import Console
-from rich.table import Table
-
 from . import __version__, phyvars
 from ._helpers import baredoc, walk
 from .config import CONFIG_LOCAL, Config
@@ -21,6 +16,7 @@ if typing.TYPE_CHECKING:
     from typing import Callable
 
     from loam.base import Section
+    from rich.columns import Columns
 
     from .datatypes import Field, Rprof, Tseries, Varf, Varr, Vart
     from .step import Step
@@ -64,6 +60,8 @@ def _layout(
     ],
 ) -> Columns:
     """Print nicely [(var, description)] from phyvars."""
+    from rich.columns import Columns
+
     desc = [(v, m.description) for v, m in dict_vars.items()]
     desc.extend((v, baredoc(m)) for v, m in dict_vars_extra.items())
     return Columns(
@@ -79,6 +77,8 @@ def var_cmd(conf: Config) -> None:
     See [stagpy.phyvars][] where the lists of variables organized by command
     are defined.
     """
+    from rich.console import Console
+
     console = Console()
     print_all = not any(getattr(conf.var, fld.name) for fld in fields(conf.var))
     if print_all or conf.var.field:
@@ -118,6 +118,10 @@ def config_pp(subs: Iterable[str], conf: Config) -> None:
         subs: conf sections to print.
         conf: configuration.
     """
+    from rich import box
+    from rich.console import Console
+    from rich.table import Table
+
     console = Console()
     for sub in subs:
         table = Table(title=sub, box=box.SIMPLE)
@@ -22,6 +22,21 @@ _plots = TupleEntry.wrapping(
     TupleEntry.wrapping(TupleEntry(str), str_sep="."), str_sep="-"
 )
 
+_memo_dir: Path | None = MaybeEntry(Path, str).entry(
+    doc="directory where computed series and profiles are persisted"
+)
+_cmap: Dict[str, str] = entry(
+    val_factory=lambda: {
+        "T": "RdBu_r",
+        "eta": "viridis_r",
+        "rho": "RdBu",
+        "sII": "plasma_r",
+        "edot": "Reds",
+    },
+    in_cli=False,
+    doc="custom colormaps",
+)
+
 CONFIG_LOCAL = Path(".stagpy.toml")
 """Path of local configuration file."""
 
@@ -41,6 +56,7 @@ class Core(Section):
         path=".", cli_short="p", doc="path of StagYY run directory or par file"
     )
     read_parameters_dat: bool = switch_opt(True, None, "enable reading parameters.dat")
+    memo_dir: Path | None = _memo_dir
     outname: str = entry(val="stagpy", cli_short="n", doc="output file name prefix")
     shortname: bool = switch_opt(False, None, "output file name is only prefix")
     timesteps: Sequence[int | slice] = _indices.entry(
@@ -104,6 +120,9 @@ class FieldSec(Section):
     )
     timelabel: bool = switch_opt(False, None, "add label with time")
     colorbar: bool = switch_opt(True, None, "add color bar to plot")
+    fast: bool = switch_opt(False, None, "fast raster rendering, without pyplot")
+    movie: bool = command_flag("encode snapshots in a movie with ffmpeg")
+    fps: float = entry(val=10.0, doc="frame rate of movies")
     ix: int | None = MaybeEntry(int).entry(
         doc="x-index of slice for 3D fields", in_file=False
     )
@@ -114,17 +133,7 @@ class FieldSec(Section):
         doc="z-index of slice for 3D fields", in_file=False
     )
     isocolors: Sequence[str] = TupleEntry(str).entry(doc="list of colors for isolines")
-    cmap: Dict[str, str] = entry(
-        val_factory=lambda: {
-            "T": "RdBu_r",
-            "eta": "viridis_r",
-            "rho": "RdBu",
-            "sII": "plasma_r",
-            "edot": "Reds",
-        },
-        in_cli=False,
-        doc="custom colormaps",
-    )
+    cmap: Dict[str, str] = _cmap
 
 
 @dataclass
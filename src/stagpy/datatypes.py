@@ -4,12 +4,17 @@ from __future__ import annotations
 
 import typing
 from dataclasses import dataclass
+from functools import cached_property
 
 import numpy as np
 
 if typing.TYPE_CHECKING:
+    from collections.abc import Callable
+
     from numpy.typing import NDArray
 
+    from .parsers._index import FieldIndex
+
 
 @dataclass(frozen=True)
 class Varf:
@@ -29,13 +34,88 @@ class Varf:
 class Field:
     """Scalar field and associated metadata."""
 
-    values: NDArray[np.float64]
+    values: NDArray[np.floating]
     """values of field."""
     description: str
     """description of field variable."""
     dim: str
     """dimension used to scale to dimensional values."""
 
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """shape of field values."""
+        return self.values.shape
+
+    @property
+    def loaded(self) -> bool:
+        """whether field values are in memory."""
+        return True
+
+    def read(self, index: FieldIndex) -> NDArray[np.floating]:
+        """Values of the field at the given index.
+
+        This is equivalent to `field.values[index]`, but avoids reading the
+        whole field from disk when possible.
+        """
+        return self.values[index]
+
+
+class LazyField(Field):
+    """Field whose values are only read when needed.
+
+    The metadata and shape of the field are available without reading data.
+    Values are read from disk on first access to `values`.  Before that,
+    `read` only reads the part of the data needed to fulfill the request.
+
+    Args:
+        loader: function reading the values of the field at a given index, or
+            all of them if the index is None.
+        shape: shape of field values.
+        description: description of field variable.
+        dim: dimension used to scale to dimensional values.
+    """
+
+    _loader: Callable[[FieldIndex | None], NDArray[np.floating]]
+    _shape: tuple[int, ...]
+
+    def __init__(
+        self,
+        loader: Callable[[FieldIndex | None], NDArray[np.floating]],
+        shape: tuple[int, ...],
+        description: str,
+        dim: str,
+    ):
+        object.__setattr__(self, "_loader", loader)
+        object.__setattr__(self, "_shape", shape)
+        object.__setattr__(self, "description", description)
+        object.__setattr__(self, "dim", dim)
+
+    @cached_property
+    def values(self) -> NDArray[np.floating]:  # type: ignore[override]
+        """values of field."""
+        return self._loader(None)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """shape of field values."""
+        return self._shape
+
+    @property
+    def loaded(self) -> bool:
+        """whether field values are in memory."""
+        return "values" in self.__dict__
+
+    def read(self, index: FieldIndex) -> NDArray[np.floating]:
+        if self.loaded:
+            return self.values[index]
+        return self._loader(index)
+
+    def __repr__(self) -> str:
+        return (
+            f"LazyField(shape={self.shape}, description={self.description!r}, "
+            f"dim={self.dim!r})"
+        )
+
 
 @dataclass(frozen=True)
 class Varr:
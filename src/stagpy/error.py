@@ -108,6 +108,13 @@ class InvalidZoomError(StagpyError):
     zoom: float
 
 
+@dataclass
+class UnknownReductionError(StagpyError):
+    """Raised when invalid reduction of fields is requested."""
+
+    op: str
+
+
 class MissingDataError(StagpyError):
     """Raised when requested data is not present in output."""
 
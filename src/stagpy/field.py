@@ -2,33 +2,44 @@
 
 from __future__ import annotations
 
+import shutil
+import subprocess
 import typing
+from contextlib import suppress
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from itertools import chain
 
 import matplotlib.colors as mpl_colors
 import matplotlib.patches as mpat
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.cm import ScalarMappable
+from matplotlib.figure import Figure
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 from stagpy.dimensions import apply_factors
 
 from . import _helpers, phyvars
 from .config import Config
-from .error import NotAvailableError
+from .error import NotAvailableError, StagpyError
 from .stagyydata import _sdat_from_conf
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Collection, Iterable, Iterator, Mapping, Sequence
     from typing import Any
 
     from matplotlib.axes import Axes
     from matplotlib.collections import QuadMesh
     from matplotlib.colorbar import Colorbar
-    from matplotlib.figure import Figure
+    from matplotlib.contour import ContourSet
+    from matplotlib.image import AxesImage
+    from matplotlib.quiver import Quiver
+    from matplotlib.text import Text
     from numpy.typing import NDArray
 
+    from .datatypes import Field
     from .stagyydata import StepsView
     from .step import Step
 
@@ -66,15 +77,16 @@ def _threed_extract(
         xcoord = step.geom.x_walls if hwalls else step.geom.x_centers
         ycoord = step.geom.y_walls if hwalls else step.geom.y_centers
         i_x = i_y = slice(None)
+        assert i_z is not None
         varx, vary = var + "1", var + "2"
     data: Any
     if is_vector:
         data = (
-            step.fields[varx].values[i_x, i_y, i_z, 0],
-            step.fields[vary].values[i_x, i_y, i_z, 0],
+            step.fields[varx].read((i_x, i_y, i_z, 0)),
+            step.fields[vary].read((i_x, i_y, i_z, 0)),
         )
     else:
-        data = step.fields[var].values[i_x, i_y, i_z, 0]
+        data = step.fields[var].read((i_x, i_y, i_z, 0))
     return (xcoord, ycoord), data
 
 
@@ -95,7 +107,7 @@ def valid_field_var(var: str) -> bool:
 class FieldOn2dMesh:
     xmesh: NDArray[np.float64]
     ymesh: NDArray[np.float64]
-    values: NDArray[np.float64]
+    values: NDArray[np.floating]
     description: str
     dim: str
 
@@ -117,11 +129,7 @@ def get_meshes_fld(
         The field along with a 2D mesh for plotting purposes.
     """
     fld = step.fields[var]
-    hwalls = (
-        walls
-        or fld.values.shape[0] != step.geom.nxtot
-        or fld.values.shape[1] != step.geom.nytot
-    )
+    hwalls = walls or fld.shape[0] != step.geom.nxtot or fld.shape[1] != step.geom.nytot
 
     if step.geom.curvilinear:
         if step.geom.twod_yz:
@@ -152,7 +160,7 @@ def get_meshes_fld(
 def get_meshes_vec(
     conf: Config, step: Step, var: str
 ) -> tuple[
-    NDArray[np.float64], NDArray[np.float64], NDArray[np.float64], NDArray[np.float64]
+    NDArray[np.float64], NDArray[np.float64], NDArray[np.floating], NDArray[np.floating]
 ]:
     """Return vector field components along with coordinates meshes.
 
@@ -199,6 +207,26 @@ def get_meshes_vec(
     return xmesh, ymesh, vec1, vec2
 
 
+def _scalar_on_cells(
+    conf: Config, step: Step, var: str, field: NDArray[np.float64] | None
+) -> tuple[FieldOn2dMesh, NDArray[np.floating]]:
+    """Mesh of cell walls and values of a scalar field at cell centers."""
+    f2d = get_meshes_fld(conf, step, var, walls=True)
+    fld = f2d.values
+    # interpolate at cell centers, this should be abstracted by field objects
+    # via an "at_cell_centers" method or similar
+    if fld.shape[0] > max(step.geom.nxtot, step.geom.nytot):
+        fld = (fld[:-1] + fld[1:]) / 2
+
+    if field is not None:
+        fld = field
+    if conf.field.perturbation:
+        fld = fld - np.mean(fld, axis=0)
+    if conf.field.shift:
+        fld = np.roll(fld, conf.field.shift, axis=0)
+    return f2d, fld
+
+
 def plot_scalar(
     step: Step,
     var: str,
@@ -231,23 +259,10 @@ def plot_scalar(
     if step.geom.threed and step.geom.spherical:
         raise NotAvailableError("plot_scalar not implemented for 3D spherical geometry")
 
-    f2d = get_meshes_fld(conf, step, var, walls=True)
-    fld = f2d.values
-    # interpolate at cell centers, this should be abstracted by field objects
-    # via an "at_cell_centers" method or similar
-    if fld.shape[0] > max(step.geom.nxtot, step.geom.nytot):
-        fld: NDArray[np.float64] = (fld[:-1] + fld[1:]) / 2  # type: ignore
-
+    f2d, fld = _scalar_on_cells(conf, step, var, field)
     xmin, xmax = f2d.xmesh.min(), f2d.xmesh.max()
     ymin, ymax = f2d.ymesh.min(), f2d.ymesh.max()
 
-    if field is not None:
-        fld = field
-    if conf.field.perturbation:
-        fld = fld - np.mean(fld, axis=0)
-    if conf.field.shift:
-        fld = np.roll(fld, conf.field.shift, axis=0)
-
     if axis is None:
         fig, axis = plt.subplots(ncols=1)
     else:
@@ -300,7 +315,7 @@ def plot_iso(
     field: NDArray[np.float64] | None = None,
     conf: Config | None = None,
     **extra: Any,
-) -> None:
+) -> ContourSet:
     """Plot isocontours of scalar field.
 
     Args:
@@ -312,6 +327,9 @@ def plot_iso(
             useful to plot a masked or rescaled array.
         conf: configuration.
         extra: options that will be passed on to `Axes.contour`.
+
+    Returns:
+        the isocontours returned by `Axes.contour`.
     """
     if conf is None:
         conf = Config.default_()
@@ -331,7 +349,7 @@ def plot_iso(
     if conf.plot.isolines:
         extra_opts["levels"] = sorted(conf.plot.isolines)
     extra_opts.update(extra)
-    axis.contour(f2d.xmesh, f2d.ymesh, fld, **extra_opts)
+    return axis.contour(f2d.xmesh, f2d.ymesh, fld, **extra_opts)
 
 
 def plot_vec(
@@ -351,6 +369,15 @@ def plot_vec(
     """
     if conf is None:
         conf = Config.default_()
+    axis.quiver(*_vec_samples(conf, step, var), linewidths=1)
+
+
+def _vec_samples(
+    conf: Config, step: Step, var: str
+) -> tuple[
+    NDArray[np.float64], NDArray[np.float64], NDArray[np.floating], NDArray[np.floating]
+]:
+    """Position and components of the arrows representing a vector field."""
     xmesh, ymesh, vec1, vec2 = get_meshes_vec(conf, step, var)
     dipz = step.geom.nztot // 10
     if conf.field.shift:
@@ -361,32 +388,385 @@ def plot_vec(
     else:
         dipx = step.geom.nytot if step.geom.twod_yz else step.geom.nxtot
         dipx = int(dipx // 10 * conf.plot.ratio) + 1
-    axis.quiver(
+    return (
         xmesh[::dipx, ::dipz],
         ymesh[::dipx, ::dipz],
         vec1[::dipx, ::dipz],
         vec2[::dipx, ::dipz],
-        linewidths=1,
     )
 
 
+_RASTER_FORMATS = ("png", "jpg", "jpeg", "tif", "tiff", "webp")
+
+
+@lru_cache(maxsize=8)
+def _pixel_cells(
+    h_walls: tuple[float, ...],
+    v_walls: tuple[float, ...],
+    polar: bool,
+    extent: tuple[float, float, float, float],
+    shape: tuple[int, int],
+) -> NDArray[np.intp]:
+    """Cell containing the center of each pixel of an image, -1 outside."""
+    hwls = np.array(h_walls)
+    vwls = np.array(v_walls)
+    xmin, xmax, ymin, ymax = extent
+    nrows, ncols = shape
+    xpix = xmin + (np.arange(ncols) + 0.5) * (xmax - xmin) / ncols
+    ypix = ymin + (np.arange(nrows) + 0.5) * (ymax - ymin) / nrows
+    xpix, ypix = np.meshgrid(xpix, ypix)
+    if polar:
+        hcoord = np.mod(np.arctan2(ypix, xpix) - hwls[0], 2 * np.pi) + hwls[0]
+        vcoord = np.hypot(xpix, ypix)
+    else:
+        hcoord, vcoord = xpix, ypix
+    ih = np.searchsorted(hwls, hcoord, side="right") - 1
+    iv = np.searchsorted(vwls, vcoord, side="right") - 1
+    inside = (ih >= 0) & (ih < hwls.size - 1) & (iv >= 0) & (iv < vwls.size - 1)
+    cells = np.where(inside, ih * (vwls.size - 1) + iv, -1)
+    cells.flags.writeable = False
+    return cells
+
+
+def _time_label(conf: Config, step: Step) -> str:
+    time = step.time
+    unit = ""
+    if step.sdat.par.get("switches", "dimensional_units", True):
+        time, unit = apply_factors(time, "s", conf.scaling)
+        unit = " " + unit
+    return f"$t={_helpers.scilabel(time)}${unit}"
+
+
+@dataclass
+class _RasterPanel:
+    """Artists of a subplot of a `FieldRaster`, updated at each snapshot."""
+
+    axis: Axes
+    image: AxesImage
+    colors: ScalarMappable
+    h_walls: tuple[float, ...]
+    v_walls: tuple[float, ...]
+    polar: bool
+    extent: tuple[float, float, float, float]
+    shape: tuple[int, int]
+    quiver: Quiver | None
+    isolines: ContourSet | None
+
+    def clear(self) -> None:
+        """Hide the field and its overlays."""
+        self.image.set_visible(False)
+        if self.quiver is not None:
+            self.quiver.set_visible(False)
+        if self.isolines is not None:
+            self.isolines.remove()
+            self.isolines = None
+
+    def fit_to_axis(self) -> None:
+        """Match the number of pixels of the image with the axis."""
+        self.axis.apply_aspect()
+        bbox = self.axis.get_window_extent()
+        self.shape = (max(1, round(bbox.height)), max(1, round(bbox.width)))
+
+    def draw_field(
+        self, fld: NDArray[np.floating], vmin: float | None, vmax: float | None
+    ) -> None:
+        """Colour the pixels of the image with the values of a field."""
+        if fld.shape != (len(self.h_walls) - 1, len(self.v_walls) - 1):
+            raise NotAvailableError("Fast rendering of cell-centered fields only")
+        self.colors.set_clim(
+            fld.min() if vmin is None else vmin, fld.max() if vmax is None else vmax
+        )
+        # colours are computed per cell, the last one is for pixels outside
+        # of the domain
+        cell_colors = np.zeros((fld.size + 1, 4), dtype=np.uint8)
+        cell_colors[:-1] = self.colors.to_rgba(fld.ravel(), bytes=True)
+        cells = _pixel_cells(
+            self.h_walls, self.v_walls, self.polar, self.extent, self.shape
+        )
+        self.image.set_data(cell_colors[cells])
+        self.image.set_visible(True)
+
+
+@dataclass(frozen=True)
+class FieldRaster:
+    """Fast raster rendering of fields of successive snapshots.
+
+    The figure is drawn on an Agg canvas, without going through pyplot.
+    Scalar fields are coloured cell by cell, and the image of each subplot
+    is then filled with a lookup table from pixels to cells built once per
+    geometry.  Artists are created with the first snapshot, only their data
+    is updated for the following ones.
+
+    Args:
+        conf: configuration.
+        vfig: variables of each subplot, a scalar field optionally followed
+            by a field to overlay as isolines or arrows (see `conf.field.plot`).
+        minmax: constant range of values of some scalar fields.
+        dpi: resolution of the figure.
+    """
+
+    conf: Config
+    vfig: Sequence[Sequence[str]]
+    minmax: Mapping[str, tuple[float, float]] | None = None
+    dpi: float = 100.0
+
+    @cached_property
+    def fig(self) -> Figure:
+        """The figure, with one subplot per scalar field."""
+        fig = Figure(figsize=(6 * len(self.vfig), 6), dpi=self.dpi)
+        FigureCanvasAgg(fig)
+        fig.subplots(ncols=len(self.vfig), squeeze=False)
+        return fig
+
+    @cached_property
+    def _panels(self) -> list[_RasterPanel | None]:
+        return [None] * len(self.vfig)
+
+    @cached_property
+    def _time_text(self) -> Text:
+        axis = self.fig.axes[0]
+        return axis.text(0.02, 1.02, "", transform=axis.transAxes)
+
+    def _limits(self, var: str) -> tuple[float | None, float | None]:
+        if self.minmax is not None and var in self.minmax:
+            return self.minmax[var]
+        return self.conf.plot.vmin, self.conf.plot.vmax
+
+    def _new_panel(
+        self, axis: Axes, step: Step, var: str, f2d: FieldOn2dMesh
+    ) -> _RasterPanel:
+        conf = self.conf
+        polar = step.geom.curvilinear
+        if polar:
+            v_walls = np.hypot(f2d.xmesh[0], f2d.ymesh[0])
+            h_walls = np.unwrap(np.arctan2(f2d.ymesh[:, 0], f2d.xmesh[:, 0]))
+        else:
+            h_walls, v_walls = f2d.xmesh[:, 0], f2d.ymesh[0]
+        extent = (
+            float(f2d.xmesh.min()),
+            float(f2d.xmesh.max()),
+            float(f2d.ymesh.min()),
+            float(f2d.ymesh.max()),
+        )
+        norm = mpl_colors.LogNorm() if var == "eta" else mpl_colors.Normalize()
+        colors = ScalarMappable(norm=norm, cmap=conf.field.cmap.get(var))
+        image = axis.imshow(
+            np.zeros((1, 1, 4), dtype=np.uint8),
+            extent=extent,
+            origin="lower",
+            interpolation="nearest",
+            aspect="auto",
+        )
+        if conf.field.colorbar:
+            cax = make_axes_locatable(axis).append_axes("right", size="3%", pad=0.15)
+            cbar = self.fig.colorbar(colors, cax=cax)
+            cbar.set_label(
+                f2d.description + (" pert." if conf.field.perturbation else "")
+            )
+        if polar or conf.plot.ratio is None:
+            axis.set_aspect("equal")
+            axis.set_axis_off()
+        else:
+            axis.set_aspect(conf.plot.ratio / axis.get_data_ratio())
+        axis.set_adjustable("box")
+        return _RasterPanel(
+            axis=axis,
+            image=image,
+            colors=colors,
+            h_walls=tuple(h_walls.tolist()),
+            v_walls=tuple(v_walls.tolist()),
+            polar=polar,
+            extent=extent,
+            shape=(1, 1),
+            quiver=None,
+            isolines=None,
+        )
+
+    def _draw_overlay(self, panel: _RasterPanel, step: Step, var: str) -> None:
+        axis = panel.axis
+        if valid_field_var(var):
+            # isolines change topology from one snapshot to the other
+            panel.isolines = plot_iso(axis, step, var, conf=self.conf)
+        elif valid_field_var(var + "1"):
+            xpos, ypos, vec1, vec2 = _vec_samples(self.conf, step, var)
+            if panel.quiver is None:
+                panel.quiver = axis.quiver(xpos, ypos, vec1, vec2, linewidths=1)
+            else:
+                panel.quiver.set_UVC(vec1, vec2)
+                panel.quiver.set_visible(True)
+
+    def update(self, step: Step) -> None:
+        """Update the figure with the fields of a snapshot.
+
+        Args:
+            step: a `Step` of a `StagyyData` instance.
+        """
+        scalars = {}
+        new_panels = False
+        for ipanel, vars_ in enumerate(self.vfig):
+            panel = self._panels[ipanel]
+            if vars_[0] not in step.fields:
+                print(f"{vars_[0]!r} field on snap {step.isnap} not found")
+                if panel is not None:
+                    panel.clear()
+                continue
+            f2d, scalars[ipanel] = _scalar_on_cells(self.conf, step, vars_[0], None)
+            if panel is None:
+                axis = self.fig.axes[ipanel]
+                self._panels[ipanel] = self._new_panel(axis, step, vars_[0], f2d)
+                new_panels = True
+        if self.conf.field.timelabel:
+            self._time_text.set_text(_time_label(self.conf, step))
+        if new_panels:
+            self.fig.tight_layout(w_pad=3)
+            for panel in self._panels:
+                if panel is not None:
+                    panel.fit_to_axis()
+        for ipanel, fld in scalars.items():
+            vars_ = self.vfig[ipanel]
+            panel = self._panels[ipanel]
+            assert panel is not None
+            panel.clear()
+            panel.draw_field(fld, *self._limits(vars_[0]))
+            if len(vars_) == 2:
+                self._draw_overlay(panel, step, vars_[1])
+
+    def rgba(self) -> NDArray[np.uint8]:
+        """Draw the figure and return its pixels.
+
+        Returns:
+            the RGBA image of the figure, as a view on the canvas buffer.
+        """
+        canvas = typing.cast("FigureCanvasAgg", self.fig.canvas)
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba())
+
+    def save(self, fname: str) -> None:
+        """Draw the figure and save it in a raster format.
+
+        Args:
+            fname: name of the output file, its extension sets the format.
+        """
+        # favour speed over size, compression is costly at movie frame rates
+        pil_kwargs = {"compress_level": 1} if fname.endswith(".png") else None
+        self.fig.savefig(fname, dpi=self.dpi, pil_kwargs=pil_kwargs)
+
+
 def _findminmax(view: StepsView, sovs: Iterable[str]) -> dict[str, tuple[float, float]]:
     """Find min and max values of several fields."""
     minmax: dict[str, tuple[float, float]] = {}
     for step in view.filter(snap=True):
         for var in sovs:
-            if var in step.fields:
-                vals = step.fields[var].values
-                if var in minmax:
-                    minmax[var] = (
-                        min(minmax[var][0], np.nanmin(vals).item()),
-                        max(minmax[var][1], np.nanmax(vals).item()),
-                    )
-                else:
-                    minmax[var] = np.nanmin(vals).item(), np.nanmax(vals).item()
+            if var not in step.fields:
+                continue
+            vmin, vmax = step.fields._value_range(var)
+            if var in minmax:
+                vmin = min(minmax[var][0], vmin)
+                vmax = max(minmax[var][1], vmax)
+            minmax[var] = vmin, vmax
     return minmax
 
 
+def _overlaid_fields(vfig: Sequence[Sequence[str]]) -> list[str]:
+    """Names of the fields needed to draw a figure."""
+    names = []
+    for vars_ in vfig:
+        names.append(vars_[0])
+        if len(vars_) == 2:
+            if valid_field_var(vars_[1]):
+                names.append(vars_[1])
+            else:
+                names.extend(vars_[1] + comp for comp in "123")
+    return names
+
+
+def _prefetched(
+    steps: Iterable[Step], names: Collection[str], depth: int = 2
+) -> Iterator[Step]:
+    """Iterate through snapshots, reading fields of the next ones meanwhile."""
+
+    def load(item: tuple[Step, list[Field]]) -> Step:
+        step, flds = item
+        for fld in flds:
+            # lazy fields keep their values once read
+            _ = fld.values
+        return step
+
+    items = (
+        (step, [step.fields[name] for name in names if name in step.fields])
+        for step in steps
+    )
+    return _helpers.bounded_map(load, items, workers=1, in_flight=depth + 1)
+
+
+def _ffmpeg(
+    ffmpeg: str, fname: str, frame_shape: tuple[int, ...], fps: float
+) -> subprocess.Popen[bytes]:
+    """Encoder process reading RGBA frames from its standard input."""
+    height, width = frame_shape[:2]
+    return subprocess.Popen(
+        [
+            ffmpeg,
+            *("-y", "-loglevel", "error"),
+            *("-f", "rawvideo", "-pix_fmt", "rgba"),
+            *("-s", f"{width}x{height}", "-r", str(fps), "-i", "-"),
+            # yuv420p requires even dimensions
+            *("-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2:color=white"),
+            *("-pix_fmt", "yuv420p", fname),
+        ],
+        stdin=subprocess.PIPE,
+    )
+
+
+def _ffmpeg_wait(encoder: subprocess.Popen[bytes]) -> int:
+    """Close the input of an encoder and return its exit status."""
+    assert encoder.stdin is not None
+    with suppress(BrokenPipeError):
+        encoder.stdin.close()
+    return encoder.wait()
+
+
+def _raster_cmd(
+    conf: Config,
+    view: StepsView,
+    lovs: Sequence[Sequence[Sequence[str]]],
+    minmax: Mapping[str, tuple[float, float]],
+) -> None:
+    """Render snapshots with figures reused from one snapshot to the next."""
+    fmt = conf.plot.format if conf.plot.format in _RASTER_FORMATS else "png"
+    ffmpeg = shutil.which("ffmpeg") if conf.field.movie else None
+    if conf.field.movie and ffmpeg is None:
+        print("ffmpeg not found, movie frames are saved as png images")
+        fmt = "png"
+    rasters = [FieldRaster(conf, vfig, minmax) for vfig in lovs]
+    stems = ["_".join(chain.from_iterable(vfig)) for vfig in lovs]
+    names = set(chain.from_iterable(_overlaid_fields(vfig) for vfig in lovs))
+    encoders: dict[str, subprocess.Popen[bytes]] = {}
+    try:
+        for step in _prefetched(view.filter(snap=True), names):
+            for raster, stem in zip(rasters, stems):
+                raster.update(step)
+                if ffmpeg is None:
+                    raster.save(f"{_helpers.out_name(conf, stem, step.isnap)}.{fmt}")
+                    continue
+                frame = raster.rgba()
+                oname = f"{_helpers.out_name(conf, stem)}.mp4"
+                if oname not in encoders:
+                    encoders[oname] = _ffmpeg(
+                        ffmpeg, oname, frame.shape, conf.field.fps
+                    )
+                encoder = encoders[oname]
+                assert encoder.stdin is not None
+                try:
+                    encoder.stdin.write(frame.tobytes())
+                except BrokenPipeError as err:
+                    raise StagpyError(f"ffmpeg failed to encode {oname}") from err
+    finally:
+        failed = [oname for oname, encoder in encoders.items() if _ffmpeg_wait(encoder)]
+    if failed:
+        raise StagpyError(f"ffmpeg failed to encode {', '.join(failed)}")
+
+
 def cmd(conf: Config) -> None:
     """Plot scalar and vector fields.
 
@@ -402,6 +782,9 @@ def cmd(conf: Config) -> None:
         conf.plot.vmax = None
         sovs = set(slov[0] for plov in lovs for slov in plov)
         minmax = _findminmax(view, sovs)
+    if conf.field.fast or conf.field.movie:
+        _raster_cmd(conf, view, lovs, minmax)
+        return
     for step in view.filter(snap=True):
         for vfig in lovs:
             fig, axes = plt.subplots(
@@ -421,14 +804,11 @@ def cmd(conf: Config) -> None:
                     elif valid_field_var(var[1] + "1"):
                         plot_vec(axis, step, var[1], conf=conf)
             if conf.field.timelabel:
-                time = step.time
-                unit = ""
-                if sdat.par.get("switches", "dimensional_units", True):
-                    time, unit = apply_factors(time, "s", conf.scaling)
-                    unit = " " + unit
-                time_str = _helpers.scilabel(time)
                 axes[0, 0].text(
-                    0.02, 1.02, f"$t={time_str}${unit}", transform=axes[0, 0].transAxes
+                    0.02,
+                    1.02,
+                    _time_label(conf, step),
+                    transform=axes[0, 0].transAxes,
                 )
             oname = "_".join(chain.from_iterable(vfig))
             plt.tight_layout(w_pad=3)
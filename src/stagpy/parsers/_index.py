@@ -0,0 +1,49 @@
+"""Selection of the parts of field files that need to be read."""
+
+from __future__ import annotations
+
+import typing
+
+import numpy as np
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Any, TypeAlias
+
+    from numpy.typing import NDArray
+
+    FieldIndex: TypeAlias = tuple[int | slice | NDArray[np.integer[Any]], ...]
+
+
+def needed_points(
+    index: FieldIndex | None, shape: Sequence[int]
+) -> list[NDArray[np.bool_]]:
+    """Points needed along each direction to extract a part of a field.
+
+    Args:
+        index: index along (x, y, z, block) directions.  None selects the
+            whole field.  Arrays of indices select several points.
+        shape: number of points along those directions.
+
+    Returns:
+        masks of needed points along each direction.
+    """
+    masks = []
+    for idir, npts in enumerate(shape):
+        mask = np.zeros(npts, dtype=np.bool_)
+        if index is None or idir >= len(index):
+            mask[:] = True
+        else:
+            mask[index[idir]] = True
+        masks.append(mask)
+    return masks
+
+
+def overlaps(masks: Sequence[NDArray[np.bool_]], bounds: Sequence[range]) -> bool:
+    """Whether a subdomain contains needed points.
+
+    Args:
+        masks: needed points along each direction, see `needed_points`.
+        bounds: range of points covered by the subdomain along each direction.
+    """
+    return all(mask[bnd.start : bnd.stop].any() for mask, bnd in zip(masks, bounds))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 import typing
 from dataclasses import dataclass
 
@@ -39,3 +40,6 @@ class Cursor:
 
     def floats(self, count: int | np.integer) -> NDArray[np.floating]:
         return np.fromfile(self.fid, self.float_type, count)
+
+    def skip_floats(self, count: int | np.integer) -> None:
+        self.fid.seek(int(count) * np.dtype(self.float_type).itemsize, os.SEEK_CUR)
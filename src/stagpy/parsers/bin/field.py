@@ -9,13 +9,17 @@ from itertools import product
 import numpy as np
 
 from ...error import ParsingError
+from .._index import needed_points, overlaps
 from ._cursor import Cursor
 
 if typing.TYPE_CHECKING:
+    from collections.abc import Callable
     from pathlib import Path
     from typing import Any, BinaryIO
 
-    from numpy.typing import NDArray
+    from numpy.typing import DTypeLike, NDArray
+
+    from .._index import FieldIndex
 
 
 @dataclass(frozen=True)
@@ -28,6 +32,20 @@ class _HeaderInfo:
     cursor: Cursor
     header: dict[str, Any]
 
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Shape of the fields array."""
+        shp = (
+            self.nval,
+            self.header["nts"][0] + self.header["xyp"],
+            self.header["nts"][1] + self.header["xyp"],
+            self.header["nts"][2],
+            self.header["ntb"],
+        )
+        if self.sfield:
+            return (shp[3], shp[1], shp[2], shp[0], shp[4])
+        return shp
+
 
 def _header(filepath: Path, fid: BinaryIO, stop_at_istep: bool = False) -> _HeaderInfo:
     """Read the header of a legacy binary file."""
@@ -139,11 +157,124 @@ def header(fieldfile: Path) -> dict[str, Any] | None:
     return hdr.header
 
 
-def field(fieldfile: Path) -> tuple[dict[str, Any], NDArray[np.float64]] | None:
+def shape(fieldfile: Path) -> tuple[int, ...] | None:
+    """Shape of fields data without reading them.
+
+    Args:
+        fieldfile: path of the binary field file.
+
+    Returns:
+        the shape of the `fields` array returned by `field`.
+    """
+    if not fieldfile.is_file():
+        return None
+    with fieldfile.open("rb") as fid:
+        hdr = _header(fieldfile, fid, stop_at_istep=True)
+    return hdr.shape
+
+
+def _assemble(
+    hdr: _HeaderInfo,
+    index: FieldIndex | None,
+    read_cpu: Callable[[int], NDArray[Any]],
+    dtype: DTypeLike,
+) -> NDArray[Any]:
+    """Gather the data of parallel subdomains into a fields array.
+
+    Args:
+        hdr: header of the file, its cursor is at the start of the data.
+        index: only gather this part of the fields, the data of subdomains
+            outside of it are skipped.
+        read_cpu: function reading a given number of values of a subdomain.
+        dtype: type of the fields array.
+
+    Returns:
+        fields indexed by variable, x-direction, y-direction, z-direction,
+            block.
+    """
+    header = hdr.header
+    cursor = hdr.cursor
+
+    # number of points in (e1, e2, e3) directions per cpu
+    npc = header["nts"] // header["ncs"]
+    # number of blocks per cpu
+    nbk = header["ntb"] // header["ncb"]
+    # number of values per 'read' block
+    npi = (npc[0] + header["xyp"]) * (npc[1] + header["xyp"]) * npc[2] * nbk * hdr.nval
+
+    flds = np.zeros(
+        (
+            hdr.nval,
+            header["nts"][0] + header["xyp"],
+            header["nts"][1] + header["xyp"],
+            header["nts"][2],
+            header["ntb"],
+        ),
+        dtype=dtype,
+    )
+    # variables of surface fields are along z, no selection while reading
+    needed = needed_points(None if hdr.sfield else index, flds.shape[1:])
+
+    # loop over parallel subdomains
+    for icpu in product(
+        range(header["ncb"]),
+        range(header["ncs"][2]),
+        range(header["ncs"][1]),
+        range(header["ncs"][0]),
+    ):
+        bounds = (
+            range(icpu[3] * npc[0], (icpu[3] + 1) * npc[0] + header["xyp"]),
+            range(icpu[2] * npc[1], (icpu[2] + 1) * npc[1] + header["xyp"]),
+            range(icpu[1] * npc[2], (icpu[1] + 1) * npc[2]),
+            range(icpu[0] * nbk, (icpu[0] + 1) * nbk),
+        )
+        if not overlaps(needed, bounds):
+            cursor.skip_floats(npi)
+            continue
+        # read the data for one CPU
+        data_cpu = read_cpu(npi)
+
+        # icpu is (icpu block, icpu z, icpu y, icpu x)
+        # data from file is transposed to obtained a field
+        # array indexed with (x, y, z, block), as in StagYY
+        flds[
+            :,
+            icpu[3] * npc[0] : (icpu[3] + 1) * npc[0] + header["xyp"],  # x
+            icpu[2] * npc[1] : (icpu[2] + 1) * npc[1] + header["xyp"],  # y
+            icpu[1] * npc[2] : (icpu[1] + 1) * npc[2],  # z
+            icpu[0] * nbk : (icpu[0] + 1) * nbk,  # block
+        ] = np.transpose(
+            data_cpu.reshape(
+                (
+                    nbk,
+                    npc[2],
+                    npc[1] + header["xyp"],
+                    npc[0] + header["xyp"],
+                    hdr.nval,
+                )
+            )
+        )
+    if hdr.sfield:
+        # for surface fields, variables are written along z direction
+        flds = np.swapaxes(flds, 0, 3)
+    if index is not None:
+        flds = flds[(slice(None), *index)]
+    return flds
+
+
+def field(
+    fieldfile: Path,
+    dtype: DTypeLike = np.float64,
+    index: FieldIndex | None = None,
+) -> tuple[dict[str, Any], NDArray[np.floating]] | None:
     """Extract fields data.
 
     Args:
         fieldfile: path of the binary field file.
+        dtype: floating point type of the returned fields.
+        index: only extract this part of the fields, indexed by x-direction,
+            y-direction, z-direction, block.  Data of parallel subdomains
+            outside of that part are not read.
 
     Returns:
         the tuple `(header, fields)`. `fields` is an array of scalar fields
@@ -153,65 +284,93 @@ def field(fieldfile: Path) -> tuple[dict[str, Any], NDArray[np.float64]] | None:
         return None
     with fieldfile.open("rb") as fid:
         hdr = _header(fieldfile, fid)
-        header = hdr.header
         cursor = hdr.cursor
+        scalefac = cursor.single_float() if hdr.nval > 1 else 1.0
+        hdr.header["scalefac"] = scalefac
+        flds = _assemble(hdr, index, lambda npi: cursor.floats(npi) * scalefac, dtype)
+    return hdr.header, flds
 
-        # number of points in (e1, e2, e3) directions per cpu
-        npc = header["nts"] // header["ncs"]
-        # number of blocks per cpu
-        nbk = header["ntb"] // header["ncb"]
-        # number of values per 'read' block
-        npi = (
-            (npc[0] + header["xyp"])
-            * (npc[1] + header["xyp"])
-            * npc[2]
-            * nbk
-            * hdr.nval
-        )
 
-        header["scalefac"] = cursor.single_float() if hdr.nval > 1 else 1.0
+@dataclass(frozen=True)
+class FieldPositions:
+    """Position of some values of fields in a binary field file.
 
-        flds = np.zeros(
-            (
-                hdr.nval,
-                header["nts"][0] + header["xyp"],
-                header["nts"][1] + header["xyp"],
-                header["nts"][2],
-                header["ntb"],
-            )
-        )
+    Files of the snapshots of a run share the same layout, positions found in
+    one of them are valid for the others as long as they have the same size.
+    """
 
-        # loop over parallel subdomains
-        for icpu in product(
-            range(header["ncb"]),
-            range(header["ncs"][2]),
-            range(header["ncs"][1]),
-            range(header["ncs"][0]),
-        ):
-            # read the data for one CPU
-            data_cpu = cursor.floats(npi) * header["scalefac"]
-
-            # icpu is (icpu block, icpu z, icpu y, icpu x)
-            # data from file is transposed to obtained a field
-            # array indexed with (x, y, z, block), as in StagYY
-            flds[
-                :,
-                icpu[3] * npc[0] : (icpu[3] + 1) * npc[0] + header["xyp"],  # x
-                icpu[2] * npc[1] : (icpu[2] + 1) * npc[1] + header["xyp"],  # y
-                icpu[1] * npc[2] : (icpu[1] + 1) * npc[2],  # z
-                icpu[0] * nbk : (icpu[0] + 1) * nbk,  # block
-            ] = np.transpose(
-                data_cpu.reshape(
-                    (
-                        nbk,
-                        npc[2],
-                        npc[1] + header["xyp"],
-                        npc[0] + header["xyp"],
-                        hdr.nval,
-                    )
-                )
-            )
-        if hdr.sfield:
-            # for surface fields, variables are written along z direction
-            flds = np.swapaxes(flds, 0, 3)
-    return header, flds
+    file_size: int
+    float_type: np.dtype[Any]
+    scalefac: int | None
+    """offset in bytes of the scale factor of the fields, if any."""
+    values: NDArray[np.int64]
+    """offset in bytes of the values, indexed as the fields array."""
+
+
+def positions(fieldfile: Path, index: FieldIndex) -> FieldPositions | None:
+    """Locate a part of the fields in a binary field file.
+
+    Args:
+        fieldfile: path of the binary field file.
+        index: part of the fields to locate, indexed by x-direction,
+            y-direction, z-direction, block.
+
+    Returns:
+        the positions of the values of the fields at the given index, see
+            `read_positions`.
+    """
+    if not fieldfile.is_file():
+        return None
+    with fieldfile.open("rb") as fid:
+        hdr = _header(fieldfile, fid)
+        cursor = hdr.cursor
+        float_type = np.dtype(cursor.float_type)
+
+        scalefac = None
+        if hdr.nval > 1:
+            scalefac = fid.tell()
+            cursor.skip_floats(1)
+
+        def locate_cpu(npi: int) -> NDArray[np.int64]:
+            start = fid.tell()
+            cursor.skip_floats(npi)
+            return start + float_type.itemsize * np.arange(npi, dtype=np.int64)
+
+        values = _assemble(hdr, index, locate_cpu, np.int64)
+    return FieldPositions(
+        file_size=fieldfile.stat().st_size,
+        float_type=float_type,
+        scalefac=scalefac,
+        values=values,
+    )
+
+
+def read_positions(
+    fieldfile: Path, positions: FieldPositions, dtype: DTypeLike = np.float64
+) -> NDArray[np.floating] | None:
+    """Read the values of fields at known positions in a binary field file.
+
+    Only the pages of the file holding the requested values are read.
+
+    Args:
+        fieldfile: path of the binary field file.
+        positions: positions found with `positions` in a file of the same run.
+        dtype: floating point type of the returned fields.
+
+    Returns:
+        the values of the fields, None if the file doesn't exist or doesn't
+            have the same layout.
+    """
+    if not fieldfile.is_file() or fieldfile.stat().st_size != positions.file_size:
+        return None
+    float_type = positions.float_type
+    data = np.memmap(fieldfile, dtype=np.uint8, mode="r")
+
+    def gather(offsets: NDArray[np.int64]) -> NDArray[Any]:
+        nbytes = np.arange(float_type.itemsize)
+        return data[offsets[..., np.newaxis] + nbytes].view(float_type)[..., 0]
+
+    values = gather(positions.values)
+    if positions.scalefac is not None:
+        values *= gather(np.array(positions.scalefac))
+    return values.astype(dtype)
@@ -1,6 +1,9 @@
+"""Parser of legacy tracers output."""
+
 from __future__ import annotations
 
 import typing
+from dataclasses import dataclass
 
 import numpy as np
 
@@ -8,55 +11,163 @@ from ...error import ParsingError
 from ._cursor import Cursor
 
 if typing.TYPE_CHECKING:
+    from collections.abc import Collection, Sequence
     from pathlib import Path
+    from typing import Any, BinaryIO
 
     from numpy.typing import NDArray
 
 
-def tracers(tracersfile: Path) -> dict[str, list[NDArray[np.floating]]] | None:
+@dataclass(frozen=True)
+class TracersHeader:
+    """Layout of a binary tracers file."""
+
+    infos: tuple[str, ...]
+    """names of tracers variables."""
+    ntra: tuple[int, ...]
+    """number of tracers in each block."""
+    dtype: np.dtype[Any]
+    """type of tracers data."""
+    offset: int
+    """position of tracers data in the file, in bytes."""
+
+    def block_offsets(self) -> list[int]:
+        """Position of the data of each block in the file, in bytes."""
+        size = len(self.infos) * self.dtype.itemsize
+        offsets = [self.offset]
+        for ntrab in self.ntra[:-1]:
+            offsets.append(offsets[-1] + ntrab * size)
+        return offsets
+
+
+def _header(tracersfile: Path, fid: BinaryIO) -> TracersHeader:
+    """Read the header of a binary tracers file."""
+    cursor = Cursor(fid=fid, int_type=np.int32, float_type=np.float32)
+    magic = cursor.single_int().item()
+    if magic > 8000:  # 64 bits
+        cursor = cursor.reset_with_64_bits()
+        if magic != cursor.single_int():
+            raise ParsingError(tracersfile, "inconsistent magic number in 64 bits")
+        magic -= 8000
+    if magic < 100:
+        raise ParsingError(tracersfile, "magic > 100 expected to get tracervar info")
+    nblk = magic % 100
+    cursor.floats(2)  # aspect ratio
+    cursor.single_int()  # istep
+    cursor.single_float()  # time
+    ninfo = cursor.single_int()
+    ntra = cursor.ints(nblk)
+    cursor.single_float()  # tracer ideal mass
+    curv = cursor.single_int()
+    if curv:
+        cursor.single_float()  # r_cmb
+    infos = tuple(cursor.string(16) for _ in range(ninfo))
+    if magic > 200:
+        ntrace_elt = cursor.single_int()
+        if ntrace_elt > 0:
+            cursor.floats(ntrace_elt)  # outgassed
+    return TracersHeader(
+        infos=infos,
+        ntra=tuple(int(ntrab) for ntrab in ntra),
+        dtype=np.dtype(cursor.float_type),
+        offset=fid.tell(),
+    )
+
+
+def header(tracersfile: Path) -> TracersHeader | None:
+    """Read the layout of a binary tracers file.
+
+    Args:
+        tracersfile: path of the binary tracers file.
+
+    Returns:
+        the names of tracers variables and the position of their data.
+    """
+    if not tracersfile.is_file():
+        return None
+    with tracersfile.open("rb") as fid:
+        return _header(tracersfile, fid)
+
+
+def tracers_var(
+    tracersfile: Path,
+    hdr: TracersHeader,
+    name: str,
+    rows: Sequence[NDArray[np.integer]] | None = None,
+) -> list[NDArray[np.floating]] | None:
+    """Extract one tracers variable.
+
+    The file is memory-mapped, only the data of the requested variable is
+    copied in memory.
+
+    Args:
+        tracersfile: path of the binary tracers file.
+        hdr: layout of the file, see `header`.
+        name: name of the tracers variable.
+        rows: indices of the tracers to extract in each block.  All of them
+            are extracted if None.
+
+    Returns:
+        the variable of each block, or None if it is not in the file.
+    """
+    if name not in hdr.infos:
+        return None
+    idx = hdr.infos.index(name)
+    ninfo = len(hdr.infos)
+    expected = hdr.offset + sum(hdr.ntra) * ninfo * hdr.dtype.itemsize
+    if tracersfile.stat().st_size < expected:
+        raise ParsingError(tracersfile, "truncated tracers data")
+    data = []
+    for iblock, (ntrab, offset) in enumerate(zip(hdr.ntra, hdr.block_offsets())):
+        if ntrab == 0:
+            data.append(np.empty(0, dtype=hdr.dtype))
+            continue
+        block = np.memmap(
+            tracersfile, dtype=hdr.dtype, mode="r", offset=offset, shape=(ntrab, ninfo)
+        )
+        if rows is None:
+            data.append(np.array(block[:, idx]))
+        else:
+            data.append(np.array(block[rows[iblock], idx]))
+        del block
+    return data
+
+
+def tracers(
+    tracersfile: Path, names: Collection[str] | None = None
+) -> dict[str, list[NDArray[np.floating]]] | None:
     """Extract tracers data.
 
+    Tracers variables are interleaved in the file.  They are returned as
+    contiguous arrays, the data of each block being discarded once the
+    requested variables are extracted.
+
     Args:
         tracersfile: path of the binary tracers file.
+        names: names of the tracers variables to extract.  All of them are
+            extracted if None.
 
     Returns:
         Tracers data organized by attribute names and blocks.
     """
     if not tracersfile.is_file():
         return None
-    tra: dict[str, list[NDArray[np.floating]]] = {}
     with tracersfile.open("rb") as fid:
-        cursor = Cursor(fid=fid, int_type=np.int32, float_type=np.float32)
-        magic = cursor.single_int().item()
-        if magic > 8000:  # 64 bits
-            cursor = cursor.reset_with_64_bits()
-            if magic != cursor.single_int():
-                raise ParsingError(tracersfile, "inconsistent magic number in 64 bits")
-            magic -= 8000
-        if magic < 100:
-            raise ParsingError(
-                tracersfile, "magic > 100 expected to get tracervar info"
-            )
-        nblk = magic % 100
-        cursor.floats(2)  # aspect ratio
-        cursor.single_int()  # istep
-        cursor.single_float()  # time
-        ninfo = cursor.single_int()
-        ntra = cursor.ints(nblk)
-        cursor.single_float()  # tracer ideal mass
-        curv = cursor.single_int()
-        if curv:
-            cursor.single_float()  # r_cmb
-        infos = []  # list of info names
-        for _ in range(ninfo):
-            infos.append(cursor.string(16))
-            tra[infos[-1]] = []
-        if magic > 200:
-            ntrace_elt = cursor.single_int()
-            if ntrace_elt > 0:
-                cursor.floats(ntrace_elt)  # outgassed
-        for ntrab in ntra:  # blocks
-            data = cursor.floats(ntrab * ninfo)
-            for idx, info in enumerate(infos):
-                tra[info].append(data[idx::ninfo])
+        hdr = _header(tracersfile, fid)
+        ninfo = len(hdr.infos)
+        columns = [
+            (idx, info)
+            for idx, info in enumerate(hdr.infos)
+            if names is None or info in names
+        ]
+        tra: dict[str, list[NDArray[np.floating]]] = {info: [] for _, info in columns}
+        if not columns:
+            return tra
+        for ntrab in hdr.ntra:  # blocks
+            data = np.fromfile(fid, hdr.dtype, ntrab * ninfo)
+            if data.size != ntrab * ninfo:
+                raise ParsingError(tracersfile, "truncated tracers data")
+            data = data.reshape(ntrab, ninfo)
+            for idx, info in columns:
+                tra[info].append(np.ascontiguousarray(data[:, idx]))
     return tra
@@ -3,26 +3,41 @@ from __future__ import annotations
 import typing
 
 import h5py
+import numpy as np
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Iterator
     from pathlib import Path
 
+    from numpy.typing import NDArray
 
-def isnap_istep(timeh5: Path) -> Iterator[tuple[int, int]]:
-    """Iterate through (isnap, istep) recorded in 'time_botT.h5'.
+
+def isnap_istep(timeh5: Path) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Read (isnap, istep) recorded in 'time_botT.h5'.
+
+    The group is visited once with low-level h5py iteration and only the
+    istep entry of each dataset is read, no high-level `Dataset` object is
+    created along the way.
 
     Args:
         timeh5: path of the time h5 file.
 
-    Yields:
-        tuple (isnap, istep).
+    Returns:
+        isnap and istep arrays, sorted by isnap.
     """
     with h5py.File(timeh5, "r") as h5f:
-        for name, dset in h5f.items():
-            isnap = int(name[-5:])
-            if len(dset) == 3:
-                istep = int(dset[2])
-            else:
-                istep = int(dset[0])
-            yield isnap, istep
+        gid = h5f.id
+        names = list(gid)
+        isnaps = np.empty(len(names), dtype=np.int64)
+        isteps = np.empty(len(names), dtype=np.int64)
+        memspace = h5py.h5s.create_simple((1,))
+        buf = np.empty(1, dtype=np.float64)
+        for i, name in enumerate(names):
+            dsid = h5py.h5d.open(gid, name)
+            fspace = dsid.get_space()
+            ientry = 2 if fspace.shape[0] == 3 else 0
+            fspace.select_hyperslab((ientry,), (1,))
+            dsid.read(memspace, fspace, buf)
+            isnaps[i] = int(name[-5:])
+            isteps[i] = buf[0]
+    order = np.argsort(isnaps, kind="stable")
+    return isnaps[order], isteps[order]
@@ -2,23 +2,26 @@ from __future__ import annotations
 
 import typing
 from dataclasses import dataclass
-from functools import cached_property
+from functools import cached_property, lru_cache
 
 import h5py
 import numpy as np
 
 from ...error import ParsingError
 from ...phyvars import FIELD, SFIELD
+from .._index import needed_points, overlaps
 from ._helpers import count_subdomains, ifile_isnap, read_group, try_text
 from .xdmf import XmlStream
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Iterator, Mapping
+    from collections.abc import Callable, Iterator, Mapping
     from pathlib import Path
     from typing import Any
     from xml.etree.ElementTree import Element
 
-    from numpy.typing import NDArray
+    from numpy.typing import DTypeLike, NDArray
+
+    from .._index import FieldIndex
 
 
 def _make_3d(field: NDArray[np.float64], twod: str | None) -> NDArray[np.float64]:
@@ -239,8 +242,9 @@ def read_geom(xdmf: FieldXmf, snapshot: int) -> dict[str, Any]:
     header["mo_thick_sol"] = entry.mo_thick_sol
     header["ntb"] = 2 if entry.yin_yang else 1
 
+    header["mesh_files"] = tuple(entry.coord_files_yin(xdmf.path.parent))
     all_meshes: list[dict[str, NDArray[np.float64]]] = []
-    for h5file in entry.coord_files_yin(xdmf.path.parent):
+    for h5file in header["mesh_files"]:
         all_meshes.append({})
         with h5py.File(h5file, "r") as h5f:
             for coord, mesh in h5f.items():
@@ -296,19 +300,47 @@ def read_geom(xdmf: FieldXmf, snapshot: int) -> dict[str, Any]:
     return header
 
 
-def _to_spherical(
-    flds: NDArray[np.float64], header: dict[str, Any]
-) -> NDArray[np.float64]:
-    """Convert vector field to spherical."""
-    cth = np.cos(header["t_mesh"][:, :, :-1])
-    sth = np.sin(header["t_mesh"][:, :, :-1])
-    cph = np.cos(header["p_mesh"][:, :, :-1])
-    sph = np.sin(header["p_mesh"][:, :, :-1])
-    fout = np.copy(flds)
-    fout[0] = cth * cph * flds[0] + cth * sph * flds[1] - sth * flds[2]
-    fout[1] = sph * flds[0] - cph * flds[1]  # need to take the opposite here
-    fout[2] = sth * cph * flds[0] + sth * sph * flds[1] + cth * flds[2]
-    return fout
+@lru_cache(maxsize=2)
+def _mesh_cache(files: tuple[Path, ...]) -> dict[str, Any]:
+    """Data computed from the mesh read from the given files."""
+    return {}
+
+
+def _sph_trig(header: dict[str, Any]) -> tuple[NDArray[np.float64], ...]:
+    """Cosine and sine of the colatitude and longitude of mesh points.
+
+    They only depend on the mesh, they are computed once for all the
+    snapshots sharing the same mesh files.
+
+    Returns:
+        cos(theta), sin(theta), cos(phi), sin(phi), indexed by (x, y, z).
+    """
+    files = header.get("mesh_files")
+    cache = {} if files is None else _mesh_cache(files)
+    if "sph_trig" not in cache:
+        theta = header["t_mesh"][:, :, :-1]
+        phi = np.roll(np.arctan2(header["y_mesh"], header["x_mesh"]), -1, 1)
+        phi = phi[:, :, :-1]
+        cache["sph_trig"] = np.cos(theta), np.sin(theta), np.cos(phi), np.sin(phi)
+    return cache["sph_trig"]
+
+
+def _rotate_sph(
+    vec: NDArray[np.floating],
+    cth: NDArray[np.float64],
+    sth: NDArray[np.float64],
+    cph: NDArray[np.float64],
+    sph: NDArray[np.float64],
+) -> None:
+    """Rotate cartesian components of vectors to spherical ones in place."""
+    horiz = cph * vec[0] + sph * vec[1]
+    vec[1] *= -cph  # need to take the opposite here
+    vec[1] += sph * vec[0]
+    np.multiply(cth, horiz, out=vec[0])
+    vec[0] -= sth * vec[2]
+    horiz *= sth
+    vec[2] *= cth
+    vec[2] += horiz
 
 
 def _flds_shape(vector_field: bool, header: dict[str, Any]) -> list[int]:
@@ -334,52 +366,93 @@ def _flds_shape(vector_field: bool, header: dict[str, Any]) -> list[int]:
 
 
 def _post_read_flds(
-    flds: NDArray[np.float64], header: dict[str, Any]
-) -> NDArray[np.float64]:
+    flds: NDArray[np.floating], header: dict[str, Any]
+) -> NDArray[np.floating]:
     """Process flds to handle sphericity."""
     if flds.shape[0] >= 3 and header["rcmb"] > 0:
         # spherical vector
-        header["p_mesh"] = np.roll(
-            np.arctan2(header["y_mesh"], header["x_mesh"]), -1, 1
-        )
-        for ibk in range(header["ntb"]):
-            flds[..., ibk] = _to_spherical(flds[..., ibk], header)
-        header["p_mesh"] = np.roll(
-            np.arctan2(header["y_mesh"], -header["x_mesh"]) + np.pi, -1, 1
-        )
+        trig = (coef[..., np.newaxis] for coef in _sph_trig(header))
+        _rotate_sph(flds[:3], *trig)
     return flds
 
 
-def field(
+def shape(
+    xdmf: FieldXmf, fieldname: str, snapshot: int, header: Mapping[str, Any]
+) -> tuple[int, ...] | None:
+    """Shape of field data without reading them.
+
+    Args:
+        xdmf: xdmf file parser.
+        fieldname: name of field.
+        snapshot: snapshot number.
+        header: geometry information.
+
+    Returns:
+        the shape of the field data returned by `field`.  None is returned if
+            data is unavailable.
+    """
+    if fieldname not in xdmf[snapshot].fields:
+        return None
+    vector_field = len(FIELD.h5_files.get(fieldname, [])) == 3
+    shp = _flds_shape(vector_field, dict(header))
+    if fieldname in SFIELD.h5_files:
+        del shp[3]
+    return tuple(shp)
+
+
+def _assemble(
     xdmf: FieldXmf,
     fieldname: str,
     snapshot: int,
-    header: dict[str, Any] | None = None,
-) -> tuple[dict[str, Any], NDArray[np.float64]] | None:
-    """Extract field data from hdf5 files.
+    header: dict[str, Any],
+    dtype: DTypeLike,
+    index: FieldIndex | None,
+    read_sub: Callable[[int, FieldSub], NDArray[Any]],
+) -> NDArray[Any] | None:
+    """Gather the data of subdomains into a fields array.
 
     Args:
         xdmf: xdmf file parser.
         fieldname: name of field to extract.
         snapshot: snapshot number.
         header: geometry information.
+        dtype: type of the fields array.
+        index: only gather this part of the field, files of subdomains
+            outside of that part are not read.
+        read_sub: function reading the data of the n-th subdomain, with the
+            shape of the subdomain.
 
     Returns:
-        geometry information and field data. None is returned if data is
-            unavailable.
+        fields indexed by component, x-direction, y-direction, z-direction,
+            block.  The components of yang vectors are in the yang frame.
+            None is returned if data is unavailable.
     """
-    if header is None:
-        header = read_geom(xdmf, snapshot)
-
     vector_field = len(FIELD.h5_files.get(fieldname, [])) == 3
     surface_field = fieldname in SFIELD.h5_files
 
     npc = header["nts"] // header["ncs"]  # number of grid point per node
-    flds = np.zeros(_flds_shape(vector_field, header))
+    flds = np.zeros(_flds_shape(vector_field, header), dtype=dtype)
     data_found = False
+    # surface fields have no z direction, they are always read entirely
+    select = index is not None and not surface_field
+    needed = needed_points(index if select else None, flds.shape[1:])
 
-    for fsub in xdmf[snapshot].field_subdomains(xdmf.path.parent, fieldname):
-        fld = read_group(fsub.file, fsub.dataset).reshape(fsub.shape)
+    subdomains = xdmf[snapshot].field_subdomains(xdmf.path.parent, fieldname)
+    for isub, fsub in enumerate(subdomains):
+        ifs = [
+            fsub.icore // np.prod(header["ncs"][:i]) % header["ncs"][i] * npc[i]
+            for i in range(3)
+        ]
+        data_found = True
+        bounds = (
+            range(ifs[0], ifs[0] + npc[0] + header["xp"]),
+            range(ifs[1], ifs[1] + npc[1] + header["yp"]),
+            range(ifs[2], ifs[2] + npc[2]),
+            range(fsub.iblock, fsub.iblock + 1),
+        )
+        if select and not overlaps(needed, bounds):
+            continue
+        fld = read_sub(isub, fsub)
         # for some reason, the field is transposed
         fld = fld.T
         shp = fld.shape
@@ -396,10 +469,6 @@ def field(
             fld = fld.reshape((1, npc[0], npc[1], 1))
         elif header["nts"][1] == 1:  # cart XZ
             fld = fld.reshape((1, shp[0], 1, shp[1]))
-        ifs = [
-            fsub.icore // np.prod(header["ncs"][:i]) % header["ncs"][i] * npc[i]
-            for i in range(3)
-        ]
         if surface_field:
             ifs[2] = 0
             npc[2] = 1
@@ -412,17 +481,201 @@ def field(
             ifs[2] : ifs[2] + npc[2],
             fsub.iblock,
         ] = fld
-        data_found = True
 
+    if not data_found:
+        return None
     if flds.shape[0] == 3 and flds.shape[-1] == 2:  # YinYang vector
         # Yang grid is rotated compared to Yin grid
-        flds[0, ..., 1] = -flds[0, ..., 1]
         vt = flds[1, ..., 1].copy()
         flds[1, ..., 1] = flds[2, ..., 1]
         flds[2, ..., 1] = vt
-    flds = _post_read_flds(flds, header)
+    return flds
 
-    if surface_field:
+
+def _select(
+    flds: NDArray[Any], fieldname: str, index: FieldIndex | None
+) -> NDArray[Any]:
+    """Part of the fields array returned to the caller."""
+    if fieldname in SFIELD.h5_files:
         # remove z component
         flds = flds[..., 0, :]
-    return (header, flds) if data_found else None
+    if index is not None:
+        flds = flds[(slice(None), *index)]
+    return flds
+
+
+def field(
+    xdmf: FieldXmf,
+    fieldname: str,
+    snapshot: int,
+    header: dict[str, Any] | None = None,
+    dtype: DTypeLike = np.float64,
+    index: FieldIndex | None = None,
+) -> tuple[dict[str, Any], NDArray[np.floating]] | None:
+    """Extract field data from hdf5 files.
+
+    Args:
+        xdmf: xdmf file parser.
+        fieldname: name of field to extract.
+        snapshot: snapshot number.
+        header: geometry information.
+        dtype: floating point type of the returned fields.
+        index: only extract this part of the field, indexed by x-direction,
+            y-direction, z-direction, block.  Files of subdomains outside of
+            that part are not read.
+
+    Returns:
+        geometry information and field data. None is returned if data is
+            unavailable.
+    """
+    if header is None:
+        header = read_geom(xdmf, snapshot)
+    flds = _assemble(
+        xdmf,
+        fieldname,
+        snapshot,
+        header,
+        dtype,
+        index,
+        lambda _, fsub: read_group(fsub.file, fsub.dataset).reshape(fsub.shape),
+    )
+    if flds is None:
+        return None
+    if flds.shape[0] == 3 and flds.shape[-1] == 2:  # YinYang vector
+        flds[0, ..., 1] = -flds[0, ..., 1]
+    flds = _post_read_flds(flds, header)
+    return header, _select(flds, fieldname, index)
+
+
+# subdomain of a value, stored in the high bits of its position
+_SUB_SHIFT = 40
+
+
+@dataclass(frozen=True)
+class FieldPositions:
+    """Position of some values of a field in the subdomain files.
+
+    Snapshots of a run share the same decomposition in subdomains, positions
+    found in one of them are valid for the others.
+    """
+
+    subdomains: tuple[tuple[int, ...], ...]
+    """shape of the datasets of subdomains."""
+    values: NDArray[np.int64]
+    """subdomain and flat position of the values, indexed as the field."""
+    points: tuple[NDArray[np.intp], ...]
+    """x, y, z, and block index of the values, indexed as the field."""
+
+
+def positions(
+    xdmf: FieldXmf,
+    fieldname: str,
+    snapshot: int,
+    header: dict[str, Any],
+    index: FieldIndex,
+) -> FieldPositions | None:
+    """Locate a part of a field in the files of its subdomains.
+
+    No data is read from the subdomain files.
+
+    Args:
+        xdmf: xdmf file parser.
+        fieldname: name of field.
+        snapshot: snapshot number.
+        header: geometry information.
+        index: part of the field to locate, indexed by x-direction,
+            y-direction, z-direction, block.
+
+    Returns:
+        the positions of the values of the field at the given index, see
+            `read_positions`.  None is returned if data is unavailable.
+    """
+    codes = _assemble(
+        xdmf,
+        fieldname,
+        snapshot,
+        header,
+        np.int64,
+        index,
+        lambda isub, fsub: (
+            (isub << _SUB_SHIFT)
+            + np.arange(np.prod(fsub.shape), dtype=np.int64).reshape(fsub.shape)
+        ),
+    )
+    if codes is None:
+        return None
+    grid = np.ix_(*(np.arange(npts) for npts in codes.shape[1:]))
+    points = tuple(
+        _select(np.broadcast_to(crd, codes.shape)[:1], fieldname, index)[0]
+        for crd in grid
+    )
+    subdomains = xdmf[snapshot].field_subdomains(xdmf.path.parent, fieldname)
+    return FieldPositions(
+        subdomains=tuple(fsub.shape for fsub in subdomains),
+        values=_select(codes, fieldname, index),
+        points=points,
+    )
+
+
+def read_positions(
+    xdmf: FieldXmf,
+    fieldname: str,
+    snapshot: int,
+    header: dict[str, Any],
+    positions: FieldPositions,
+    dtype: DTypeLike = np.float64,
+) -> NDArray[np.floating] | None:
+    """Read the values of a field at known positions.
+
+    Only the requested elements of the datasets are read from the files of
+    the subdomains.
+
+    Args:
+        xdmf: xdmf file parser.
+        fieldname: name of field.
+        snapshot: snapshot number.
+        header: geometry information.
+        positions: positions found with `positions` in a snapshot of the same
+            run.
+        dtype: floating point type of the returned fields.
+
+    Returns:
+        the values of the field.  None is returned if data is unavailable or
+            the snapshot doesn't have the same subdomains.
+    """
+    if fieldname not in xdmf[snapshot].fields:
+        return None
+    fsubs = list(xdmf[snapshot].field_subdomains(xdmf.path.parent, fieldname))
+    if tuple(fsub.shape for fsub in fsubs) != positions.subdomains:
+        return None
+    codes = positions.values.ravel()
+    isubs = codes >> _SUB_SHIFT
+    flat = codes & ((1 << _SUB_SHIFT) - 1)
+    values = np.empty(codes.size, dtype=dtype)
+    for isub in np.unique(isubs):
+        fsub = fsubs[isub]
+        sel = np.flatnonzero(isubs == isub)
+        # h5py requires increasing positions without repetition
+        wanted, inverse = np.unique(flat[sel], return_inverse=True)
+        try:
+            with h5py.File(fsub.file, "r") as h5f:
+                dset = h5f[fsub.dataset]
+                coords = np.stack(np.unravel_index(wanted, dset.shape), axis=1)
+                fspace = dset.id.get_space()
+                fspace.select_elements(coords)
+                buffer = np.empty(wanted.size, dtype=dset.dtype)
+                dset.id.read(h5py.h5s.create_simple(buffer.shape), fspace, buffer)
+        except OSError as err:
+            # h5py doesn't always include the filename in its error messages
+            err.args += (fsub.file,)
+            raise
+        values[sel] = buffer[inverse]
+    flds: NDArray[np.floating] = values.reshape(positions.values.shape)
+    if flds.shape[0] == 3 and header["ntb"] == 2:  # YinYang vector
+        yang = positions.points[3] == 1
+        flds[0][yang] = -flds[0][yang]
+    if flds.shape[0] >= 3 and header["rcmb"] > 0:
+        # spherical vector
+        trig = (coef[positions.points[:3]] for coef in _sph_trig(header))
+        _rotate_sph(flds[:3], *trig)
+    return flds
@@ -1,18 +1,21 @@
 from __future__ import annotations
 
 import typing
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from functools import cached_property
 
+import h5py
 import numpy as np
 
 from ...error import ParsingError
-from ._helpers import count_subdomains, ifile_isnap, read_group
+from ._helpers import count_subdomains, ifile_isnap
 from .xdmf import XmlStream
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Iterator, Mapping
+    from collections.abc import Iterator, Mapping, Sequence
     from pathlib import Path
+    from typing import Any
 
     from numpy.typing import NDArray
 
@@ -111,25 +114,84 @@ class TracersXmf:
             raise ParsingError(self.path, f"no data for snapshot {isnap}")
 
 
+def _tracers_shapes(
+    fname: Path, tsubs: Sequence[TracerSub]
+) -> list[tuple[tuple[int, ...], np.dtype[Any]]]:
+    """Shape and type of the tracers data of subdomains in a file."""
+    try:
+        with h5py.File(fname, "r") as h5f:
+            return [
+                (h5f[tsub.dataset].shape, h5f[tsub.dataset].dtype) for tsub in tsubs
+            ]
+    except OSError as err:
+        # h5py doesn't always include the filename in its error messages
+        err.args += (fname,)
+        raise
+
+
+def _read_tracers(
+    fname: Path, reads: Sequence[tuple[TracerSub, NDArray[np.float64]]]
+) -> None:
+    """Read the tracers data of subdomains of a file in preallocated arrays."""
+    try:
+        with h5py.File(fname, "r") as h5f:
+            for tsub, out in reads:
+                if out.size > 0:
+                    h5f[tsub.dataset].read_direct(out)
+    except OSError as err:
+        err.args += (fname,)
+        raise
+
+
 def tracers(
-    xdmf: TracersXmf, infoname: str, snapshot: int
+    xdmf: TracersXmf, infoname: str, snapshot: int, workers: int = 4
 ) -> list[NDArray[np.float64]]:
     """Extract tracers data from hdf5 files.
 
+    The size of the data of each subdomain is read first to allocate the
+    array of each block once, subdomains are then read concurrently.  Each
+    worker opens and closes the files it reads, so that no more than
+    `workers` files are open at a time.
+
     Args:
         xdmf: xdmf file parser.
         infoname: name of information to extract.
         snapshot: snapshot number.
+        workers: number of threads reading subdomains.
 
     Returns:
         Tracers data organized by attribute and block.
     """
-    tra: list[list[NDArray[np.float64]]] = [[], []]  # [block][core]
-    for tsub in xdmf[snapshot].tra_subdomains(xdmf.path.parent, infoname):
-        tra[tsub.iblock].append(read_group(tsub.file, tsub.dataset))
-
-    tra_concat: list[NDArray[np.float64]] = []
-    for trab in tra:
-        if trab:
-            tra_concat.append(np.concatenate(trab))
+    tsubs = list(xdmf[snapshot].tra_subdomains(xdmf.path.parent, infoname))
+    # subdomains grouped by file, each file is opened by one worker at a time
+    by_file: dict[Path, list[TracerSub]] = {}
+    for tsub in tsubs:
+        by_file.setdefault(tsub.file, []).append(tsub)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        shapes = dict(
+            zip(by_file, pool.map(_tracers_shapes, by_file, by_file.values()))
+        )
+        metas = {
+            tsub: meta
+            for fname, subs in by_file.items()
+            for tsub, meta in zip(subs, shapes[fname])
+        }
+        tra_concat: list[NDArray[np.float64]] = []
+        reads: dict[Path, list[tuple[TracerSub, NDArray[np.float64]]]] = {}
+        for iblock in range(2):
+            subs = [tsub for tsub in tsubs if tsub.iblock == iblock]
+            if not subs:
+                continue
+            shape, dtype = metas[subs[0]]
+            ntra = sum(metas[tsub][0][0] for tsub in subs)
+            trab = np.empty((ntra, *shape[1:]), dtype=dtype)
+            start = 0
+            for tsub in subs:
+                nsub = metas[tsub][0][0]
+                reads.setdefault(tsub.file, []).append(
+                    (tsub, trab[start : start + nsub])
+                )
+                start += nsub
+            tra_concat.append(trab)
+        list(pool.map(_read_tracers, reads, reads.values()))
     return tra_concat
@@ -14,7 +14,7 @@ from functools import cached_property
 from operator import attrgetter
 from types import MappingProxyType
 
-from . import error, processing
+from . import binning, error, processing
 from .datatypes import Varf, Varr, Vart
 
 if typing.TYPE_CHECKING:
@@ -131,6 +131,8 @@ FIELD: FieldVars = FieldVars.from_dict(
 FIELD_EXTRA: Mapping[str, Callable[[Step], Field]] = MappingProxyType(
     {
         "stream": processing.stream_function,
+        "ntra": binning.tracers_count,
+        "tradens": binning.tracers_density,
     }
 )
 """Scalar fields that StagPy can compute."""
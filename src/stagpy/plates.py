@@ -9,7 +9,6 @@ from functools import lru_cache
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import colors
-from scipy.signal import argrelmax, argrelmin
 
 from . import _helpers, error, field
 from ._helpers import saveplot
@@ -58,6 +57,8 @@ def detect_plates(
         itrenches: phi-indices of detected trenches
         iridges: phi-indices of detected ridges
     """
+    from scipy.signal import argrelmax, argrelmin
+
     dvphi = _surf_diag(snap, "dv2").values
 
     # finding trenches
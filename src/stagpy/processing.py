@@ -10,12 +10,19 @@ from __future__ import annotations
 import typing
 
 import numpy as np
-from scipy.integrate import cumulative_trapezoid
 
 from .datatypes import Field, Rprof, Tseries, Varr, Vart
-from .error import NotAvailableError
+from .error import (
+    MissingDataError,
+    NoGeomError,
+    NoSnapshotError,
+    NotAvailableError,
+    UnknownRprofVarError,
+)
 
 if typing.TYPE_CHECKING:
+    from collections.abc import Sequence
+
     from numpy.typing import NDArray
 
     from .stagyydata import StagyyData
@@ -67,13 +74,21 @@ def ebalance(sdat: StagyyData) -> Tseries:
     Returns:
         energy balance and time arrays.
     """
-    rbot, rtop = sdat.steps[-1].rprofs.bounds
-    if rbot != 0:  # spherical
-        coefsurf = (rtop / rbot) ** 2
-        volume = rbot * ((rtop / rbot) ** 3 - 1) / 3
+    try:
+        geom = sdat.snaps[-1].geom
+    except (NoSnapshotError, NoGeomError):
+        # only radial profiles and time series are available
+        rbot, rtop = sdat.steps[-1].rprofs.bounds
+        if rbot != 0:  # spherical
+            coefsurf = (rtop / rbot) ** 2
+            volume = rbot * ((rtop / rbot) ** 3 - 1) / 3
+        else:
+            coefsurf = 1.0
+            volume = 1.0
     else:
-        coefsurf = 1.0
-        volume = 1.0
+        areas = geom.wall_areas
+        coefsurf = areas[-1] / areas[0]
+        volume = geom.shell_volumes.sum() / areas[0]
     dtdt = dt_dt(sdat)
     ftop = sdat.tseries["ftop"].values * coefsurf
     fbot = sdat.tseries["fbot"].values
@@ -93,14 +108,13 @@ def mobility(sdat: StagyyData) -> Tseries:
     Returns:
         mobility and time arrays.
     """
-    time = []
-    mob = []
-    for step in sdat.steps.filter(rprofs=True):
-        time.append(step.timeinfo["time"])
-        mob.append(step.rprofs["vrms"].values[-1] / step.timeinfo["Vrms"])
-    return Tseries(
-        np.array(mob), np.array(time), Vart("Plates mobility", "Mobility", "1")
-    )
+    isteps, vrms_profs = sdat._rprofs_stack("vrms")
+    rows = sdat.tseries._rows_at_steps(isteps)
+    if np.any(rows < 0):
+        raise MissingDataError(f"No time series for some rprof steps of {sdat}")
+    time = sdat.tseries.time[rows]
+    mob = vrms_profs[:, -1] / sdat.tseries["Vrms"].values[rows]
+    return Tseries(mob, time, Vart("Plates mobility", "Mobility", "1"))
 
 
 def delta_r(step: Step) -> Rprof:
@@ -240,6 +254,73 @@ def energy_prof(step: Step) -> Rprof:
     )
 
 
+def _weighted_quantile(
+    values: NDArray[np.float64], weights: NDArray[np.float64], quantile: float
+) -> NDArray[np.float64]:
+    """Quantile along first axis of values, weights share the same index."""
+    order = np.argsort(values, axis=0)
+    sorted_vals = np.take_along_axis(values, order, axis=0)
+    cum_weights = np.cumsum(weights[order], axis=0)
+    cum_weights /= cum_weights[-1]
+    return np.array(
+        [
+            np.interp(quantile, cum_weights[:, iz], sorted_vals[:, iz])
+            for iz in range(values.shape[1])
+        ]
+    )
+
+
+def _horizontal_stat(
+    values: NDArray[np.float64], weights: NDArray[np.float64], stat: str
+) -> NDArray[np.float64]:
+    """Statistics along first axis of values, weights share the same index."""
+    if stat == "mean":
+        return weights @ values / weights.sum()
+    if stat == "rms":
+        return np.sqrt(weights @ values**2 / weights.sum())
+    if stat == "min":
+        return values[weights > 0].min(axis=0)
+    if stat == "max":
+        return values[weights > 0].max(axis=0)
+    if stat.startswith("q") and stat[1:].isdigit() and int(stat[1:]) <= 100:
+        return _weighted_quantile(values, weights, int(stat[1:]) / 100)
+    raise UnknownRprofVarError(stat)
+
+
+def horizontal_profiles(
+    step: Step, names: Sequence[str], stats: Sequence[str] = ("mean",)
+) -> dict[str, Rprof]:
+    """Radial profiles of horizontal statistics of fields.
+
+    Statistics are weighted by the horizontal extent of cells. Fields stored
+    in the same file are only read once.
+
+    Args:
+        step: a `Step` of a `StagyyData` instance.
+        names: names of the fields.
+        stats: statistics to compute among "mean", "rms", "min", "max", and
+            quantiles "qN" with N a percentage (e.g. "q50" for the median).
+
+    Returns:
+        the profiles, indexed by "name.stat" (e.g. "T.mean").
+    """
+    geom = step.geom
+    weights = geom.horizontal_areas.ravel()
+    profiles = {}
+    for name in names:
+        fld = step.fields[name]
+        # discard extra points of vector components
+        vals = np.moveaxis(fld.values[: geom.nxtot, : geom.nytot], 2, -1)
+        values = np.asarray(vals.reshape(weights.size, -1), dtype=np.float64)
+        for stat in stats:
+            profiles[f"{name}.{stat}"] = Rprof(
+                _horizontal_stat(values, weights, stat),
+                geom.r_centers,
+                Varr(f"{fld.description} ({stat})", fld.description, fld.dim),
+            )
+    return profiles
+
+
 def stream_function(step: Step) -> Field:
     """Stream function (2D).
 
@@ -249,47 +330,68 @@ def stream_function(step: Step) -> Field:
     Returns:
         the stream function field.
     """
-    if step.geom.twod_yz:
-        x_coord = step.geom.y_walls
-        v_x = step.fields["v2"].values[0, :, :, 0]
-        v_z = step.fields["v3"].values[0, :, :, 0]
-        shape = (1, v_x.shape[0], v_x.shape[1], 1)
-    elif step.geom.twod_xz and step.geom.cartesian:
-        x_coord = step.geom.x_walls
-        v_x = step.fields["v1"].values[:, 0, :, 0]
-        v_z = step.fields["v3"].values[:, 0, :, 0]
-        shape = (v_x.shape[0], 1, v_x.shape[1], 1)
+    return stream_functions([step])[0]
+
+
+def stream_functions(steps: Sequence[Step]) -> list[Field]:
+    """Stream function (2D) of several steps at once.
+
+    The integration is performed on all the steps in one go, which is much
+    faster than calling [`stream_function`][stagpy.processing.stream_function]
+    on each step when processing many snapshots.  All the steps should have
+    the same geometry kind and grid size.
+
+    Args:
+        steps: `Step`s of a `StagyyData` instance.
+
+    Returns:
+        the stream function fields, one per step.
+    """
+    if not steps:
+        return []
+    geom = steps[0].geom
+    if geom.twod_yz:
+        x_coord = np.stack([step.geom.y_walls for step in steps])
+        v_x = np.stack([step.fields["v2"].values[0, :, :, 0] for step in steps])
+        v_z = np.stack([step.fields["v3"].values[0, :, :, 0] for step in steps])
+        shape = (1, v_x.shape[1], v_x.shape[2], 1)
+    elif geom.twod_xz and geom.cartesian:
+        x_coord = np.stack([step.geom.x_walls for step in steps])
+        v_x = np.stack([step.fields["v1"].values[:, 0, :, 0] for step in steps])
+        v_z = np.stack([step.fields["v3"].values[:, 0, :, 0] for step in steps])
+        shape = (v_x.shape[1], 1, v_x.shape[2], 1)
     else:
         raise NotAvailableError(
             "Stream function only implemented in 2D cartesian and spherical annulus"
         )
-    psi = np.zeros_like(v_x)
-    if step.geom.spherical:  # YZ annulus
-        # positions
-        r_nc = step.rprofs.centers  # numerical centers
-        r_pc = step.geom.r_centers  # physical centers
-        r_nw = step.rprofs.walls[:2]  # numerical walls of first cell
-        # vz at center of bottom cells
-        vz0 = ((r_nw[1] - r_nc[0]) * v_z[:, 0] + (r_nc[0] - r_nw[0]) * v_z[:, 1]) / (
-            r_nw[1] - r_nw[0]
-        )
-        psi[1:, 0] = -cumulative_trapezoid(r_pc[0] ** 2 * vz0, x=x_coord)
-        # vx at center
-        vxc = (v_x + np.roll(v_x, -1, axis=0)) / 2
-        for i_x in range(len(x_coord)):
-            psi[i_x, 1:] = psi[i_x, 0] + cumulative_trapezoid(r_pc * vxc[i_x], x=r_nc)
+    from scipy.integrate import cumulative_trapezoid
+
+    # numerical centers and walls of the first cell, indexed by (step, z)
+    z_walls = np.stack([step.rprofs.walls[:2] for step in steps])
+    if geom.spherical:  # YZ annulus
+        z_nc = np.stack([step.rprofs.centers for step in steps])
+        # physical centers
+        r_pc = np.stack([step.geom.r_centers for step in steps])
     else:  # assume cartesian geometry
-        z_nc = step.geom.r_centers
-        z_nw = step.rprofs.walls[:2]
-        vz0 = ((z_nw[1] - z_nc[0]) * v_z[:, 0] + (z_nc[0] - z_nw[0]) * v_z[:, 1]) / (
-            z_nw[1] - z_nw[0]
-        )
-        psi[1:, 0] = -cumulative_trapezoid(vz0, x=x_coord)
-        # vx at center
-        vxc = (v_x + np.roll(v_x, -1, axis=0)) / 2
-        for i_x in range(len(x_coord)):
-            psi[i_x, 1:] = psi[i_x, 0] + cumulative_trapezoid(vxc[i_x], x=z_nc)
-    if step.geom.twod_xz:
+        z_nc = np.stack([step.geom.r_centers for step in steps])
+        r_pc = np.ones_like(z_nc)
+    # vz at center of bottom cells
+    vz0 = (
+        (z_walls[:, 1:] - z_nc[:, :1]) * v_z[:, :, 0]
+        + (z_nc[:, :1] - z_walls[:, :1]) * v_z[:, :, 1]
+    ) / (z_walls[:, 1:] - z_walls[:, :1])
+    psi = np.zeros_like(v_x)
+    psi[:, 1:, 0] = -cumulative_trapezoid(r_pc[:, :1] ** 2 * vz0, x=x_coord, axis=1)
+    # vx at center
+    vxc = (v_x + np.roll(v_x, -1, axis=1)) / 2
+    psi[:, :, 1:] = psi[:, :, :1] + cumulative_trapezoid(
+        r_pc[:, np.newaxis, :] * vxc,
+        x=np.broadcast_to(z_nc[:, np.newaxis, :], vxc.shape),
+        axis=2,
+    )
+    if geom.twod_xz:
         psi = -psi
-    psi = np.reshape(psi, shape)
-    return Field(psi, "Stream function", "m2/s")
+    return [
+        Field(np.reshape(psi_step, shape), "Stream function", "m2/s")
+        for psi_step in psi
+    ]
@@ -0,0 +1,182 @@
+"""Regridding of fields on regular grids.
+
+Yin-yang fields are interpolated on a global latitude/longitude grid.  The
+interpolation is a sparse linear operator that only depends on the grids, it
+is built once per grid and reused for all the fields and snapshots of a run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import typing
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from .datatypes import Field
+from .error import NotAvailableError
+
+if typing.TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+    from .step import Geometry, Step
+
+
+def latlon_grid(
+    nlat: int, nlon: int
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """Cell centers of a regular latitude/longitude grid.
+
+    Args:
+        nlat: number of cells in latitude.
+        nlon: number of cells in longitude.
+
+    Returns:
+        latitudes in [-pi/2, pi/2] and longitudes in [-pi, pi].
+    """
+    dlat = np.pi / nlat
+    dlon = 2 * np.pi / nlon
+    lat = np.linspace(-np.pi / 2 + dlat / 2, np.pi / 2 - dlat / 2, nlat)
+    lon = np.linspace(-np.pi + dlon / 2, np.pi - dlon / 2, nlon)
+    return lat, lon
+
+
+def _bilinear(
+    coord: NDArray[np.float64], centers: NDArray[np.float64]
+) -> tuple[NDArray[np.intp], NDArray[np.float64]]:
+    """Lower neighbour and weight of the upper one along a direction."""
+    ilow = np.clip(np.searchsorted(centers, coord) - 1, 0, centers.size - 2)
+    frac = (coord - centers[ilow]) / (centers[ilow + 1] - centers[ilow])
+    return ilow, np.clip(frac, 0, 1)
+
+
+def _yinyang_weights(
+    lat_yy: tuple[float, ...], lon_yy: tuple[float, ...], nlat: int, nlon: int
+) -> sparse.csr_array:
+    lat_c = np.array(lat_yy)
+    lon_c = np.array(lon_yy)
+    lat, lon = latlon_grid(nlat, nlon)
+    lat, lon = (arr.ravel() for arr in np.meshgrid(lat, lon, indexing="ij"))
+    xyz = np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+    # the yang grid is the yin grid rotated by (x, y, z) -> (-x, z, y)
+    xyz_yang = np.stack((-xyz[0], xyz[2], xyz[1]))
+    coords = []
+    for x, y, z in (xyz, xyz_yang):
+        coords.append((np.arcsin(np.clip(z, -1, 1)), np.arctan2(y, x)))
+    # each point is taken from the block in which it lies furthest from edges
+    lat_max = lat_c[-1] + (lat_c[1] - lat_c[0]) / 2
+    lon_max = lon_c[-1] + (lon_c[1] - lon_c[0]) / 2
+    edge_dist = [
+        np.maximum(np.abs(blat) / lat_max, np.abs(blon) / lon_max)
+        for blat, blon in coords
+    ]
+    iblock = (edge_dist[1] < edge_dist[0]).astype(np.intp)
+    blat = np.where(iblock == 0, coords[0][0], coords[1][0])
+    blon = np.where(iblock == 0, coords[0][1], coords[1][1])
+
+    ilat, flat = _bilinear(blat, lat_c)
+    ilon, flon = _bilinear(blon, lon_c)
+    rows = np.repeat(np.arange(lat.size), 4)
+    cols = []
+    vals = []
+    for dlat, wlat in ((0, 1 - flat), (1, flat)):
+        for dlon, wlon in ((0, 1 - flon), (1, flon)):
+            # columns follow the (theta, phi, block) order of fields
+            cols.append(((ilat + dlat) * lon_c.size + ilon + dlon) * 2 + iblock)
+            vals.append(wlat * wlon)
+    return sparse.csr_array(
+        (
+            np.stack(vals, axis=1).ravel(),
+            (rows, np.stack(cols, axis=1).ravel()),
+        ),
+        shape=(lat.size, lat_c.size * lon_c.size * 2),
+    )
+
+
+def latlon_weights(
+    geom: Geometry, nlat: int, nlon: int, cache_dir: Path | None = None
+) -> sparse.csr_array:
+    """Interpolation operator from a yin-yang grid to a lat/lon grid.
+
+    Args:
+        geom: geometry of the yin-yang grid.
+        nlat: number of cells in latitude of the target grid.
+        nlon: number of cells in longitude of the target grid.
+        cache_dir: directory where the operator is stored, keyed by a
+            fingerprint of the grids, to be reused across sessions.
+
+    Returns:
+        a sparse matrix of shape `(nlat * nlon, nttot * nptot * 2)` acting on
+            fields flattened in (theta, phi, block) order.
+    """
+    if not geom.yinyang:
+        raise NotAvailableError("Lat/lon regridding only implemented for yin-yang")
+    return _cached_weights(
+        tuple(geom.t_centers.tolist()),
+        tuple(geom.p_centers.tolist()),
+        nlat,
+        nlon,
+        None if cache_dir is None else Path(cache_dir),
+    )
+
+
+@lru_cache(maxsize=8)
+def _cached_weights(
+    lat_yy: tuple[float, ...],
+    lon_yy: tuple[float, ...],
+    nlat: int,
+    nlon: int,
+    cache_dir: Path | None,
+) -> sparse.csr_array:
+    if cache_dir is None:
+        return _yinyang_weights(lat_yy, lon_yy, nlat, nlon)
+    hasher = hashlib.sha256()
+    hasher.update(f"yinyang\0{nlat}\0{nlon}\0".encode())
+    hasher.update(np.array(lat_yy).tobytes())
+    hasher.update(np.array(lon_yy).tobytes())
+    entry = cache_dir / f"latlon_{hasher.hexdigest()}.npz"
+    if entry.is_file():
+        try:
+            return sparse.csr_array(sparse.load_npz(entry))
+        except (OSError, ValueError):
+            # corrupted entry, it is simply recomputed
+            pass
+    weights = _yinyang_weights(lat_yy, lon_yy, nlat, nlon)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = entry.with_name(f"{entry.stem}.{os.getpid()}.tmp.npz")
+    sparse.save_npz(tmp, weights)
+    os.replace(tmp, entry)
+    return weights
+
+
+def latlon(step: Step, name: str, nlat: int = 180, nlon: int = 360) -> Field:
+    """Interpolate a yin-yang scalar field on a global lat/lon grid.
+
+    The interpolation operator is cached, in the memo directory of the
+    `StagyyData` instance if one is set.  Interpolating several fields or
+    snapshots therefore costs one sparse matrix product per field.
+
+    Args:
+        step: a `Step` of a `StagyyData` instance.
+        name: name of the scalar field.
+        nlat: number of cells in latitude, see `latlon_grid`.
+        nlon: number of cells in longitude, see `latlon_grid`.
+
+    Returns:
+        the field indexed by latitude, longitude, radius, and a single block.
+    """
+    geom = step.geom
+    memo_dir = step.sdat.memo_dir
+    weights = latlon_weights(
+        geom, nlat, nlon, None if memo_dir is None else Path(memo_dir)
+    )
+    fld = step.fields[name]
+    if fld.shape[:2] != (geom.nttot, geom.nptot) or len(fld.shape) != 4:
+        raise NotAvailableError(f"{name} is not a cell-centered scalar field")
+    # (theta, phi, z, block) -> (theta * phi * block, z)
+    values = np.moveaxis(fld.values, 3, 2).reshape(weights.shape[1], -1)
+    regridded = (weights @ values).reshape(nlat, nlon, -1, 1)
+    return Field(regridded.astype(fld.values.dtype), fld.description, fld.dim)
@@ -9,17 +9,26 @@ Note:
 from __future__ import annotations
 
 import typing
-from collections import abc
+from collections import OrderedDict, abc
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from functools import cached_property
 from itertools import zip_longest
 from pathlib import Path
+from weakref import WeakValueDictionary
 
 import numpy as np
 
-from . import _helpers, error, parsers, phyvars, step
+from . import _helpers, _reductions, error, parsers, phyvars, step
 from . import datatypes as dt
-from ._caching import FieldCache, StepSnap, StepSnapH5, StepSnapLegacy
+from ._caching import (
+    FieldCache,
+    FieldRanges,
+    MemoStore,
+    StepSnap,
+    StepSnapH5,
+    StepSnapLegacy,
+)
 from .parfile import StagyyPar
 from .parsers.h5.field import FieldXmf
 from .parsers.h5.tracers import TracersXmf
@@ -28,9 +37,9 @@ from .step import Step
 if typing.TYPE_CHECKING:
     from collections.abc import Iterable, Iterator, Sequence
     from os import PathLike
-    from typing import Callable, TypeAlias
+    from typing import Any, Callable, TypeAlias
 
-    from numpy.typing import NDArray
+    from numpy.typing import ArrayLike, DTypeLike, NDArray
     from pandas import DataFrame, Series
 
     from .config import Core
@@ -180,7 +189,7 @@ class Tseries:
             time = tseries.time
             meta = tseries.meta
         elif name in phyvars.TIME_EXTRA:
-            self._cached_extra[name] = phyvars.TIME_EXTRA[name](self.sdat)
+            self._cached_extra[name] = self._compute_extra(name)
             tseries = self._cached_extra[name]
             series = tseries.values
             time = tseries.time
@@ -189,6 +198,14 @@ class Tseries:
             raise error.UnknownTimeVarError(name)
         return dt.Tseries(series, time, meta)
 
+    def _compute_extra(self, name: str) -> dt.Tseries:
+        sdat = self.sdat
+        if sdat._memo is None:
+            return phyvars.TIME_EXTRA[name](sdat)
+        return sdat._memo.tseries(
+            name, sdat._memo_inputs, lambda: phyvars.TIME_EXTRA[name](sdat)
+        )
+
     def tslice(
         self, name: str, tstart: float | None = None, tend: float | None = None
     ) -> dt.Tseries:
@@ -227,6 +244,30 @@ class Tseries:
         """
         return self._tseries.index.values
 
+    @cached_property
+    def _sorted_isteps(self) -> tuple[NDArray[np.int64], NDArray[np.intp]]:
+        """Sorted steps indices along with their rows in the time series table."""
+        if self._data is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.intp)
+        isteps = self._data.index.to_numpy(dtype=np.int64)
+        order = np.argsort(isteps, kind="stable")
+        return isteps[order], order
+
+    def _rows_at_steps(self, isteps: NDArray[np.int64]) -> NDArray[np.intp]:
+        """Rows of the time series table at given steps, -1 where missing."""
+        sorted_isteps, order = self._sorted_isteps
+        if sorted_isteps.size == 0:
+            return np.full(isteps.shape, -1, dtype=np.intp)
+        idx = sorted_isteps.searchsorted(isteps).clip(max=sorted_isteps.size - 1)
+        return np.where(sorted_isteps[idx] == isteps, order[idx], -1)
+
+    def _time_at_step(self, istep: int) -> float | None:
+        """Time of a given step, None if it is absent from time series."""
+        row = self._rows_at_steps(np.array([istep]))[0]
+        if row < 0:
+            return None
+        return float(self.time[row])
+
     def at_step(self, istep: int) -> Series[np.float64]:
         """Time series output for a given step."""
         return self._tseries.loc[istep]  # type: ignore
@@ -310,6 +351,13 @@ class Steps:
     sdat.steps[istep]  # Step object of the istep-th time step
     ```
 
+    `Step` objects are created on demand.  The last `recent` steps accessed
+    are kept in memory, with the data they lazily read or computed.  Other
+    steps are released once they are not referenced anymore, so that
+    iterating over long runs does not keep millions of them in memory.  As
+    long as a `Step` is referenced, the item accessor returns that same
+    object.
+
     Slices or tuple of istep and slices of `Steps` object are
     `StepsView` instances that you can iterate and filter:
 
@@ -329,13 +377,21 @@ class Steps:
     """
 
     sdat: StagyyData
+    recent: int = 16
 
     def __repr__(self) -> str:
         return f"{self.sdat!r}.steps"
 
     @cached_property
-    def _data(self) -> dict[int, Step]:
-        return {}
+    def _data(self) -> WeakValueDictionary[int, Step]:
+        # steps are only kept alive while referenced elsewhere, step metadata
+        # lives in arrays shared by all steps (see StepSnap and Tseries)
+        return WeakValueDictionary()
+
+    @cached_property
+    def _recent(self) -> OrderedDict[int, Step]:
+        # strong references to the last steps accessed, least recent first
+        return OrderedDict()
 
     @typing.overload
     def __getitem__(self, istep: int) -> Step: ...
@@ -362,14 +418,21 @@ class Steps:
                 raise error.InvalidTimestepError(
                     self.sdat, istep, f"Last istep is {len(self) - 1}"
                 )
-        if istep not in self._data:
-            self._data[istep] = Step(istep, self.sdat)
-        return self._data[istep]
+        step = self._data.get(istep)
+        if step is None:
+            step = Step(istep, self.sdat)
+            self._data[istep] = step
+        self._recent[istep] = step
+        self._recent.move_to_end(istep)
+        while len(self._recent) > self.recent:
+            self._recent.popitem(last=False)
+        return step
 
     def __delitem__(self, istep: int | None) -> None:
-        if istep is not None and istep in self._data:
+        if istep is not None:
             self.sdat._field_cache.evict_istep(istep)
-            del self._data[istep]
+            self._recent.pop(istep, None)
+            self._data.pop(istep, None)
 
     @cached_property
     def _len(self) -> int:
@@ -619,6 +682,65 @@ class StepsView:
             filters=self.filters.compose_with(new_filters),
         )
 
+    def fields_reduce(
+        self,
+        name: str,
+        ops: Sequence[str] = ("mean", "std", "min", "max"),
+        horizontal: bool = False,
+        workers: int | None = None,
+    ) -> dict[str, NDArray[np.float64]]:
+        """Reduce a field over the snapshots of the view.
+
+        Snapshots are read once, one after the other, and statistics are
+        accumulated on the fly so that only a few arrays the size of the field
+        are kept in memory.  Snapshots lacking the field are skipped.
+
+        Args:
+            name: name of the field.
+            ops: reductions to compute, among "mean", "var", "std", "min", and
+                "max".  "min" and "max" ignore NaNs.
+            horizontal: if true, also reduce along the horizontal directions
+                and blocks, yielding statistics per radius.
+            workers: number of threads reading snapshots concurrently.  By
+                default, snapshots are read in the calling thread.
+
+        Returns:
+            the requested reductions, indexed by x, y, z, and block (or only z
+                with `horizontal`).
+        """
+        return _reductions.fields_reduce(
+            self.filter(snap=True), name, ops, horizontal, workers
+        )
+
+    def horizontal_profiles(
+        self, names: Sequence[str], stats: Sequence[str] = ("mean",)
+    ) -> tuple[NDArray[np.int64], dict[str, NDArray[np.float64]]]:
+        """Radial profiles of horizontal statistics of fields over the view.
+
+        See [`horizontal_profiles`][stagpy.processing.horizontal_profiles]
+        for the available statistics.  Profiles are also available from the
+        `rprofs` attribute of each snapshot while it is kept in memory, and
+        are persisted in the memo directory if any.
+
+        Args:
+            names: names of the fields.
+            stats: statistics to compute.
+
+        Returns:
+            time steps of the snapshots, and profiles stacked over snapshots
+                indexed by "name.stat".
+        """
+        isteps = []
+        profiles: dict[str, list[NDArray[np.float64]]] = {}
+        for snap in self.filter(snap=True):
+            isteps.append(snap.istep)
+            step_profs = snap.rprofs._field_stats(names, stats)
+            for key, rprof in step_profs.items():
+                profiles.setdefault(key, []).append(rprof.values)
+        return np.array(isteps, dtype=np.int64), {
+            key: np.stack(profs) for key, profs in profiles.items()
+        }
+
     def __iter__(self) -> Iterator[Step]:
         for item in self.items:
             if isinstance(item, slice):
@@ -633,8 +755,94 @@ class StepsView:
         return all(s1 is s2 for s1, s2 in zip_longest(self, other))
 
 
+def _chunk_sizes(size: int, nchunks: int) -> tuple[int, ...]:
+    """Split size in chunks, the last one holding the extra points."""
+    npc = size // nchunks
+    return (npc,) * (nchunks - 1) + (size - npc * (nchunks - 1),)
+
+
+@dataclass(frozen=True)
+class FieldStack:
+    """Lazy stack of a field over several snapshots.
+
+    Instances behave as a read-only array indexed by snapshot, x, y, z and
+    block (surface fields have no z direction).  Indexing only reads the
+    snapshots and parallel subdomains that are needed, see
+    [`Field.read`][stagpy.datatypes.Field.read].
+
+    The `chunks` attribute follows the layout of the output files, each chunk
+    being one parallel subdomain of one snapshot.  This lets array libraries
+    handle the stack out of core and in parallel, e.g. with
+    `dask.array.from_array(stack, chunks=stack.chunks)`.
+
+    Args:
+        steps: the snapshots.
+        name: name of the field.
+    """
+
+    steps: Sequence[Step]
+    name: str
+
+    @cached_property
+    def _first(self) -> dt.Field:
+        if not self.steps:
+            raise error.MissingDataError(f"No snapshot to stack {self.name}")
+        return self.steps[0].fields[self.name]
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Shape of the stack."""
+        return (len(self.steps), *self._first.shape)
+
+    @property
+    def ndim(self) -> int:
+        """Number of dimensions of the stack."""
+        return len(self.shape)
+
+    @property
+    def dtype(self) -> np.dtype[Any]:
+        """Type of the field values."""
+        return self.steps[0].sdat._field_dtype
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    @cached_property
+    def chunks(self) -> tuple[tuple[int, ...], ...]:
+        """Chunk sizes along each dimension."""
+        shape = self._first.shape
+        ncs = self.steps[0].geom._header["ncs"]
+        chunks: list[tuple[int, ...]] = [(1,) * len(self.steps)]
+        for idir, size in enumerate(shape[:-1]):
+            nchunks = int(ncs[idir]) if idir < len(ncs) else 1
+            chunks.append(_chunk_sizes(size, min(nchunks, size)))
+        chunks.append((1,) * shape[-1])
+        return tuple(chunks)
+
+    def __getitem__(
+        self, key: int | slice | tuple[int | slice, ...]
+    ) -> NDArray[np.floating]:
+        if not isinstance(key, tuple):
+            key = (key,)
+        isnap, index = key[0], key[1:]
+        if isinstance(isnap, int):
+            return self.steps[isnap].fields[self.name].read(index)
+        values = [step.fields[self.name].read(index) for step in self.steps[isnap]]
+        if values:
+            return np.stack(values)
+        # empty selection of snapshots
+        return np.empty((0, *self._first.shape), dtype=self.dtype)[
+            (slice(None), *index)
+        ]
+
+    def __array__(
+        self, dtype: DTypeLike | None = None, copy: bool | None = None
+    ) -> NDArray[Any]:
+        return np.asarray(self[:], dtype=dtype)
+
+
 def _sdat_from_conf(core: Core) -> StagyyData:
-    return StagyyData(core.path, core.read_parameters_dat)
+    return StagyyData(core.path, core.read_parameters_dat, core.memo_dir)
 
 
 @dataclass(frozen=True)
@@ -651,10 +859,26 @@ class StagyyData:
             runs of StagYY that predate version 1.2.6 for which the
             `parameters.dat` file contained some values affected by internal
             logic.
+        memo_dir: directory where computed time series and radial profiles
+            (see `stagpy.phyvars.TIME_EXTRA` and `stagpy.phyvars.RPROF_EXTRA`)
+            as well as the min and max values of fields are persisted.  They
+            are then reused by later instances as long as the StagPy version
+            and the output files they are computed from are unchanged.  Set to
+            None (the default) to disable persistence.
+        field_dtype: floating point type of the field arrays read from the
+            output files and of derived fields.  StagYY writes single
+            precision fields, setting this to `np.float32` halves the memory
+            held by the field cache.
     """
 
     path_hint: PathLike[str] | str
     read_parameters_dat: bool = True
+    memo_dir: PathLike[str] | str | None = None
+    field_dtype: DTypeLike = np.float64
+
+    def __post_init__(self) -> None:
+        # fail early rather than on the first field read
+        _ = self._field_dtype
 
     @property
     def path(self) -> Path:
@@ -734,6 +958,39 @@ class StagyyData:
             return parsers.txt.rprof(rproffile)
         return {}, None
 
+    @cached_property
+    def _rprofs_stacks(
+        self,
+    ) -> dict[str, tuple[NDArray[np.int64], NDArray[np.float64]]]:
+        return {}
+
+    def _rprofs_stack(self, name: str) -> tuple[NDArray[np.int64], NDArray[np.float64]]:
+        """Radial profile output by StagYY stacked over all steps having rprofs.
+
+        Args:
+            name: name of a profile output by StagYY.
+
+        Returns:
+            steps indices and profiles indexed by (step, radial position).
+        """
+        if name in self._rprofs_stacks:
+            return self._rprofs_stacks[name]
+        rprofs = self._rprof_and_times[0]
+        nsteps = len(self.steps)
+        isteps = np.array(
+            sorted(istep for istep in rprofs if 0 <= istep < nsteps), dtype=np.int64
+        )
+        if isteps.size == 0:
+            raise error.MissingDataError(f"No rprof data in {self}")
+        try:
+            profs = np.stack(
+                [rprofs[istep][name].to_numpy(dtype=np.float64) for istep in isteps]
+            )
+        except KeyError:
+            raise error.UnknownRprofVarError(name)
+        self._rprofs_stacks[name] = isteps, profs
+        return isteps, profs
+
     @property
     def rtimes(self) -> DataFrame | None:
         """Radial profiles times."""
@@ -759,6 +1016,148 @@ class StagyyData:
             raise error.InvalidNfieldsError(nfields)
         self._field_cache.resize(nfields)
 
+    def field_stack(self, name: str, view: Iterable[Step] | None = None) -> FieldStack:
+        """Lazy stack of a field over several snapshots.
+
+        Args:
+            name: name of the field.
+            view: the snapshots to stack, e.g. `sdat.snaps[10:20]`.  Steps
+                that are not snapshots are ignored.  Defaults to all the
+                snapshots.
+
+        Returns:
+            an array-like stack of the field indexed by snapshot, x, y, z, and
+                block.
+        """
+        steps = self.snaps if view is None else view
+        return FieldStack(
+            steps=tuple(step for step in steps if step.isnap is not None), name=name
+        )
+
+    def probe(
+        self,
+        name: str,
+        points: ArrayLike,
+        view: Iterable[Step] | None = None,
+        workers: int | None = None,
+    ) -> tuple[NDArray[np.int64], NDArray[np.floating]]:
+        """Values of a field at a few points over several snapshots.
+
+        The points are located once in the files of the first snapshot, only
+        their values are then read from the files of each snapshot.  Snapshots
+        whose files have another layout, and fields already in memory or
+        computed from other fields, are read with
+        [`Field.read`][stagpy.datatypes.Field.read] instead.  Lines are
+        probed by listing all of their points, e.g. a vertical line is
+        `[(ix, iy, iz, ib) for iz in range(geom.nztot)]`.  Use the `at_z` and
+        `at_r` methods of [`Geometry`][stagpy.step.Geometry] to locate points.
+
+        Args:
+            name: name of the field.
+            points: indices of the points along x, y, z, and block (or x, y,
+                and block for surface fields), one row per point.
+            view: the snapshots to probe, e.g. `sdat.snaps[10:20]`.  Steps
+                that are not snapshots or lack the field are ignored.
+                Defaults to all the snapshots.
+            workers: number of threads reading snapshots concurrently.  By
+                default, snapshots are read in the calling thread.
+
+        Returns:
+            time steps of the snapshots, and values of the field indexed by
+                snapshot and point.
+        """
+        pts = np.asarray(points, dtype=np.intp)
+        if pts.ndim != 2:
+            raise error.StagpyError("points should be a sequence of indices")
+        index = tuple(pts.T)
+        steps = self.snaps if view is None else view
+        # field lookups (and thus cache updates) happen in the calling thread
+        flds = [
+            (snap, snap.fields[name])
+            for snap in steps
+            if snap.isnap is not None and name in snap.fields
+        ]
+        isteps = np.array([snap.istep for snap, _ in flds], dtype=np.int64)
+        read_at = flds[0][0].fields._locate(name, index) if flds else None
+
+        def read(item: tuple[Step, dt.Field]) -> NDArray[np.floating]:
+            snap, fld = item
+            if read_at is not None and not fld.loaded:
+                values = read_at(snap)
+                if values is not None:
+                    return values
+            return fld.read(index)
+
+        if workers is None:
+            values = [read(item) for item in flds]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                values = list(pool.map(read, flds))
+        if not values:
+            return isteps, np.empty((0, len(pts)), dtype=self._field_dtype)
+        return isteps, np.stack(values)
+
+    def tracer_trajectories(
+        self,
+        ids: ArrayLike,
+        view: Iterable[Step] | None = None,
+        names: Sequence[str] = ("x", "y", "z"),
+        idvar: str = "ID",
+        workers: int | None = None,
+    ) -> tuple[NDArray[np.int64], dict[str, NDArray[np.float64]]]:
+        """Trajectories of tracers identified by a tracers variable.
+
+        Tracers are located in each snapshot with
+        [`Tracers.locate`][stagpy.step.Tracers.locate], only the rows of the
+        requested tracers are then read from legacy binary files.  Snapshots
+        are processed as a stream, identifiers of tracers are not kept in
+        memory once tracers are located.
+
+        Args:
+            ids: identifiers of the tracers to follow.
+            view: the snapshots to consider, e.g. `sdat.snaps[10:20]`.
+                Snapshots without tracers identifiers are ignored.  Defaults to
+                all the snapshots.
+            names: tracers variables to extract along trajectories.
+            idvar: name of the tracers variable holding identifiers.
+            workers: number of threads reading snapshots concurrently.  By
+                default, snapshots are read in the calling thread.
+
+        Returns:
+            time steps of the snapshots, and tracers variables indexed by
+                snapshot and tracer.  Values are NaN in snapshots where a
+                tracer is not found.
+        """
+        wanted = np.asarray(ids).ravel()
+        steps = self.snaps if view is None else view
+        snaps = (snap for snap in steps if snap.isnap is not None)
+
+        def gather(snap: Step) -> tuple[int, dict[str, NDArray[np.float64]]] | None:
+            # identifiers are only needed once, they are not kept in memory
+            located = snap.tracers.locate(wanted, idvar, cache=False)
+            if located is None:
+                return None
+            iblocks, rows = located
+            values = {}
+            for name in names:
+                vals = np.full(wanted.size, np.nan)
+                for iblock in np.unique(iblocks[iblocks >= 0]):
+                    sel = iblocks == iblock
+                    vals[sel] = snap.tracers.rows(name, int(iblock), rows[sel])
+                values[name] = vals
+            return snap.istep, values
+
+        found = [
+            item
+            for item in _helpers.bounded_map(gather, snaps, workers)
+            if item is not None
+        ]
+        isteps = np.array([istep for istep, _ in found], dtype=np.int64)
+        return isteps, {
+            name: np.array([vals[name] for _, vals in found]).reshape(-1, wanted.size)
+            for name in names
+        }
+
     def _find_file(self, fname: str) -> Path | None:
         """Return path of StagYY output file if found.
 
@@ -787,6 +1186,46 @@ class StagyyData:
         )
         return possible_files & self._files
 
+    @cached_property
+    def _field_dtype(self) -> np.dtype[Any]:
+        dtype = np.dtype(self.field_dtype)
+        if not np.issubdtype(dtype, np.floating):
+            raise error.StagpyError(f"field_dtype should be a float type, got {dtype}")
+        return dtype
+
+    @cached_property
+    def _memo(self) -> MemoStore | None:
+        if self.memo_dir is None:
+            return None
+        return MemoStore(root=Path(self.memo_dir), run=self.parpath)
+
+    @cached_property
+    def _memo_inputs(self) -> tuple[Path, ...]:
+        """Files from which time series and radial profiles are computed."""
+        candidates = [
+            self.parpath,
+            self.par.h5_output("TimeSeries.h5"),
+            self.par.legacy_output("time.dat"),
+            self.par.h5_output("time.dat"),
+            self.par.h5_output("rprof.h5"),
+            self.par.legacy_output("rprof.dat"),
+            self.par.h5_output("rprof.dat"),
+        ]
+        # other files read by StagyyPar.from_main_par
+        dfltfile = self.par.get(
+            "default_parameters_parfile", "par_name_defaultparameters", None
+        )
+        if dfltfile is not None:
+            candidates.append(self.par.root / dfltfile)
+        if self.read_parameters_dat:
+            candidates.append(self.par.legacy_output("parameters.dat"))
+            candidates.append(self.par.h5_output("parameters.dat"))
+        return tuple(path for path in candidates if path.is_file())
+
+    @cached_property
+    def _field_ranges(self) -> FieldRanges:
+        return FieldRanges(memo=self._memo)
+
     @cached_property
     def _field_cache(self) -> FieldCache:
         return FieldCache(maxsize=50)
@@ -12,26 +12,61 @@ import typing
 from abc import ABC, abstractmethod
 from collections.abc import Sequence
 from dataclasses import dataclass
-from functools import cached_property
+from functools import cached_property, lru_cache, partial
 
 import numpy as np
 
-from . import error, parsers, phyvars
-from .datatypes import Field, Rprof, Varr
+from . import binning, error, parsers, phyvars, processing
+from .datatypes import Field, LazyField, Rprof, Varr
 from .dimensions import Scales
 
 if typing.TYPE_CHECKING:
     from collections.abc import Mapping
+    from pathlib import Path
     from typing import Any, Callable, NoReturn
 
-    from numpy.typing import NDArray
+    from numpy.typing import ArrayLike, NDArray
     from pandas import DataFrame, Series
 
     from ._caching import FieldCache
+    from .parsers._index import FieldIndex
+    from .parsers.bin.tracers import TracersHeader
     from .phyvars import FieldVars
     from .stagyydata import StagyyData
 
 
+@lru_cache(maxsize=8)
+def _horizontal_areas(
+    t_walls: tuple[float, ...],
+    p_walls: tuple[float, ...],
+    spherical: bool,
+    nblocks: int,
+) -> NDArray[np.float64]:
+    """Horizontal extent of cells, shared between steps with the same grid."""
+    twalls = np.array(t_walls)
+    pwalls = np.array(p_walls)
+    yinyang = spherical and nblocks == 2
+    if yinyang:
+        # theta is the latitude in yin-yang
+        dtheta = np.diff(np.sin(twalls))
+    elif spherical:
+        dtheta = -np.diff(np.cos(twalls))
+    else:
+        dtheta = np.diff(twalls)
+    areas = np.repeat(np.outer(dtheta, np.diff(pwalls))[:, :, np.newaxis], nblocks, 2)
+    if yinyang:
+        tcen = (twalls[:-1] + twalls[1:]) / 2
+        pcen = (pwalls[:-1] + pwalls[1:]) / 2
+        lat, lon = np.meshgrid(tcen, pcen, indexing="ij")
+        # position of yang cells in the yin frame, (x, y, z) -> (-x, z, y)
+        lat_yin = np.arcsin(np.cos(lat) * np.sin(lon))
+        lon_yin = np.arctan2(np.sin(lat), -np.cos(lat) * np.cos(lon))
+        in_yin = (np.abs(lat_yin) < twalls[-1]) & (np.abs(lon_yin) < pwalls[-1])
+        areas[:, :, 1][in_yin] = 0
+    areas.flags.writeable = False
+    return areas
+
+
 @dataclass(frozen=True)
 class Geometry:
     """Geometry information.
@@ -207,6 +242,61 @@ class Geometry:
         """Same as p_centers."""
         return self.p_centers
 
+    @cached_property
+    def _radial_power(self) -> int:
+        """Exponent of the radius in the area of horizontal surfaces."""
+        if self.spherical:
+            return 2
+        return 1 if self.cylindrical else 0
+
+    @cached_property
+    def horizontal_areas(self) -> NDArray[np.float64]:
+        """Horizontal extent of cells, indexed by x/theta, y/phi, and block.
+
+        In curvilinear geometry, this is the extent of cells on the surface
+        of unit radius.  In yin-yang geometry, yang cells overlapping the yin
+        block have a null area so that the overlap is not counted twice.  This
+        array is read-only, it is shared between steps with the same grid.
+        """
+        return _horizontal_areas(
+            tuple(self.t_walls.tolist()),
+            tuple(self.p_walls.tolist()),
+            self.spherical,
+            self.nbtot,
+        )
+
+    @cached_property
+    def wall_areas(self) -> NDArray[np.float64]:
+        """Area of horizontal surfaces at each wall along the z/r direction."""
+        area = self.horizontal_areas.sum() * self.r_walls**self._radial_power
+        area.flags.writeable = False
+        return area
+
+    @cached_property
+    def shell_volumes(self) -> NDArray[np.float64]:
+        """Volume of each layer of cells along the z/r direction."""
+        power = self._radial_power + 1
+        volumes = self.horizontal_areas.sum() * np.diff(self.r_walls**power) / power
+        volumes.flags.writeable = False
+        return volumes
+
+    @cached_property
+    def cell_volumes(self) -> NDArray[np.float64]:
+        """Volume of cells, indexed by x/theta, y/phi, z/r, and block.
+
+        Integrals of a cell-centered field over the domain reduce to a dot
+        product with this read-only array, yang cells overlapping the yin
+        block have a null volume.
+        """
+        power = self._radial_power + 1
+        radial = np.diff(self.r_walls**power) / power
+        volumes = (
+            self.horizontal_areas[:, :, np.newaxis, :]
+            * radial[np.newaxis, np.newaxis, :, np.newaxis]
+        )
+        volumes.flags.writeable = False
+        return volumes
+
     @cached_property
     def rcmb(self) -> float:
         """Radius of CMB, 0 in cartesian geometry."""
@@ -308,19 +398,26 @@ class Fields:
 
         if name in self.extravars:
             fld = self.extravars[name](self.step)
+            dtype = self.step.sdat._field_dtype
+            if fld.values.dtype != dtype:
+                fld = Field(fld.values.astype(dtype), fld.description, fld.dim)
             self.cache.insert(self.step.istep, name, fld)
             return fld
 
         # requested field is one of self.variables
-        fld_names, parsed_data = self._get_raw_data(name)
-        if parsed_data is None:
+        fld_names, reader = self._get_reader(name)
+        if reader is None:
             raise error.MissingDataError(
                 f"Missing field {name} in step {self.step.istep}"
             )
-        _, fields = parsed_data
-        for fld_name, fld_vals in zip(fld_names, fields):
+        for ivar, fld_name in enumerate(fld_names[: reader.shape[0]]):
             meta = self.variables.meta(fld_name)
-            fld = Field(fld_vals, meta.description, meta.dim)
+            fld = LazyField(
+                partial(reader.values, ivar),
+                reader.shape[1:],
+                meta.description,
+                meta.dim,
+            )
             self.cache.insert(self.step.istep, fld_name, fld)
         return self[name]
 
@@ -331,36 +428,192 @@ class Fields:
             return False
         return True
 
-    def _get_raw_data(
-        self, name: str
-    ) -> tuple[Sequence[str], tuple[dict[str, Any], NDArray[np.float64]] | None]:
-        """Find file holding data and return its content."""
+    def _get_reader(self, name: str) -> tuple[Sequence[str], _FieldsReader | None]:
+        """Find file holding data and return a reader of its content."""
         # try legacy first, then hdf5
         filestem, list_fvar = self.variables.legacy_file_info(name)
-        parsed_data = None
-        if self.step.isnap is None:
+        isnap = self.step.isnap
+        if isnap is None:
             return list_fvar, None
-        fieldfile = self.step.sdat.par.legacy_output(filestem, self.step.isnap)
-        if fieldfile.is_file():
-            parsed_data = parsers.bin.field.field(fieldfile)
-            return list_fvar, parsed_data
-
         sdat = self.step.sdat
+        dtype = sdat._field_dtype
+        fieldfile = sdat.par.legacy_output(filestem, isnap)
+        shape = parsers.bin.field.shape(fieldfile)
+        if shape is not None:
+            inputs: tuple[Path, ...] = (fieldfile,)
+            return list_fvar, _FieldsReader(
+                read=lambda index: parsers.bin.field.field(fieldfile, dtype, index),
+                shape=shape,
+                inputs=inputs,
+                on_load=partial(self._record_ranges, list_fvar, inputs),
+            )
+
         if filestem in phyvars.SFIELD.h5_files:
             xmff = sdat._botxmf if name.endswith("bot") else sdat._topxmf
         else:
             xmff = sdat._dataxmf
         if xmff is None:
-            return list_fvar, parsed_data
+            return list_fvar, None
 
         filestem, list_fvar = self.variables.h5_file_info(name)
+        geom_header = self.step.geom._maybe_header
+        if geom_header is None:
+            return list_fvar, None
+        shape = parsers.h5.field.shape(xmff, filestem, isnap, geom_header)
+        if shape is None:
+            return list_fvar, None
+        header = geom_header if filestem in phyvars.SFIELD.h5_files else None
+        inputs = tuple(
+            {
+                fsub.file: None
+                for fsub in xmff[isnap].field_subdomains(xmff.path.parent, filestem)
+            }
+        )
+        return list_fvar, _FieldsReader(
+            read=lambda index: parsers.h5.field.field(
+                xmff, filestem, isnap, header, dtype, index
+            ),
+            shape=shape,
+            inputs=inputs,
+            on_load=partial(self._record_ranges, list_fvar, inputs),
+        )
+
+    def _locate(
+        self, name: str, index: FieldIndex
+    ) -> Callable[[Step], NDArray[np.floating] | None] | None:
+        """Locate a part of a field to read it from other snapshots.
+
+        Snapshots of a run share the layout of their files.  The positions
+        of the values at index are found once in this snapshot, only those
+        values are then read from the files of other snapshots.
+
+        Returns:
+            a function reading the values of the field at index in a snapshot,
+                or None if that snapshot doesn't share the layout of this one.
+                None if the field cannot be located.
+        """
+        isnap = self.step.isnap
+        if name in self.extravars or isnap is None:
+            return None
+        sdat = self.step.sdat
+        dtype = sdat._field_dtype
+        filestem, list_fvar = self.variables.legacy_file_info(name)
+        fieldfile = sdat.par.legacy_output(filestem, isnap)
+        bin_pos = parsers.bin.field.positions(fieldfile, index)
+        if bin_pos is not None:
+            ivar = list_fvar.index(name)
+
+            def read_bin(step: Step) -> NDArray[np.floating] | None:
+                assert step.isnap is not None
+                fieldfile = sdat.par.legacy_output(filestem, step.isnap)
+                values = parsers.bin.field.read_positions(fieldfile, bin_pos, dtype)
+                return None if values is None else values[ivar]
+
+            return read_bin
+
         if filestem in phyvars.SFIELD.h5_files:
-            header = self.step.geom._maybe_header
-            assert header is not None
+            xmff = sdat._botxmf if name.endswith("bot") else sdat._topxmf
         else:
-            header = None
-        parsed_data = parsers.h5.field.field(xmff, filestem, self.step.isnap, header)
-        return list_fvar, parsed_data
+            xmff = sdat._dataxmf
+        geom_header = self.step.geom._maybe_header
+        if xmff is None or geom_header is None:
+            return None
+        filestem, list_fvar = self.variables.h5_file_info(name)
+        h5_pos = parsers.h5.field.positions(xmff, filestem, isnap, geom_header, index)
+        if h5_pos is None:
+            return None
+        ivar = list_fvar.index(name)
+
+        def read_h5(step: Step) -> NDArray[np.floating] | None:
+            header = step.geom._maybe_header
+            if step.isnap is None or header is None:
+                return None
+            values = parsers.h5.field.read_positions(
+                xmff, filestem, step.isnap, header, h5_pos, dtype
+            )
+            return None if values is None else values[ivar]
+
+        return read_h5
+
+    def _record_ranges(
+        self,
+        names: Sequence[str],
+        inputs: tuple[Path, ...],
+        flds: NDArray[np.floating],
+    ) -> None:
+        """Record min and max values of fields read from disk."""
+        isnap = self.step.isnap
+        assert isnap is not None
+        ranges = self.step.sdat._field_ranges
+        for fld_name, values in zip(names, flds):
+            ranges.record(isnap, fld_name, inputs, values)
+
+    def _value_range(self, name: str) -> tuple[float, float]:
+        """Min and max values of a field.
+
+        Ranges recorded when fields are read are used when available.  They
+        are kept for the lifetime of the `StagyyData` instance, and persisted
+        across sessions only if it has a memo directory.  Otherwise, the file
+        holding the field is read without keeping its content in memory, and
+        the ranges of all the fields it holds are recorded.
+        """
+        isnap = self.step.isnap
+        if name in self.extravars or isnap is None:
+            fld = self[name]
+            return np.nanmin(fld.values).item(), np.nanmax(fld.values).item()
+        ranges = self.step.sdat._field_ranges
+        vrange = ranges.get(isnap, name)
+        if vrange is not None:
+            return vrange
+        _, reader = self._get_reader(name)
+        if reader is None:
+            raise error.MissingDataError(
+                f"Missing field {name} in step {self.step.istep}"
+            )
+        vrange = ranges.load(isnap, name, reader.inputs)
+        if vrange is None:
+            reader.scan()
+            vrange = ranges.get(isnap, name)
+            assert vrange is not None
+        return vrange
+
+
+@dataclass(frozen=True)
+class _FieldsReader:
+    """Lazy reader of the fields stored in a file."""
+
+    read: Callable[
+        [FieldIndex | None], tuple[dict[str, Any], NDArray[np.floating]] | None
+    ]
+    shape: tuple[int, ...]
+    inputs: tuple[Path, ...]
+    on_load: Callable[[NDArray[np.floating]], None]
+
+    @cached_property
+    def _all(self) -> NDArray[np.floating]:
+        parsed_data = self.read(None)
+        if parsed_data is None:
+            raise error.MissingDataError("Field data vanished from disk")
+        self.on_load(parsed_data[1])
+        return parsed_data[1]
+
+    def scan(self) -> None:
+        """Read all the fields to trigger `on_load`, without keeping them."""
+        parsed_data = self.read(None)
+        if parsed_data is None:
+            raise error.MissingDataError("Field data vanished from disk")
+        self.on_load(parsed_data[1])
+
+    def values(self, ivar: int, index: FieldIndex | None) -> NDArray[np.floating]:
+        """Values of a field, or only a part of it if index is not None."""
+        if index is None:
+            return self._all[ivar]
+        if "_all" in self.__dict__:
+            return self._all[(ivar, *index)]
+        parsed_data = self.read(index)
+        if parsed_data is None:
+            raise error.MissingDataError("Field data vanished from disk")
+        return parsed_data[1][ivar]
 
 
 @dataclass(frozen=True)
@@ -371,7 +624,8 @@ class Tracers:
 
     `Tracers` implements the getitem mechanism. Items are tracervar names such
     as `"Type"` or `"Mass"`.  The position of tracers are the `"x"`, `"y"` and
-    `"z"` items.
+    `"z"` items.  Variables are read from disk one at a time, when first
+    requested.
     """
 
     step: Step
@@ -380,26 +634,124 @@ class Tracers:
     def _data(self) -> dict[str, list[NDArray[np.floating]] | None]:
         return {}
 
+    @cached_property
+    def _binfile(self) -> Path | None:
+        if self.step.isnap is None:
+            return None
+        return self.step.sdat.par.legacy_output("tra", self.step.isnap)
+
+    @cached_property
+    def _bin_header(self) -> TracersHeader | None:
+        if self._binfile is None:
+            return None
+        return parsers.bin.tracers.header(self._binfile)
+
     def __getitem__(self, name: str) -> list[NDArray[np.floating]] | None:
-        if name in self._data:
-            return self._data[name]
+        if name not in self._data:
+            self._data[name] = self._read(name)
+        return self._data[name]
+
+    def _read(self, name: str) -> list[NDArray[np.floating]] | None:
+        """Read a tracers variable from disk, bypassing the cache."""
         if self.step.isnap is None:
             return None
         sdat = self.step.sdat
-        data = parsers.bin.tracers.tracers(
-            sdat.par.legacy_output("tra", self.step.isnap)
-        )
-        if data is None and sdat._traxmf is not None:
-            self._data[name] = parsers.h5.tracers.tracers(  # type: ignore
+        if self._bin_header is not None:
+            assert self._binfile is not None
+            # only the requested variable is read
+            return parsers.bin.tracers.tracers_var(
+                self._binfile, self._bin_header, name
+            )
+        if sdat._traxmf is not None:
+            return parsers.h5.tracers.tracers(  # type: ignore
                 sdat._traxmf,
                 name,
                 self.step.isnap,
             )
-        elif data is not None:
-            self._data.update(data)
-        if name not in self._data:
-            self._data[name] = None
-        return self._data[name]
+        return None
+
+    @cached_property
+    def _id_index(
+        self,
+    ) -> dict[str, tuple[NDArray[np.floating], NDArray[np.intp], NDArray[np.intp]]]:
+        return {}
+
+    def locate(
+        self, ids: ArrayLike, idvar: str = "ID", cache: bool = True
+    ) -> tuple[NDArray[np.intp], NDArray[np.intp]] | None:
+        """Block and row of tracers with given identifiers.
+
+        The permutation sorting the identifiers of tracers is computed once
+        per snapshot, tracers are then located with a binary search.
+
+        Args:
+            ids: identifiers of tracers.
+            idvar: name of the tracers variable holding identifiers.
+            cache: whether the identifiers and their sorting permutation are
+                kept in memory for later calls.  Disable it when locating
+                tracers only once per snapshot.
+
+        Returns:
+            the block and row of each tracer, -1 for tracers that are not
+                found.  None if there is no identifier in this snapshot.
+        """
+        if idvar in self._id_index:
+            sorted_ids, iblocks, rows = self._id_index[idvar]
+        else:
+            if cache or idvar in self._data:
+                blocks = self[idvar]
+            else:
+                blocks = self._read(idvar)
+            if blocks is None:
+                return None
+            sizes = [blk.size for blk in blocks]
+            all_ids = np.concatenate(blocks)
+            iblocks = np.repeat(np.arange(len(blocks)), sizes)
+            rows = np.arange(all_ids.size) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            order = np.argsort(all_ids, kind="stable")
+            sorted_ids, iblocks, rows = all_ids[order], iblocks[order], rows[order]
+            if cache:
+                self._id_index[idvar] = (sorted_ids, iblocks, rows)
+        wanted = np.asarray(ids)
+        if sorted_ids.size == 0:
+            missing = np.full(wanted.shape, -1, dtype=np.intp)
+            return missing, missing.copy()
+        pos = np.minimum(np.searchsorted(sorted_ids, wanted), sorted_ids.size - 1)
+        found = sorted_ids[pos] == wanted
+        return np.where(found, iblocks[pos], -1), np.where(found, rows[pos], -1)
+
+    def rows(
+        self, name: str, iblock: int, rows: NDArray[np.integer]
+    ) -> NDArray[np.floating]:
+        """Values of a tracers variable for some tracers of a block.
+
+        Only the requested rows are read from legacy binary files if the
+        variable is not already in memory.
+        """
+        if name in self._data or self._bin_header is None:
+            data = self[name]
+            if data is None:
+                raise error.MissingDataError(f"No tracers {name} in {self.step!r}")
+            return data[iblock][rows]
+        assert self._binfile is not None
+        nblocks = len(self._bin_header.ntra)
+        blk_rows: list[NDArray[np.integer]] = [np.zeros(0, dtype=np.intp)] * nblocks
+        blk_rows[iblock] = rows
+        data = parsers.bin.tracers.tracers_var(
+            self._binfile, self._bin_header, name, blk_rows
+        )
+        if data is None:
+            raise error.MissingDataError(f"No tracers {name} in {self.step!r}")
+        return data[iblock]
+
+    @cached_property
+    def index(self) -> binning.TracersIndex:
+        """Spatial index of tracers.
+
+        [`TracersIndex`][stagpy.binning.TracersIndex] instance, built on
+        first use.
+        """
+        return binning.TracersIndex(self.step)
 
     def __iter__(self) -> NoReturn:
         raise TypeError("tracers collection is not iterable")
@@ -409,8 +761,10 @@ class Rprofs(ABC):
     """Radial profiles.
 
     `Rprofs` implements the getitem mechanism.  Keys are profile names
-    defined in `stagpy.phyvars.RPROF[_EXTRA]`.  Items are
-    [`Rprof`][stagpy.datatypes.Rprof] instances.
+    defined in `stagpy.phyvars.RPROF[_EXTRA]`, or horizontal statistics of
+    fields such as `"T.mean"` (see
+    [`horizontal_profiles`][stagpy.processing.horizontal_profiles]).  Items
+    are [`Rprof`][stagpy.datatypes.Rprof] instances.
     """
 
     @abstractmethod
@@ -468,8 +822,15 @@ class RprofsInstant(Rprofs):
         return self._data
 
     def __getitem__(self, name: str) -> Rprof:
-        step = self.step
         rprof: NDArray[np.float64]
+        fname, _, stat = name.rpartition(".")
+        is_field = fname in phyvars.FIELD or fname in phyvars.FIELD_EXTRA
+        if name not in self._cached_extra and is_field:
+            # horizontal statistics of a field, e.g. "T.mean"
+            self._field_stats([fname], [stat])
+        if name in self._cached_extra:
+            rpf = self._cached_extra[name]
+            return Rprof(rpf.values, rpf.rad, rpf.meta)
         if name in self._rprofs.columns:
             rprof = self._rprofs[name].to_numpy(dtype=np.float64)
             rad = self.centers
@@ -477,13 +838,8 @@ class RprofsInstant(Rprofs):
                 meta = phyvars.RPROF[name]
             else:
                 meta = Varr(name, "", "1")
-        elif name in self._cached_extra:
-            rpf = self._cached_extra[name]
-            rprof = rpf.values
-            rad = rpf.rad
-            meta = rpf.meta
         elif name in phyvars.RPROF_EXTRA:
-            self._cached_extra[name] = phyvars.RPROF_EXTRA[name](step)
+            self._cached_extra[name] = self._compute_extra(name)
             rpf = self._cached_extra[name]
             rprof = rpf.values
             rad = rpf.rad
@@ -493,6 +849,67 @@ class RprofsInstant(Rprofs):
 
         return Rprof(rprof, rad, meta)
 
+    @cached_property
+    def _memo_inputs(self) -> list[Path]:
+        """Files from which profiles of this step are computed."""
+        step = self.step
+        sdat = step.sdat
+        inputs = list(sdat._memo_inputs)
+        if step.isnap is not None:
+            # geometry and fields may be read from field files
+            inputs.extend(sdat._binfiles_set(step.isnap))
+            if sdat._dataxmf is not None:
+                inputs.append(sdat._dataxmf.path)
+        return inputs
+
+    def _compute_extra(self, name: str) -> Rprof:
+        step = self.step
+        memo = step.sdat._memo
+        if memo is None:
+            return phyvars.RPROF_EXTRA[name](step)
+        return memo.rprof(
+            name,
+            step.istep,
+            self._memo_inputs,
+            lambda: phyvars.RPROF_EXTRA[name](step),
+        )
+
+    def _field_stats(
+        self, names: Sequence[str], stats: Sequence[str]
+    ) -> dict[str, Rprof]:
+        """Horizontal statistics of fields, indexed by "name.stat".
+
+        Profiles are looked up in memory, then in the memo store.  Missing
+        ones are computed with `processing.horizontal_profiles` and stored.
+        """
+        step = self.step
+        memo = step.sdat._memo
+        profs: dict[str, Rprof] = {}
+        for name in names:
+            missing = []
+            for stat in stats:
+                key = f"{name}.{stat}"
+                rprof = self._cached_extra.get(key)
+                if rprof is None and memo is not None:
+                    rprof = memo.stored_rprof(key, step.istep, self._memo_inputs)
+                if rprof is None:
+                    missing.append(stat)
+                else:
+                    profs[key] = rprof
+            if not missing:
+                continue
+            computed = processing.horizontal_profiles(step, [name], missing)
+            if memo is not None:
+                for key, rprof in computed.items():
+                    memo.store_rprof(key, step.istep, self._memo_inputs, rprof)
+            profs.update(computed)
+        self._cached_extra.update(profs)
+        return {
+            f"{name}.{stat}": profs[f"{name}.{stat}"]
+            for name in names
+            for stat in stats
+        }
+
     @property
     def stepstr(self) -> str:
         """String representation of the parent :class:`Step`."""
@@ -546,7 +963,9 @@ class Step:
 
     Elements of [`Steps`][stagpy.stagyydata.Steps] and
     [`Snaps`][stagpy.stagyydata.Snaps] instances are all `Step`
-    instances. Note that `Step` objects are not duplicated.
+    instances. Note that `Step` objects are not duplicated: as long as a
+    `Step` is referenced, requesting the same time step returns the same
+    object.  Unreferenced steps are released and created anew on demand.
 
     Examples:
         Here are a few examples illustrating some properties of `Step`
@@ -628,12 +1047,9 @@ class Step:
     @property
     def time(self) -> float:
         """Time of this time step."""
-        steptime = None
-        try:
-            steptime = self.timeinfo["time"]
-        except error.MissingDataError:
-            if self.isnap is not None:
-                steptime = self.geom._header.get("ti_ad")
+        steptime = self.sdat.tseries._time_at_step(self.istep)
+        if steptime is None and self.isnap is not None:
+            steptime = self.geom._header.get("ti_ad")
         if steptime is None:
             raise error.NoTimeError(self)
         return steptime
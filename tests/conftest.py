@@ -1,5 +1,8 @@
+import shutil
 from pathlib import Path
 
+import numpy as np
+from numpy.typing import NDArray
 from pytest import FixtureRequest, fixture
 
 from stagpy.stagyydata import StagyyData, Step
@@ -63,3 +66,85 @@ def sdat_h5(example_h5_path: Path) -> StagyyData:
 @fixture(scope="module")
 def step(sdat: StagyyData) -> Step:
     return sdat.snaps[-1]
+
+
+@fixture(scope="session")
+def tracers_data() -> dict[str, list[NDArray[np.float64]]]:
+    rng = np.random.default_rng(0)
+    data = {}
+    for info in ("x", "y", "z", "Type", "Mass"):
+        # values representable in single precision
+        blocks = [rng.random(ntra).astype(np.float32) for ntra in (50, 20)]
+        data[info] = [blk.astype(np.float64) for blk in blocks]
+    data["Type"] = [np.floor(blk * 3) for blk in data["Type"]]
+    ids = rng.permutation(70).astype(np.float64)
+    data["ID"] = [ids[:50], ids[50:]]
+    return data
+
+
+def write_tracers(path: Path, data: dict[str, list[NDArray[np.float64]]]) -> None:
+    """Write a legacy binary tracers file with 32 bits data."""
+    infos = list(data)
+    blocks = [np.stack(columns, axis=1) for columns in zip(*data.values())]
+    with path.open("wb") as fid:
+        np.array([200 + len(blocks)], dtype=np.int32).tofile(fid)
+        np.array([1.0, 1.0], dtype=np.float32).tofile(fid)  # aspect ratio
+        np.array([100], dtype=np.int32).tofile(fid)  # istep
+        np.array([0.5], dtype=np.float32).tofile(fid)  # time
+        np.array([len(infos)], dtype=np.int32).tofile(fid)
+        np.array([len(blk) for blk in blocks], dtype=np.int32).tofile(fid)
+        np.array([1.0], dtype=np.float32).tofile(fid)  # ideal mass
+        np.array([1], dtype=np.int32).tofile(fid)  # curvilinear
+        np.array([1.19], dtype=np.float32).tofile(fid)  # rcmb
+        for info in infos:
+            fid.write(info.ljust(16).encode())
+        np.array([2], dtype=np.int32).tofile(fid)  # trace elements
+        np.array([0.0, 0.0], dtype=np.float32).tofile(fid)  # outgassed
+        for blk in blocks:
+            blk.astype(np.float32).tofile(fid)
+
+
+@fixture
+def tracers_file(
+    tmp_path: Path, tracers_data: dict[str, list[NDArray[np.float64]]]
+) -> Path:
+    path = tmp_path / "test_tra00000"
+    write_tracers(path, tracers_data)
+    return path
+
+
+@fixture
+def sdat_tracers(
+    tmp_path: Path, repo_dir: Path, tracers_data: dict[str, list[NDArray[np.float64]]]
+) -> StagyyData:
+    run_dir = tmp_path / "run"
+    shutil.copytree(repo_dir / "Examples" / "ra-100000", run_dir)
+    sdat = StagyyData(run_dir)
+    # the example has one block only
+    yin_data = {info: blocks[:1] for info, blocks in tracers_data.items()}
+    write_tracers(sdat.par.legacy_output("tra", sdat.snaps[-1].isnap), yin_data)
+    # same tracers in another order at the previous snapshot
+    reversed_data = {info: [blocks[0][::-1]] for info, blocks in tracers_data.items()}
+    write_tracers(sdat.par.legacy_output("tra", sdat.snaps[-2].isnap), reversed_data)
+    return sdat
+
+
+@fixture
+def sdat_tracers_annulus(tmp_path: Path, repo_dir: Path) -> StagyyData:
+    run_dir = tmp_path / "annulus"
+    shutil.copytree(repo_dir / "Examples" / "annulus", run_dir)
+    sdat = StagyyData(run_dir)
+    geom = sdat.snaps[-1].geom
+    rng = np.random.default_rng(1)
+    ntra = 500
+    rad = rng.uniform(geom.r_walls[0], geom.r_walls[-1], ntra)
+    phi = rng.uniform(0, 2 * np.pi, ntra)
+    # positions in the equatorial plane of the annulus
+    data = {
+        "x": [rad * np.cos(phi)],
+        "y": [rad * np.sin(phi)],
+        "z": [np.zeros(ntra)],
+        "Mass": [rng.random(ntra)],
+    }
+    write_tracers(sdat.par.legacy_output("tra", sdat.snaps[-1].isnap), data)
+    return sdat
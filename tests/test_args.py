@@ -3,8 +3,9 @@ import re
 import pytest
 from pytest import CaptureFixture
 
-import stagpy
-from stagpy.cli import parse_args
+from stagpy import commands, field, plates, rprof, time_series
+from stagpy._helpers import baredoc
+from stagpy.cli import SUB_CMDS, _LazyCmd, parse_args
 from stagpy.config import Config
 
 
@@ -55,46 +56,53 @@ def test_invalid_subcmd(capsys: CaptureFixture) -> None:
 def test_field_subcmd() -> None:
     conf = Config.default_()
     func = parse_args(conf, ["field"])
-    assert func is stagpy.field.cmd
+    assert func is field.cmd
 
 
 def test_rprof_subcmd() -> None:
     conf = Config.default_()
     func = parse_args(conf, ["rprof"])
-    assert func is stagpy.rprof.cmd
+    assert func is rprof.cmd
 
 
 def test_time_cmd() -> None:
     conf = Config.default_()
     func = parse_args(conf, ["time"])
-    assert func is stagpy.time_series.cmd
+    assert func is time_series.cmd
 
 
 def test_plates_subcmd() -> None:
     conf = Config.default_()
     func = parse_args(conf, ["plates"])
-    assert func is stagpy.plates.cmd
+    assert func is plates.cmd
 
 
 def test_info_subcmd() -> None:
     conf = Config.default_()
     func = parse_args(conf, ["info"])
-    assert func is stagpy.commands.info_cmd
+    assert func is commands.info_cmd
 
 
 def test_var_subcmd() -> None:
     conf = Config.default_()
     func = parse_args(conf, ["var"])
-    assert func is stagpy.commands.var_cmd
+    assert func is commands.var_cmd
 
 
 def test_version_subcmd() -> None:
     conf = Config.default_()
     func = parse_args(conf, ["version"])
-    assert func is stagpy.commands.version_cmd
+    assert func is commands.version_cmd
 
 
 def test_config_subcmd() -> None:
     conf = Config.default_()
     func = parse_args(conf, ["config"])
-    assert func is stagpy.commands.config_cmd
+    assert func is commands.config_cmd
+
+
+def test_subcmds_help() -> None:
+    for name, subcmd in SUB_CMDS.items():
+        func = subcmd.defaults["func"]
+        if isinstance(func, _LazyCmd):
+            assert subcmd.help == baredoc(func.load()), name
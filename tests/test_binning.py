@@ -0,0 +1,75 @@
+import numpy as np
+from numpy.typing import NDArray
+
+from stagpy import binning
+from stagpy.stagyydata import StagyyData
+
+
+def test_cell_indices(sdat_tracers: StagyyData) -> None:
+    geom = sdat_tracers.snaps[-1].geom
+    z = np.array([0.0, 0.3, 1.0])
+    y = np.array([0.0, 1.9, 2.0])
+    icells = binning.cell_indices(geom, np.zeros(3), y, z)
+    iy = np.searchsorted(geom.y_walls, y, side="right") - 1
+    iz = np.searchsorted(geom.z_walls, z, side="right") - 1
+    assert np.array_equal(icells[:2], iy[:2] * geom.nztot + iz[:2])
+    assert icells[2] == geom.nytot * geom.nztot - 1
+
+
+def test_tracers_count(
+    sdat_tracers: StagyyData, tracers_data: dict[str, list[NDArray[np.float64]]]
+) -> None:
+    step = sdat_tracers.snaps[-1]
+    count = step.fields["ntra"].values
+    assert count.shape == (1, step.geom.nytot, step.geom.nztot, 1)
+    assert count.sum() == tracers_data["x"][0].size
+    dens = step.fields["tradens"].values
+    assert np.allclose(dens * step.geom.cell_volumes, count)
+
+
+def test_tracers_mean(
+    sdat_tracers: StagyyData, tracers_data: dict[str, list[NDArray[np.float64]]]
+) -> None:
+    step = sdat_tracers.snaps[-1]
+    mean = binning.tracers_mean(step, "Mass").values
+    count = binning.accumulate(step)
+    assert np.all(np.isnan(mean[count == 0]))
+    total = np.nansum(mean * count)
+    assert np.isclose(total, tracers_data["Mass"][0].sum())
+
+
+def test_accumulate_annulus(sdat_tracers_annulus: StagyyData) -> None:
+    step = sdat_tracers_annulus.snaps[-1]
+    geom = step.geom
+    x, y, mass = (step.tracers[name] for name in ("x", "y", "Mass"))
+    assert x is not None and y is not None and mass is not None
+    phi = np.mod(np.arctan2(y[0], x[0]), 2 * np.pi)
+    rad = np.hypot(x[0], y[0])
+    walls = (geom.p_walls, geom.r_walls)
+    count, _, _ = np.histogram2d(phi, rad, bins=walls)
+    sums, _, _ = np.histogram2d(phi, rad, bins=walls, weights=mass[0])
+    shape = (1, geom.nptot, geom.nrtot, 1)
+    assert np.array_equal(binning.accumulate(step), count.reshape(shape))
+    assert np.allclose(binning.accumulate(step, mass), sums.reshape(shape))
+
+
+def test_tracers_in_region(sdat_tracers: StagyyData) -> None:
+    tracers = sdat_tracers.snaps[-1].tracers
+    y, z = tracers["y"], tracers["z"]
+    assert y is not None and z is not None
+    selected = tracers.index.in_region(y=(0.2, 0.7), z=(0.25, 0.5))
+    mask = (y[0] >= 0.2) & (y[0] <= 0.7) & (z[0] >= 0.25) & (z[0] <= 0.5)
+    assert np.array_equal(selected[0], np.flatnonzero(mask))
+    assert selected[0].size > 0
+    everything = tracers.index.in_region()
+    assert np.array_equal(everything[0], np.arange(y[0].size))
+
+
+def test_tracers_nearest(sdat_tracers: StagyyData) -> None:
+    tracers = sdat_tracers.snaps[-1].tracers
+    pos = np.stack([tracers[crd][0] for crd in "xyz"], axis=-1)  # type: ignore
+    point = np.array([0.0, 1.0, 0.5])
+    dists, idx = tracers.index.nearest(point, k=3)
+    expected = np.argsort(np.linalg.norm(pos - point, axis=1))[:3]
+    assert np.array_equal(idx, expected)
+    assert np.allclose(dists, np.linalg.norm(pos[expected] - point, axis=1))
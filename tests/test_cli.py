@@ -21,6 +21,7 @@ def dir_isnap(request: FixtureRequest, repo_dir: Path) -> tuple[Path, int, int]:
         ("stagpy field", ["stagpy_T_stream{:05d}.pdf"]),
         ("stagpy field -o=T.v3", ["stagpy_T_v3{:05d}.pdf"]),
         ("stagpy field -o=T-v3", ["stagpy_T{:05d}.pdf", "stagpy_v3{:05d}.pdf"]),
+        ("stagpy field +fast -o=T.v3", ["stagpy_T_v3{:05d}.png"]),
     ]
 )
 def all_cmd_field(
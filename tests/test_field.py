@@ -1,9 +1,24 @@
+import os
+from pathlib import Path
+
+import numpy as np
 import pytest
+from matplotlib.contour import ContourSet
 
 import stagpy.error
+import stagpy.field
 import stagpy.phyvars
 from stagpy.config import Config
-from stagpy.field import get_meshes_fld, get_meshes_vec, valid_field_var
+from stagpy.field import (
+    FieldRaster,
+    _findminmax,
+    _pixel_cells,
+    _prefetched,
+    get_meshes_fld,
+    get_meshes_vec,
+    valid_field_var,
+)
+from stagpy.stagyydata import StagyyData
 from stagpy.step import Step
 
 
@@ -51,3 +66,128 @@ def test_get_meshes_vec(step: Step) -> None:
     assert len(vec1.shape) == 2
     assert xmesh.shape[0] == ymesh.shape[0] == vec1.shape[0] == vec2.shape[0]
     assert xmesh.shape[1] == ymesh.shape[1] == vec1.shape[1] == vec2.shape[1]
+
+
+def test_findminmax(sdat: StagyyData) -> None:
+    minmax = _findminmax(sdat.snaps[-2:], ["T", "rsc"])
+    temps = [step.fields["T"].values for step in sdat.snaps[-2:]]
+    assert minmax == {"T": (min(map(np.min, temps)), max(map(np.max, temps)))}
+
+
+def test_pixel_cells_cartesian() -> None:
+    cells = _pixel_cells((0.0, 1.0, 2.0), (0.0, 1.0), False, (0, 2, -1, 1), (4, 4))
+    assert np.all(cells[:2] == -1)
+    assert np.all(cells[2:, :2] == 0)
+    assert np.all(cells[2:, 2:] == 1)
+
+
+def test_pixel_cells_polar() -> None:
+    walls = tuple(np.linspace(0, 2 * np.pi, 5))
+    cells = _pixel_cells(walls, (1.0, 2.0), True, (-2, 2, -2, 2), (4, 4))
+    # corners are outside the annulus, as well as the inner disk
+    assert cells[0, 0] == cells[1, 1] == cells[2, 2] == -1
+    assert cells[2, 3] == 0
+    assert cells[3, 1] == 1
+    assert cells[1, 0] == 2
+    assert cells[0, 2] == 3
+
+
+def test_field_raster(sdat: StagyyData) -> None:
+    conf = Config.default_()
+    raster = FieldRaster(conf, [["T"], ["v3"]])
+    raster.update(sdat.snaps[-1])
+    image = raster.fig.axes[0].images[0]
+    first = raster.rgba().copy()
+    raster.update(sdat.snaps[-1])
+    assert list(raster.fig.axes[0].images) == [image]
+    frame = raster.rgba()
+    assert frame.shape == first.shape
+    assert frame.shape[-1] == 4
+
+
+def test_field_raster_isolines(sdat: StagyyData) -> None:
+    raster = FieldRaster(Config.default_(), [["T", "stream"]])
+    for step in [*sdat.snaps[-2:], sdat.snaps[-1]]:
+        raster.update(step)
+        raster.rgba()
+        axis = raster.fig.axes[0]
+        contours = [art for art in axis.collections if isinstance(art, ContourSet)]
+        assert len(contours) == 1
+    panel = raster._panels[0]
+    assert panel is not None
+    panel.clear()
+    assert not any(isinstance(art, ContourSet) for art in axis.collections)
+    assert not panel.image.get_visible()
+
+
+def test_field_raster_arrows_hidden(sdat: StagyyData) -> None:
+    raster = FieldRaster(Config.default_(), [["T", "v"]])
+    raster.update(sdat.snaps[-1])
+    raster.update(sdat.snaps[-1])
+    panel = raster._panels[0]
+    assert panel is not None and panel.quiver is not None
+    assert panel.quiver.get_visible()
+    panel.clear()
+    assert not panel.quiver.get_visible()
+
+
+def test_prefetched(sdat: StagyyData) -> None:
+    snaps = list(sdat.snaps[-3:])
+    assert list(_prefetched(snaps, ["T"], depth=1)) == snaps
+
+
+def movie_conf(example_dir: Path, outdir: Path) -> Config:
+    conf = Config.default_()
+    conf.core.path = example_dir
+    conf.core.outname = str(outdir / "movie")
+    conf.core.snapshots = [slice(-2, None)]
+    conf.field.plot = [[["T"]]]
+    conf.field.movie = True
+    return conf
+
+
+def test_movie_frames(
+    example_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("PATH", "")
+    stagpy.field.cmd(movie_conf(example_dir, tmp_path))
+    frames = sorted(tmp_path.iterdir())
+    assert frames
+    assert all(frame.suffix == ".png" for frame in frames)
+
+
+def test_movie_ffmpeg(
+    example_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # fake encoder storing raw frames in the output file
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    ffmpeg = bindir / "ffmpeg"
+    ffmpeg.write_text('#!/bin/sh\nfor out; do :; done\ncat > "$out"\n')
+    ffmpeg.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bindir}{os.pathsep}{os.environ['PATH']}")
+    outdir = tmp_path / "out"
+    outdir.mkdir()
+    conf = movie_conf(example_dir, outdir)
+    stagpy.field.cmd(conf)
+    movie = outdir / "movie_T.mp4"
+    assert sorted(outdir.iterdir()) == [movie]
+    nsnaps = len(list(StagyyData(example_dir).snaps[-2:]))
+    width, height = 6 * 100, 6 * 100
+    assert movie.stat().st_size == nsnaps * width * height * 4
+
+
+@pytest.mark.parametrize("script", ["exit 1", "cat > /dev/null; exit 1"])
+def test_movie_ffmpeg_failure(
+    example_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, script: str
+) -> None:
+    # encoder dying early or failing once all frames are sent
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    ffmpeg = bindir / "ffmpeg"
+    ffmpeg.write_text(f"#!/bin/sh\n{script}\n")
+    ffmpeg.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bindir}{os.pathsep}{os.environ['PATH']}")
+    conf = movie_conf(example_dir, tmp_path)
+    with pytest.raises(stagpy.error.StagpyError, match="movie_T.mp4"):
+        stagpy.field.cmd(conf)
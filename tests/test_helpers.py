@@ -1,3 +1,5 @@
+from collections.abc import Iterator
+
 import pytest
 
 from stagpy import _helpers
@@ -35,3 +37,18 @@ def test_baredoc() -> None:
     """
     expected = "Badly formatted docstring"
     assert _helpers.baredoc(test_baredoc) == expected
+
+
+def test_bounded_map() -> None:
+    drawn = []
+
+    def items() -> Iterator[int]:
+        for item in range(10):
+            drawn.append(item)
+            yield item
+
+    results = _helpers.bounded_map(lambda x: 2 * x, items(), workers=2)
+    for item, result in enumerate(results):
+        assert result == 2 * item
+        # at most two items are processed ahead of the consumer
+        assert len(drawn) <= item + 2
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+
+def run_code(code: str) -> tuple[str, set[str]]:
+    """Output of code run in a fresh interpreter, and modules it imported."""
+    script = f"import sys\n{code}\nprint(' '.join(sys.modules))"
+    subp = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, check=True, text=True
+    )
+    output, _, modules = subp.stdout.rstrip("\n").rpartition("\n")
+    return output, set(modules.split())
+
+
+def imported_modules(code: str) -> set[str]:
+    """Modules imported by running code in a fresh interpreter."""
+    return run_code(code)[1]
+
+
+def test_cli_import_is_light() -> None:
+    modules = imported_modules(
+        "from stagpy import cli, config\n"
+        "cli.parse_args(config.Config.default_(), ['version'])"
+    )
+    for heavy in ("matplotlib", "stagpy.field", "stagpy.plates", "stagpy.rprof"):
+        assert heavy not in modules
+
+
+def test_stagyydata_import_is_light() -> None:
+    modules = imported_modules("import stagpy.stagyydata")
+    for heavy in ("scipy", "matplotlib", "rich"):
+        assert heavy not in modules
+
+
+def test_version_cmd_is_light() -> None:
+    output, modules = run_code(
+        "from stagpy.__main__ import main\nsys.argv = ['stagpy', 'version']\nmain()"
+    )
+    assert output.startswith("stagpy version: ")
+    for heavy in ("scipy", "matplotlib", "rich", "stagpy.field", "stagpy.plates"):
+        assert heavy not in modules
@@ -1,4 +1,13 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any
+
+import h5py
+import numpy as np
+import pytest
+from numpy.typing import NDArray
 
 from stagpy import parsers
 from stagpy.stagyydata import StagyyData
@@ -49,6 +58,94 @@ def test_fields_prs(sdat_legacy: StagyyData) -> None:
     assert flds.shape[1:4] == tuple(hdr["nts"])
 
 
+def test_fields_index_prs(sdat_legacy: StagyyData) -> None:
+    fieldfile = sdat_legacy.par.legacy_output("t", len(sdat_legacy.snaps) - 1)
+    parsed = parsers.bin.field.field(fieldfile)
+    parsed_part = parsers.bin.field.field(fieldfile, index=(slice(2, 5), 0))
+    assert parsed is not None and parsed_part is not None
+    assert parsers.bin.field.shape(fieldfile) == parsed[1].shape
+    assert np.array_equal(parsed_part[1], parsed[1][:, 2:5, 0])
+
+
+def _write_legacy_vp(
+    path: Path, nts: tuple[int, int, int], ncs: tuple[int, int, int]
+) -> None:
+    """Write a velocity-pressure file split in several subdomains."""
+    rng = np.random.default_rng(0)
+    npc = np.array(nts) // ncs
+    npi = 4 * (npc[0] + 1) * (npc[1] + 1) * npc[2]
+    with path.open("wb") as fid:
+        np.array([411, *nts, 1], dtype=np.int32).tofile(fid)
+        np.ones(2, dtype=np.float32).tofile(fid)
+        np.array([*ncs, 1], dtype=np.int32).tofile(fid)
+        np.linspace(0, 1, 2 * nts[2] + 1, dtype=np.float32).tofile(fid)
+        np.array([-1], dtype=np.float32).tofile(fid)  # rcmb
+        np.array([10], dtype=np.int32).tofile(fid)  # ti_step
+        np.zeros(5 + sum(nts), dtype=np.float32).tofile(fid)
+        np.array([2], dtype=np.float32).tofile(fid)  # scalefac
+        rng.random(npi * np.prod(ncs), dtype=np.float32).tofile(fid)
+
+
+def test_fields_positions_prs(tmp_path: Path) -> None:
+    fieldfile = tmp_path / "test_vp00001"
+    _write_legacy_vp(fieldfile, nts=(4, 6, 4), ncs=(2, 3, 2))
+    index = (np.array([0, 4, 2, 3]), np.array([6, 0, 3, 3]), np.array([3, 0, 1, 2]), 0)
+    pos = parsers.bin.field.positions(fieldfile, index)
+    assert pos is not None
+    parsed = parsers.bin.field.field(fieldfile)
+    assert parsed is not None
+    values = parsers.bin.field.read_positions(fieldfile, pos)
+    assert values is not None
+    assert np.array_equal(values, parsed[1][(slice(None), *index)])
+
+
+def test_fields_positions_layout_prs(tmp_path: Path) -> None:
+    fieldfile = tmp_path / "test_vp00001"
+    _write_legacy_vp(fieldfile, nts=(4, 6, 4), ncs=(2, 3, 2))
+    pos = parsers.bin.field.positions(fieldfile, (0, 0, 0, 0))
+    assert pos is not None
+    _write_legacy_vp(fieldfile, nts=(4, 6, 6), ncs=(2, 3, 2))
+    assert parsers.bin.field.read_positions(fieldfile, pos) is None
+
+
+def test_fields_positions_h5(sdat_h5: StagyyData) -> None:
+    xdmf = sdat_h5._dataxmf
+    assert xdmf is not None
+    first, last = sdat_h5.snaps[0], sdat_h5.snaps[-1]
+    assert first.isnap is not None and last.isnap is not None
+    geom = last.geom
+    index = (
+        np.array([0, 0, 0]),
+        np.array([0, geom.nytot // 2, 0]),
+        np.array([0, 3, geom.nztot - 1]),
+        0,
+    )
+    for name in ("Temperature", "Velocity"):
+        pos = parsers.h5.field.positions(
+            xdmf, name, first.isnap, dict(first.geom._header), index
+        )
+        assert pos is not None
+        parsed = parsers.h5.field.field(xdmf, name, last.isnap)
+        assert parsed is not None
+        values = parsers.h5.field.read_positions(
+            xdmf, name, last.isnap, dict(geom._header), pos
+        )
+        assert values is not None
+        assert np.array_equal(values, parsed[1][(slice(None), *index)])
+
+
+def test_fields_index_h5(sdat_h5: StagyyData) -> None:
+    xdmf = sdat_h5._dataxmf
+    assert xdmf is not None
+    isnap = sdat_h5.snaps[-1].isnap
+    assert isnap is not None
+    parsed = parsers.h5.field.field(xdmf, "Temperature", isnap)
+    index = (slice(None), 0, -3)
+    parsed_part = parsers.h5.field.field(xdmf, "Temperature", isnap, index=index)
+    assert parsed is not None and parsed_part is not None
+    assert np.array_equal(parsed_part[1], parsed[1][:, slice(None), 0, -3])
+
+
 def test_field_header_prs(sdat_legacy: StagyyData) -> None:
     sdat = sdat_legacy
     hdr = parsers.bin.field.header(sdat.par.legacy_output("t", len(sdat.snaps) - 1))
@@ -73,3 +170,129 @@ def test_refstate_parser(example_h5_path: Path) -> None:
     systems, adias = out
     assert (systems[0][0].columns == cols).all()
     assert (adias[0].columns == cols).all()
+
+
+def test_isnap_istep_h5(sdat_h5: StagyyData) -> None:
+    isnaps, isteps = parsers.h5.extras.isnap_istep(
+        sdat_h5.par.h5_output("time_botT.h5")
+    )
+    assert isnaps.shape == isteps.shape
+    assert (isnaps == range(len(sdat_h5.snaps))).all()
+    assert isteps[-1] == sdat_h5.snaps[-1].istep
+
+
+def test_h5_spherical_vector_rotation() -> None:
+    rng = np.random.default_rng(0)
+    mesh = rng.normal(size=(3, 4, 5, 3))
+    r_mesh = np.sqrt(np.sum(mesh**2, axis=0))
+    header = {
+        "rcmb": 1.0,
+        "x_mesh": mesh[0],
+        "y_mesh": mesh[1],
+        "t_mesh": np.arccos(mesh[2] / r_mesh),
+    }
+    flds = rng.normal(size=(3, 4, 5, 2, 2))
+    vec = flds.copy()
+    theta = header["t_mesh"][:, :, :-1, np.newaxis]
+    phi = np.roll(np.arctan2(mesh[1], mesh[0]), -1, 1)[:, :, :-1, np.newaxis]
+    v_r = np.sin(theta) * (np.cos(phi) * vec[0] + np.sin(phi) * vec[1])
+    v_r += np.cos(theta) * vec[2]
+    v_t = np.cos(theta) * (np.cos(phi) * vec[0] + np.sin(phi) * vec[1])
+    v_t -= np.sin(theta) * vec[2]
+    out = parsers.h5.field._post_read_flds(flds, header)
+    assert out is flds
+    assert np.allclose(out[0], v_t)
+    assert np.allclose(out[1], np.sin(phi) * vec[0] - np.cos(phi) * vec[1])
+    assert np.allclose(out[2], v_r)
+
+
+def test_h5_spherical_trig_shared() -> None:
+    rng = np.random.default_rng(0)
+    mesh = rng.normal(size=(3, 4, 5, 3))
+    header = {
+        "mesh_files": (Path("mesh_00001.h5"),),
+        "x_mesh": mesh[0],
+        "y_mesh": mesh[1],
+        "t_mesh": np.arccos(mesh[2] / np.sqrt(np.sum(mesh**2, axis=0))),
+    }
+    trig = parsers.h5.field._sph_trig(header)
+    assert parsers.h5.field._sph_trig(dict(header)) is trig
+    assert "sph_trig" not in header
+
+
+def test_tracers_prs(
+    tracers_file: Path, tracers_data: dict[str, list[NDArray[np.float64]]]
+) -> None:
+    tra = parsers.bin.tracers.tracers(tracers_file)
+    assert tra is not None
+    assert list(tra) == list(tracers_data)
+    for info, blocks in tracers_data.items():
+        for expected, column in zip(blocks, tra[info]):
+            assert column.flags.c_contiguous
+            assert np.array_equal(column, expected)
+    tra = parsers.bin.tracers.tracers(tracers_file, names=["Mass"])
+    assert tra is not None
+    assert list(tra) == ["Mass"]
+    assert np.array_equal(tra["Mass"][1], tracers_data["Mass"][1])
+    assert parsers.bin.tracers.tracers(Path("dummy")) is None
+
+
+def test_tracers_var_prs(
+    tracers_file: Path, tracers_data: dict[str, list[NDArray[np.float64]]]
+) -> None:
+    hdr = parsers.bin.tracers.header(tracers_file)
+    assert hdr is not None
+    assert hdr.infos == tuple(tracers_data)
+    assert hdr.ntra == tuple(map(len, tracers_data["x"]))
+    for info, blocks in tracers_data.items():
+        tra = parsers.bin.tracers.tracers_var(tracers_file, hdr, info)
+        assert tra is not None
+        assert all(map(np.array_equal, tra, blocks))
+    assert parsers.bin.tracers.tracers_var(tracers_file, hdr, "dummy") is None
+
+
+def test_tracers_h5(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = np.random.default_rng(0)
+    entry = parsers.h5.tracers.XmfTracersEntry(
+        isnap=3,
+        time=None,
+        mo_lambda=None,
+        mo_thick_sol=None,
+        yin_yang=True,
+        range_yin=range(3),
+        range_yang=range(3, 6),
+        fields={"Mass": 1},
+    )
+    expected: list[list[NDArray[np.float64]]] = [[], []]
+    for tsub in entry.tra_subdomains(tmp_path, "Mass"):
+        data = rng.normal(size=rng.integers(0, 5))
+        expected[tsub.iblock].append(data)
+        with h5py.File(tsub.file, "w") as h5f:
+            h5f[tsub.dataset] = data
+    xmf = parsers.h5.tracers.TracersXmf(tmp_path / "Data_tra.xmf")
+    xmf.__dict__["_data"] = {3: entry}
+    # count files open at the same time
+    nopen = [0]
+    max_open = [0]
+    lock = threading.Lock()
+    h5file = h5py.File
+
+    @contextmanager
+    def counting_file(*args: Any, **kwargs: Any) -> Iterator[h5py.File]:
+        with lock:
+            nopen[0] += 1
+            max_open[0] = max(max_open[0], nopen[0])
+        try:
+            with h5file(*args, **kwargs) as h5f:
+                yield h5f
+        finally:
+            with lock:
+                nopen[0] -= 1
+
+    monkeypatch.setattr(parsers.h5.tracers.h5py, "File", counting_file)
+    tra = parsers.h5.tracers.tracers(xmf, "Mass", 3, workers=2)
+    monkeypatch.undo()
+    assert 0 < max_open[0] <= 2
+    assert len(tra) == 2
+    for block, subs in zip(tra, expected):
+        assert np.array_equal(block, np.concatenate(subs))
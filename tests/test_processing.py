@@ -1,3 +1,9 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+from scipy.integrate import cumulative_trapezoid
+
 from stagpy import phyvars, processing
 from stagpy.datatypes import Rprof, Tseries
 from stagpy.stagyydata import StagyyData, Step
@@ -21,6 +27,18 @@ def test_ebalance(sdat: StagyyData) -> None:
     tseries_checks(processing.ebalance(sdat), sdat.tseries.time.shape[0] - 1)
 
 
+def test_ebalance_no_snapshot(example_legacy_path: Path, tmp_path: Path) -> None:
+    shutil.copy(example_legacy_path / "par", tmp_path)
+    for outfile in example_legacy_path.glob("*/*"):
+        if outfile.name.endswith(("_rprof.dat", "_time.dat")):
+            outdir = tmp_path / outfile.parent.name
+            outdir.mkdir(exist_ok=True)
+            shutil.copy(outfile, outdir)
+    ebal = processing.ebalance(StagyyData(tmp_path))
+    expected = processing.ebalance(StagyyData(example_legacy_path))
+    assert np.allclose(ebal.values, expected.values)
+
+
 def test_r_edges(step: Step) -> None:
     assert step.rprofs.walls.shape == (step.geom.nztot + 1,)
 
@@ -57,3 +75,59 @@ def test_stream_function(step: Step) -> None:
     psi = processing.stream_function(step)
     assert psi.values.shape[1:3] == step.fields["v3"].values.shape[1:3]
     assert psi.dim in phyvars.SCALES
+
+
+def stream_reference(step: Step) -> np.ndarray:
+    """Stream function integrated column by column."""
+    geom = step.geom
+    if geom.twod_yz:
+        x_coord = geom.y_walls
+        v_x = step.fields["v2"].values[0, :, :, 0]
+        v_z = step.fields["v3"].values[0, :, :, 0]
+    else:
+        x_coord = geom.x_walls
+        v_x = step.fields["v1"].values[:, 0, :, 0]
+        v_z = step.fields["v3"].values[:, 0, :, 0]
+    if geom.spherical:
+        z_nc = step.rprofs.centers
+        r_pc = geom.r_centers
+    else:
+        z_nc = geom.r_centers
+        r_pc = np.ones_like(z_nc)
+    z_nw = step.rprofs.walls[:2]
+    vz0 = ((z_nw[1] - z_nc[0]) * v_z[:, 0] + (z_nc[0] - z_nw[0]) * v_z[:, 1]) / (
+        z_nw[1] - z_nw[0]
+    )
+    psi = np.zeros_like(v_x)
+    psi[1:, 0] = -cumulative_trapezoid(r_pc[0] ** 2 * vz0, x=x_coord)
+    vxc = (v_x + np.roll(v_x, -1, axis=0)) / 2
+    for i_x in range(len(x_coord)):
+        psi[i_x, 1:] = psi[i_x, 0] + cumulative_trapezoid(r_pc * vxc[i_x], x=z_nc)
+    return -psi if geom.twod_xz else psi
+
+
+def test_stream_functions(sdat: StagyyData) -> None:
+    steps = list(sdat.snaps)[-2:]
+    psis = processing.stream_functions(steps)
+    assert len(psis) == len(steps)
+    expected = stream_reference(steps[-1])
+    assert np.allclose(psis[-1].values.reshape(expected.shape), expected)
+    for step, psi in zip(steps, psis):
+        assert np.array_equal(psi.values, processing.stream_function(step).values)
+
+
+def test_horizontal_profiles(step: Step) -> None:
+    profs = processing.horizontal_profiles(step, ["T"], ["mean", "rms", "min", "q50"])
+    assert np.allclose(profs["T.mean"].values, step.rprofs["Tmean"].values, atol=1e-5)
+    assert np.all(profs["T.rms"].values >= profs["T.mean"].values)
+    assert np.all(profs["T.q50"].values >= profs["T.min"].values)
+    assert np.array_equal(step.rprofs["T.min"].values, profs["T.min"].values)
+
+
+def test_mobility(sdat: StagyyData) -> None:
+    steps = list(sdat.steps.filter(rprofs=True))
+    mob = processing.mobility(sdat)
+    tseries_checks(mob, len(steps))
+    last = steps[-1]
+    assert mob.time[-1] == last.time
+    assert mob.values[-1] == last.rprofs["vrms"].values[-1] / last.timeinfo["Vrms"]
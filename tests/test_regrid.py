@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import stagpy.error
+from stagpy import regrid
+from stagpy.step import Step
+
+
+def test_latlon_grid() -> None:
+    lat, lon = regrid.latlon_grid(90, 180)
+    assert lat.shape == (90,)
+    assert lon.shape == (180,)
+    assert np.isclose(lat[0], -lat[-1])
+    assert np.isclose(lon[1] - lon[0], 2 * np.pi / 180)
+
+
+def test_yinyang_weights() -> None:
+    lat_walls = np.linspace(-np.pi / 4, np.pi / 4, 33)
+    lon_walls = np.linspace(-3 * np.pi / 4, 3 * np.pi / 4, 97)
+    lat_c = (lat_walls[1:] + lat_walls[:-1]) / 2
+    lon_c = (lon_walls[1:] + lon_walls[:-1]) / 2
+
+    def func(lat: np.ndarray, lon: np.ndarray, yang: bool = False) -> np.ndarray:
+        x, y, z = np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)
+        if yang:
+            x, y, z = -x, z, y
+        return x + 2 * y + 3 * z
+
+    lat, lon = np.meshgrid(lat_c, lon_c, indexing="ij")
+    values = np.stack((func(lat, lon), func(lat, lon, yang=True)), axis=-1)
+    weights = regrid._yinyang_weights(tuple(lat_c), tuple(lon_c), 45, 90)
+    lat, lon = np.meshgrid(*regrid.latlon_grid(45, 90), indexing="ij")
+    assert np.allclose(weights @ values.ravel(), func(lat, lon).ravel(), atol=0.05)
+
+
+def test_latlon_not_yinyang(step: Step) -> None:
+    with pytest.raises(stagpy.error.NotAvailableError):
+        regrid.latlon(step, "T")
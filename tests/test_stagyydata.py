@@ -1,8 +1,15 @@
+import gc
+import shutil
+import weakref
 from pathlib import Path
+from typing import Any, NoReturn
 
+import numpy as np
 import pytest
 
 import stagpy.error
+from stagpy import parsers, processing
+from stagpy._caching import MemoStore
 from stagpy.stagyydata import StagyyData
 from stagpy.step import Step
 
@@ -61,8 +68,323 @@ def test_step_istep(sdat: StagyyData) -> None:
     assert all(s is sdat.steps[s.istep] for s in sdat.steps)
 
 
+def test_steps_released(sdat: StagyyData) -> None:
+    ref = weakref.ref(sdat.steps[0])
+    for istep in range(1, sdat.steps.recent + 1):
+        sdat.steps[istep]
+    gc.collect()
+    assert ref() is None
+
+
+def test_steps_recent_kept(sdat: StagyyData) -> None:
+    ref = weakref.ref(sdat.steps[0])
+    for istep in range(1, sdat.steps.recent):
+        sdat.steps[istep]
+    gc.collect()
+    assert ref() is sdat.steps[0]
+
+
+def test_step_time(sdat: StagyyData) -> None:
+    step = sdat.steps[-1]
+    assert step.time == step.timeinfo["time"]
+
+
 def test_geom(step: Step) -> None:
     assert step.geom.twod
     assert not step.geom.threed
     assert not step.geom.yinyang
     assert step.geom.cartesian is not step.geom.spherical
+
+
+def test_geom_volumes(step: Step) -> None:
+    geom = step.geom
+    assert geom.cell_volumes.shape == (
+        geom.nxtot,
+        geom.nytot,
+        geom.nztot,
+        geom.nbtot,
+    )
+    assert np.allclose(geom.cell_volumes.sum(axis=(0, 1, 3)), geom.shell_volumes)
+    rbot, rtop = geom.r_walls[[0, -1]]
+    if geom.spherical:
+        solid_angle = geom.wall_areas[0] / rbot**2
+        expected = solid_angle * (rtop**3 - rbot**3) / 3
+    else:
+        expected = geom.wall_areas[0] * (rtop - rbot)
+    assert np.isclose(geom.shell_volumes.sum(), expected)
+    assert not geom.cell_volumes.flags.writeable
+
+
+def test_field_lazy(example_dir: Path, sdat: StagyyData) -> None:
+    temp = sdat.snaps[-1].fields["T"].values
+    fld = StagyyData(example_dir).snaps[-1].fields["T"]
+    assert fld.shape == temp.shape
+    assert np.array_equal(fld.read((slice(None), 0, -1)), temp[:, 0, -1])
+    assert np.array_equal(fld.values, temp)
+
+
+def test_field_stack(sdat: StagyyData) -> None:
+    snaps = list(sdat.snaps)[-3:]
+    stack = sdat.field_stack("T", sdat.snaps[-3:])
+    assert len(stack) == len(snaps)
+    assert stack.shape == (len(snaps), *snaps[-1].fields["T"].values.shape)
+    assert tuple(map(sum, stack.chunks)) == stack.shape
+    assert np.array_equal(stack[-1], snaps[-1].fields["T"].values)
+    assert np.array_equal(stack[:, :, 0, -1], np.asarray(stack)[:, :, 0, -1])
+
+
+def test_probe(example_dir: Path, sdat: StagyyData) -> None:
+    snaps = list(sdat.snaps)[-3:]
+    temps = np.stack([snap.fields["T"].values for snap in snaps])
+    geom = snaps[-1].geom
+    points = [(geom.nxtot - 1, 0, iz, 0) for iz in range(geom.nztot)]
+    points.append((0, 0, 0, 0))
+    fresh = StagyyData(example_dir)
+    isteps, probed = fresh.probe("T", points, view=fresh.snaps[-3:], workers=2)
+    # fields are not materialised
+    assert all("values" not in vars(snap.fields["T"]) for snap in fresh.snaps[-3:])
+    assert np.array_equal(isteps, [snap.istep for snap in snaps])
+    assert probed.shape == (len(snaps), len(points))
+    assert np.array_equal(probed[:, :-1], temps[:, -1, 0, :, 0])
+    assert np.array_equal(probed[:, -1], temps[:, 0, 0, 0, 0])
+
+
+@pytest.mark.parametrize("name", ["T", "v1"])
+def test_probe_reads_points(
+    example_dir: Path, sdat: StagyyData, name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    view = sdat.snaps[-3:]
+    flds = np.stack([snap.fields[name].values for snap in view])
+    points = [(0, 0, 0, 0), (0, 0, flds.shape[3] - 1, 0)]
+
+    def whole_field(*args: Any, **kwargs: Any) -> NoReturn:
+        raise AssertionError("whole field read")
+
+    monkeypatch.setattr(parsers.bin.field, "field", whole_field)
+    monkeypatch.setattr(parsers.h5.field, "field", whole_field)
+    fresh = StagyyData(example_dir)
+    _, probed = fresh.probe(name, points, view=fresh.snaps[-3:])
+    assert np.array_equal(probed, flds[:, 0, 0, [0, -1], 0])
+
+
+def test_fields_reduce(sdat: StagyyData) -> None:
+    view = sdat.snaps[-3:]
+    temps = np.stack([step.fields["T"].values for step in view])
+    red = view.fields_reduce("T", ops=("mean", "std", "max"), workers=2)
+    assert np.allclose(red["mean"], temps.mean(axis=0))
+    assert np.allclose(red["std"], temps.std(axis=0))
+    assert np.array_equal(red["max"], temps.max(axis=0))
+
+
+@pytest.mark.parametrize("name", ["T", "v2"])
+def test_fields_reduce_horizontal(sdat_legacy: StagyyData, name: str) -> None:
+    view = sdat_legacy.snaps[-3:]
+    red = view.fields_reduce(name, ops=("mean", "var", "min", "max"), horizontal=True)
+    profs = [
+        processing.horizontal_profiles(step, [name], ["mean", "rms", "min", "max"])
+        for step in view
+    ]
+    # all snapshots have the same total horizontal area
+    mean = np.mean([prof[f"{name}.mean"].values for prof in profs], axis=0)
+    square = np.mean([prof[f"{name}.rms"].values ** 2 for prof in profs], axis=0)
+    assert np.allclose(red["mean"], mean)
+    assert np.allclose(red["var"], square - mean**2)
+    assert np.array_equal(
+        red["min"], np.min([prof[f"{name}.min"].values for prof in profs], axis=0)
+    )
+    assert np.array_equal(
+        red["max"], np.max([prof[f"{name}.max"].values for prof in profs], axis=0)
+    )
+
+
+def test_fields_reduce_invalid(sdat: StagyyData) -> None:
+    with pytest.raises(stagpy.error.UnknownReductionError):
+        sdat.snaps[-1:].fields_reduce("T", ops=("median",))
+
+
+def test_horizontal_profiles(sdat: StagyyData) -> None:
+    view = sdat.snaps[-2:]
+    isteps, profs = view.horizontal_profiles(["T"], stats=("mean", "max"))
+    assert list(isteps) == [step.istep for step in view]
+    assert profs["T.max"].shape == (len(isteps), sdat.snaps[-1].geom.nztot)
+    assert np.array_equal(profs["T.mean"][-1], sdat.snaps[-1].rprofs["T.mean"].values)
+
+
+def test_field_dtype(example_dir: Path, sdat: StagyyData) -> None:
+    sdat_32 = StagyyData(example_dir, field_dtype=np.float32)
+    temp = sdat.snaps[-1].fields["T"].values
+    temp_32 = sdat_32.snaps[-1].fields["T"].values
+    assert temp_32.dtype == np.float32
+    assert np.allclose(temp_32, temp)
+    assert sdat_32.snaps[-1].fields["stream"].values.dtype == np.float32
+
+
+def test_field_dtype_invalid(example_dir: Path) -> None:
+    with pytest.raises(stagpy.error.StagpyError):
+        StagyyData(example_dir, field_dtype=np.int32)
+
+
+def test_memo_dir(example_dir: Path, tmp_path: Path) -> None:
+    sdat = StagyyData(example_dir, memo_dir=tmp_path)
+    dtdt = sdat.tseries["dTdt"]
+    nrad = sdat.steps[-1].rprofs.centers.size
+    assert len(list(tmp_path.iterdir())) == 1
+    sdat_again = StagyyData(example_dir, memo_dir=tmp_path)
+    dtdt_again = sdat_again.tseries["dTdt"]
+    assert (dtdt_again.values == dtdt.values).all()
+    assert (dtdt_again.time == dtdt.time).all()
+    assert dtdt_again.meta == dtdt.meta
+    assert nrad == sdat_again.steps[-1].rprofs["dr"].values.size
+    # profiles of all steps are gathered in a single file
+    for step in list(sdat_again.steps.filter(rprofs=True))[-3:]:
+        assert step.rprofs["dr"].values.size == nrad
+    assert sdat_again._memo is not None
+    sdat_again._memo.flush()
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_memo_field_stats(
+    example_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sdat = StagyyData(example_dir, memo_dir=tmp_path)
+    isteps, profs = sdat.snaps[-2:].horizontal_profiles(["T"], ["mean", "max"])
+    trms = sdat.snaps[-1].rprofs["T.rms"]
+    assert sdat._memo is not None
+    sdat._memo.flush()
+
+    def compute(*args: Any, **kwargs: Any) -> NoReturn:
+        raise AssertionError("profiles computed again")
+
+    monkeypatch.setattr(processing, "horizontal_profiles", compute)
+    sdat_again = StagyyData(example_dir, memo_dir=tmp_path)
+    assert np.array_equal(sdat_again.snaps[-1].rprofs["T.rms"].values, trms.values)
+    isteps_again, profs_again = sdat_again.snaps[-2:].horizontal_profiles(
+        ["T"], ["mean", "max"]
+    )
+    assert np.array_equal(isteps_again, isteps)
+    assert list(profs_again) == ["T.mean", "T.max"]
+    for key, prof in profs.items():
+        assert np.array_equal(profs_again[key], prof)
+
+
+def test_memo_table(tmp_path: Path) -> None:
+    inputs = [tmp_path / "input"]
+    inputs[0].write_text("input")
+    memo = MemoStore(root=tmp_path / "memo", run=tmp_path, flush_every=3)
+    values, rad = np.arange(3.0), np.arange(4.0)
+    for istep in range(2):
+        memo._table_put("rprof", istep, inputs, [values, rad], ["a", "b", "c"])
+    # rows are buffered until flush_every rows are pending
+    assert not memo.root.exists()
+    memo._table_put("rprof", 2, inputs, [values, rad], ["a", "b", "c"])
+    assert len(list(memo.root.iterdir())) == 1
+    memo._table_put("rprof", 3, inputs, [values, rad], ["a", "b", "c"])
+    memo.flush()
+    stored = MemoStore(root=memo.root, run=tmp_path)._table_get("rprof", 3, inputs)
+    assert stored is not None
+    assert np.array_equal(stored.columns[0], values)
+    assert np.array_equal(stored.columns[1], rad)
+    assert stored.meta == ["a", "b", "c"]
+
+
+def test_memo_inputs(example_legacy_path: Path, tmp_path: Path) -> None:
+    run_dir = tmp_path / "run"
+    shutil.copytree(example_legacy_path, run_dir)
+    (run_dir / "par").rename(run_dir / "par_defaults")
+    (run_dir / "par").write_text(
+        "&default_parameters_parfile\n"
+        "    par_name_defaultparameters = 'par_defaults'\n/\n"
+    )
+    pardat = StagyyData(run_dir).par.legacy_output("parameters.dat")
+    shutil.copy(run_dir / "par_defaults", pardat)
+    inputs = StagyyData(run_dir)._memo_inputs
+    assert {run_dir / "par", run_dir / "par_defaults", pardat} <= set(inputs)
+    assert pardat not in StagyyData(run_dir, read_parameters_dat=False)._memo_inputs
+
+
+def test_field_range_memo(example_dir: Path, tmp_path: Path) -> None:
+    sdat = StagyyData(example_dir, memo_dir=tmp_path)
+    temp = sdat.snaps[-1].fields["T"].values
+    assert sdat._memo is not None
+    sdat._memo.flush()
+    fields = StagyyData(example_dir, memo_dir=tmp_path).snaps[-1].fields
+    assert fields._value_range("T") == (temp.min(), temp.max())
+    assert "values" not in vars(fields["T"])
+
+
+def test_field_range_whole_file(example_dir: Path) -> None:
+    sdat = StagyyData(example_dir)
+    fields = sdat.snaps[-1].fields
+    isnap = sdat.snaps[-1].isnap
+    assert isnap is not None
+    fields._value_range("v1")
+    # other fields of the velocity file are recorded by the same read
+    for name in ("v2", "v3"):
+        vrange = sdat._field_ranges.get(isnap, name)
+        values = StagyyData(example_dir).snaps[-1].fields[name].values
+        assert vrange == (values.min(), values.max())
+    assert all("values" not in vars(fields[name]) for name in ("v1", "v2"))
+
+
+def test_field_range_memo_table(example_dir: Path, tmp_path: Path) -> None:
+    sdat = StagyyData(example_dir, memo_dir=tmp_path)
+    ranges = [snap.fields._value_range("T") for snap in sdat.snaps]
+    assert sdat._memo is not None
+    sdat._memo.flush()
+    # ranges of all snapshots are gathered in a single file
+    assert len(list(tmp_path.iterdir())) == 1
+    sdat_again = StagyyData(example_dir, memo_dir=tmp_path)
+    assert sdat_again._memo is not None
+    isnaps = [snap.isnap for snap in sdat_again.snaps]
+    table = sdat_again._memo._table("range\0T")
+    assert sorted(table) == isnaps
+    assert [snap.fields._value_range("T") for snap in sdat_again.snaps] == ranges
+    assert all("values" not in vars(snap.fields["T"]) for snap in sdat_again.snaps)
+
+
+def test_tracers_lazy(
+    sdat_tracers: StagyyData, tracers_data: dict[str, list[np.ndarray]]
+) -> None:
+    tracers = sdat_tracers.snaps[-1].tracers
+    mass = tracers["Mass"]
+    assert mass is not None
+    assert all(map(np.array_equal, mass, tracers_data["Mass"]))
+    assert list(tracers._data) == ["Mass"]
+    assert tracers["dummy"] is None
+    assert sdat_tracers.snaps[0].tracers["Mass"] is None
+
+
+def test_tracer_trajectories(
+    sdat_tracers: StagyyData, tracers_data: dict[str, list[np.ndarray]]
+) -> None:
+    ids = tracers_data["ID"][0][[3, 10, 42]]
+    tracers = sdat_tracers.snaps[-1].tracers
+    isteps, traj = sdat_tracers.tracer_trajectories(
+        np.append(ids, -1.0), sdat_tracers.snaps[-3:], names=["x", "Mass"], workers=2
+    )
+    assert np.array_equal(
+        isteps, [snap.istep for snap in list(sdat_tracers.snaps)[-2:]]
+    )
+    assert traj["x"].shape == (2, 4)
+    for name in ("x", "Mass"):
+        expected = tracers_data[name][0][[3, 10, 42]]
+        assert np.array_equal(traj[name][:, :3], np.tile(expected, (2, 1)))
+        assert np.all(np.isnan(traj[name][:, 3]))
+    # the whole variable is not kept in memory
+    assert "Mass" not in tracers._data
+    assert "ID" not in tracers._data
+    assert "ID" not in tracers._id_index
+
+
+def test_tracers_locate(
+    sdat_tracers: StagyyData, tracers_data: dict[str, list[np.ndarray]]
+) -> None:
+    tracers = sdat_tracers.snaps[-1].tracers
+    ids = tracers_data["ID"][0][[42, 3]]
+    for cache in (False, True):
+        located = tracers.locate(np.append(ids, -1.0), cache=cache)
+        assert located is not None
+        iblocks, rows = located
+        assert np.array_equal(iblocks, [0, 0, -1])
+        assert np.array_equal(rows, [42, 3, -1])
+        assert ("ID" in tracers._id_index) is cache